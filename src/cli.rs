@@ -38,6 +38,12 @@ pub struct Cli {
     pub no_recursive: bool,
     #[arg(long, default_value_t = true)]
     pub skip_existing: bool,
+    #[arg(
+        long = "no-skip-existing",
+        action = ArgAction::SetTrue,
+        help = "Re-run jobs even when an up-to-date output already exists"
+    )]
+    pub no_skip_existing: bool,
     #[arg(long)]
     pub export: Vec<String>,
     #[arg(long = "to", help = "Convert instead of transcribe: markdown|json")]
@@ -50,6 +56,12 @@ pub struct Cli {
     pub from: ConversionSource,
     #[arg(long = "file-pattern", default_value = "*.tex")]
     pub file_pattern: String,
+    #[arg(
+        long = "batch-size",
+        default_value_t = crate::constants::DEFAULT_CONVERSION_BATCH_SIZE,
+        help = "Files packed into a single conversion request (1 disables batching)"
+    )]
+    pub batch_size: usize,
     #[arg(
         long,
         default_value = "basic",
@@ -1,6 +1,8 @@
 use crate::constants::{
-    default_model_pricing, DEFAULT_MAX_VIDEO_WORKERS, DEFAULT_MAX_WORKERS, DEFAULT_MODEL,
-    DEFAULT_PDF_DPI, DEFAULT_VIDEO_TOKENS_PER_SECOND, DEFAULT_VIDEO_TOKEN_LIMIT,
+    default_model_pricing, DEFAULT_CONNECT_TIMEOUT_SECONDS, DEFAULT_MAX_INGEST_WORKERS,
+    DEFAULT_MAX_RETRIES, DEFAULT_MAX_VIDEO_WORKERS, DEFAULT_MAX_WORKERS, DEFAULT_MODEL,
+    DEFAULT_PDF_DPI, DEFAULT_REQUEST_TIMEOUT_SECONDS, DEFAULT_VIDEO_TOKENS_PER_SECOND,
+    DEFAULT_VIDEO_TOKEN_LIMIT,
 };
 use crate::core::OutputFormat;
 use crate::video::{VideoEncoderPreference, DEFAULT_MAX_CHUNK_BYTES, DEFAULT_MAX_CHUNK_SECONDS};
@@ -11,6 +13,8 @@ use std::collections::HashMap;
 use std::env;
 use std::fs::File;
 use std::path::{Path, PathBuf};
+use std::sync::{Mutex, OnceLock};
+use std::time::Duration;
 
 fn get_env(names: &[&str]) -> Option<String> {
     for name in names {
@@ -63,6 +67,45 @@ struct RootConfig {
     pricing_file: Option<PathBuf>,
 }
 
+/// Per-request deadline and retry budget shared by every Gemini HTTP client.
+#[derive(Debug, Clone, Copy)]
+pub struct RetryPolicy {
+    pub request_timeout: Duration,
+    pub max_retries: usize,
+}
+
+impl Default for RetryPolicy {
+    fn default() -> Self {
+        Self {
+            request_timeout: Duration::from_secs(DEFAULT_REQUEST_TIMEOUT_SECONDS),
+            max_retries: DEFAULT_MAX_RETRIES,
+        }
+    }
+}
+
+static HTTP_CLIENTS: OnceLock<Mutex<HashMap<Duration, reqwest::blocking::Client>>> =
+    OnceLock::new();
+
+impl RetryPolicy {
+    /// Clients are shared per timeout, so the provider and converter built for
+    /// each job reuse the same kept-alive Gemini connections instead of
+    /// handshaking again.
+    pub fn http_client(&self) -> reqwest::Result<reqwest::blocking::Client> {
+        let clients = HTTP_CLIENTS.get_or_init(|| Mutex::new(HashMap::new()));
+        let mut clients = clients.lock().unwrap();
+        if let Some(client) = clients.get(&self.request_timeout) {
+            return Ok(client.clone());
+        }
+        let client = reqwest::blocking::Client::builder()
+            .timeout(self.request_timeout)
+            .connect_timeout(Duration::from_secs(DEFAULT_CONNECT_TIMEOUT_SECONDS))
+            .tcp_keepalive(Duration::from_secs(60))
+            .build()?;
+        clients.insert(self.request_timeout, client.clone());
+        Ok(client)
+    }
+}
+
 #[derive(Debug, Clone)]
 pub struct AppConfig {
     pub api_key: String,
@@ -80,11 +123,13 @@ pub struct AppConfig {
     pub pdf_dpi: u32,
     pub max_workers: usize,
     pub max_video_workers: usize,
+    pub max_ingest_workers: usize,
     pub video_encoder_preference: VideoEncoderPreference,
     pub presets: HashMap<String, HashMap<String, Value>>,
     pub exports: Vec<String>,
     pub pricing_file: Option<PathBuf>,
     pub pricing_defaults: HashMap<String, crate::constants::ModelPricing>,
+    pub retry: RetryPolicy,
 }
 
 impl AppConfig {
@@ -226,6 +271,8 @@ impl AppConfig {
             ],
             DEFAULT_MAX_VIDEO_WORKERS,
         );
+        let max_ingest_workers =
+            parse_workers(&["RECAPIT_MAX_INGEST_WORKERS"], DEFAULT_MAX_INGEST_WORKERS);
 
         if let Some(tokens_per_sec) = get_env(&[
             "RECAPIT_TOKENS_PER_SECOND",
@@ -282,6 +329,20 @@ impl AppConfig {
 
         let video_encoder_preference = VideoEncoderPreference::parse(encoder_pref.as_deref())?;
 
+        let mut retry = RetryPolicy::default();
+        if let Some(timeout) = get_env(&["RECAPIT_REQUEST_TIMEOUT_SECONDS"]) {
+            if let Ok(parsed) = timeout.parse::<u64>() {
+                if parsed > 0 {
+                    retry.request_timeout = Duration::from_secs(parsed);
+                }
+            }
+        }
+        if let Some(retries) = get_env(&["RECAPIT_MAX_RETRIES"]) {
+            if let Ok(parsed) = retries.parse::<usize>() {
+                retry.max_retries = parsed;
+            }
+        }
+
         exports.sort();
         exports.dedup();
 
@@ -301,6 +362,7 @@ impl AppConfig {
             pdf_dpi,
             max_workers,
             max_video_workers,
+            max_ingest_workers,
             video_encoder_preference,
             presets,
             exports,
@@ -309,6 +371,7 @@ impl AppConfig {
                 .into_iter()
                 .map(|(k, v)| (k.to_string(), v))
                 .collect(),
+            retry,
         })
     }
 }
@@ -8,40 +8,101 @@ pub const GEMINI_2_5_FLASH_LITE: &str = "gemini-2.5-flash-lite";
 pub const GEMINI_2_5_PRO: &str = "gemini-2.5-pro";
 pub const GEMINI_3_PRO_PREVIEW: &str = "gemini-3-pro-preview";
 
-pub fn model_capabilities() -> HashMap<&'static str, &'static [&'static str]> {
-    HashMap::from([
-        (GEMINI_2_5_FLASH, &["text", "image", "audio", "video"][..]),
-        (
-            GEMINI_2_5_FLASH_LITE,
-            &["text", "image", "audio", "video", "pdf"][..],
-        ),
-        (
-            GEMINI_2_5_PRO,
-            &["text", "image", "audio", "video", "pdf"][..],
-        ),
-        (
-            GEMINI_3_PRO_PREVIEW,
-            &["text", "image", "audio", "video", "pdf"][..],
-        ),
-    ])
+const ALL_MEDIA: &[&str] = &["text", "image", "audio", "video", "pdf"];
+
+/// Capabilities of a known model, as a static table with no per-call setup.
+fn known_model_capabilities(model: &str) -> Option<&'static [&'static str]> {
+    match model {
+        GEMINI_2_5_FLASH => Some(&["text", "image", "audio", "video"]),
+        GEMINI_2_5_FLASH_LITE | GEMINI_2_5_PRO | GEMINI_3_PRO_PREVIEW => Some(ALL_MEDIA),
+        _ => None,
+    }
+}
+
+/// Capabilities for `model`, falling back to the default model's entry for
+/// unknown names.
+pub fn model_capabilities(model: &str) -> Option<&'static [&'static str]> {
+    known_model_capabilities(model).or_else(|| known_model_capabilities(DEFAULT_MODEL))
 }
 
+const KNOWN_MODELS: [&str; 4] = [
+    GEMINI_3_PRO_PREVIEW,
+    GEMINI_2_5_PRO,
+    GEMINI_2_5_FLASH,
+    GEMINI_2_5_FLASH_LITE,
+];
+
 pub fn rate_limits_per_minute() -> HashMap<&'static str, u32> {
-    HashMap::from([
-        (GEMINI_3_PRO_PREVIEW, 50),
-        (GEMINI_2_5_PRO, 150),
-        (GEMINI_2_5_FLASH, 1_000),
-        (GEMINI_2_5_FLASH_LITE, 4_000),
-    ])
+    known_model_limits(|profile| profile.requests_per_minute)
 }
 
 pub fn token_limits_per_minute() -> HashMap<&'static str, u32> {
-    HashMap::from([
-        (GEMINI_3_PRO_PREVIEW, 1_000_000),
-        (GEMINI_2_5_PRO, 2_000_000),
-        (GEMINI_2_5_FLASH, 1_000_000),
-        (GEMINI_2_5_FLASH_LITE, 4_000_000),
-    ])
+    known_model_limits(|profile| profile.tokens_per_minute)
+}
+
+fn known_model_limits(pick: fn(&ModelProfile) -> u32) -> HashMap<&'static str, u32> {
+    KNOWN_MODELS
+        .iter()
+        .filter_map(|model| Some((*model, pick(model_profile(model)?))))
+        .collect()
+}
+
+/// Quota profile matched by model-id prefix, ordered most specific first. It
+/// is the single source for the known models' limit tables and also covers
+/// ids missing from them (dated snapshots, `-latest` aliases, new previews),
+/// so unknown models still get rate-limit protection.
+pub struct ModelProfile {
+    pub prefix: &'static str,
+    pub requests_per_minute: u32,
+    pub tokens_per_minute: u32,
+}
+
+const MODEL_PROFILES: &[ModelProfile] = &[
+    ModelProfile {
+        prefix: "gemini-3-pro",
+        requests_per_minute: 50,
+        tokens_per_minute: 1_000_000,
+    },
+    ModelProfile {
+        prefix: "gemini-2.5-flash-lite",
+        requests_per_minute: 4_000,
+        tokens_per_minute: 4_000_000,
+    },
+    ModelProfile {
+        prefix: "gemini-2.5-flash",
+        requests_per_minute: 1_000,
+        tokens_per_minute: 1_000_000,
+    },
+    ModelProfile {
+        prefix: "gemini-2.5-pro",
+        requests_per_minute: 150,
+        tokens_per_minute: 2_000_000,
+    },
+    ModelProfile {
+        prefix: "gemini-",
+        requests_per_minute: 50,
+        tokens_per_minute: 1_000_000,
+    },
+];
+
+pub fn model_profile(model: &str) -> Option<&'static ModelProfile> {
+    let model = model.strip_prefix("models/").unwrap_or(model);
+    MODEL_PROFILES
+        .iter()
+        .find(|profile| model.starts_with(profile.prefix))
+}
+
+/// Exact table entry first, then the model's profile; zero means unlimited.
+pub fn resolve_model_limit(
+    limits: &HashMap<String, u32>,
+    model: &str,
+    from_profile: fn(&ModelProfile) -> u32,
+) -> Option<u32> {
+    limits
+        .get(model)
+        .copied()
+        .or_else(|| model_profile(model).map(from_profile))
+        .filter(|value| *value > 0)
 }
 
 pub fn default_model_pricing() -> HashMap<&'static str, ModelPricing> {
@@ -98,4 +159,30 @@ pub const DEFAULT_VIDEO_TOKEN_LIMIT: u32 = 300_000;
 pub const DEFAULT_VIDEO_TOKENS_PER_SECOND: f64 = 300.0;
 pub const DEFAULT_MAX_WORKERS: usize = 4;
 pub const DEFAULT_MAX_VIDEO_WORKERS: usize = 3;
+pub const DEFAULT_MAX_INGEST_WORKERS: usize = 16;
 pub const DEFAULT_PDF_DPI: u32 = 200;
+pub const DEFAULT_CONVERSION_BATCH_SIZE: usize = 10;
+pub const DEFAULT_REQUEST_TIMEOUT_SECONDS: u64 = 600;
+pub const DEFAULT_CONNECT_TIMEOUT_SECONDS: u64 = 30;
+pub const DEFAULT_MAX_RETRIES: usize = 3;
+pub const MAX_OUTPUT_TOKENS: u32 = 65_536;
+pub const IMAGE_OUTPUT_TOKENS_PER_PAGE: u32 = 2_048;
+pub const MIN_IMAGE_OUTPUT_TOKENS: u32 = 8_192;
+pub const VIDEO_OUTPUT_TOKENS_PER_CHUNK: u32 = 32_768;
+/// Thinking models count their reasoning against `maxOutputTokens`, so each
+/// cap gets this much on top of the transcript's share.
+pub const THINKING_TOKEN_HEADROOM: u32 = 8_192;
+
+/// Thinking budget sent alongside an output cap. Gemini 2.5 Pro and Flash
+/// think dynamically by default; their thinking is capped at the headroom
+/// so it cannot crowd out the transcript. Models that do not think by
+/// default (2.5 Flash-Lite) or do not take a token budget get none, which
+/// leaves their default behaviour alone.
+pub fn thinking_budget(model: &str) -> Option<u32> {
+    let model = model.strip_prefix("models/").unwrap_or(model);
+    if model.starts_with(GEMINI_2_5_FLASH_LITE) {
+        return None;
+    }
+    (model.starts_with(GEMINI_2_5_PRO) || model.starts_with(GEMINI_2_5_FLASH))
+        .then_some(THINKING_TOKEN_HEADROOM)
+}
@@ -1,42 +1,124 @@
-use std::collections::HashMap;
 use std::fs;
+use std::ops::Range;
 use std::path::{Path, PathBuf};
+use std::sync::OnceLock;
 use std::thread;
-use std::time::Duration;
+use std::time::{Duration, Instant};
 
 use anyhow::{anyhow, bail, Context, Result};
+use bytes::Bytes;
 use glob::Pattern;
 use rand::Rng;
+use regex::Regex;
 use reqwest::blocking::Client;
+use reqwest::header::CONTENT_TYPE;
 use reqwest::StatusCode;
 use serde_json::{json, Map, Value};
 use time::OffsetDateTime;
 use walkdir::WalkDir;
 
+use crate::config::RetryPolicy;
 use crate::quota::QuotaMonitor;
-use crate::telemetry::{RequestEvent, RunMonitor};
+use crate::ratelimit::{estimate_text_tokens, throttle_delay};
+use crate::telemetry::{usage_counts, RequestEvent, RunMonitor};
 
 pub struct LatexConverter {
     http: Client,
     api_key: String,
     monitor: RunMonitor,
     quota: Option<QuotaMonitor>,
+    retry: RetryPolicy,
 }
 
-const MAX_RETRIES: usize = 3;
 const BACKOFF_BASE_SECONDS: f64 = 1.0;
 const BACKOFF_CAP_SECONDS: f64 = 8.0;
 
+/// Input characters packed into one batched request. Converted output is
+/// roughly as long as its input, so this keeps a batch's reply well inside
+/// `MAX_OUTPUT_TOKENS` (about four characters per token) instead of letting
+/// it truncate and fall back to one request per input.
+pub const BATCH_CHAR_BUDGET: usize = crate::constants::MAX_OUTPUT_TOKENS as usize * 2;
+
+static BATCH_MARKER_RE: OnceLock<Regex> = OnceLock::new();
+
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum ConversionOperation {
+    LatexToMarkdown,
+    LatexToJson,
+    MarkdownToJson,
+}
+
+impl ConversionOperation {
+    pub fn as_str(&self) -> &'static str {
+        match self {
+            ConversionOperation::LatexToMarkdown => "latex_to_markdown",
+            ConversionOperation::LatexToJson => "latex_to_json",
+            ConversionOperation::MarkdownToJson => "markdown_to_json",
+        }
+    }
+
+    /// JSON conversions ask the API for `application/json`, so single
+    /// replies come back as bare JSON without markdown fences.
+    fn response_mime_type(&self) -> Option<&'static str> {
+        match self {
+            ConversionOperation::LatexToMarkdown => None,
+            ConversionOperation::LatexToJson | ConversionOperation::MarkdownToJson => {
+                Some("application/json")
+            }
+        }
+    }
+
+    /// Batched replies are marker-delimited text, so they cannot be requested
+    /// as `application/json`. JSON sections are unfenced and must parse, so a
+    /// batched run writes the same bare JSON a single request would.
+    fn batch_section(&self, section: String) -> Option<String> {
+        match self {
+            ConversionOperation::LatexToMarkdown => Some(section),
+            ConversionOperation::LatexToJson | ConversionOperation::MarkdownToJson => {
+                let body = strip_code_fence(&section);
+                serde_json::from_str::<Value>(body).ok()?;
+                Some(body.to_string())
+            }
+        }
+    }
+
+    fn empty_output(&self) -> &'static str {
+        match self {
+            ConversionOperation::LatexToMarkdown => "",
+            ConversionOperation::LatexToJson | ConversionOperation::MarkdownToJson => "[]",
+        }
+    }
+
+    /// Appends `text` wrapped for this operation straight into the prompt
+    /// text rather than formatting it into a temporary string first.
+    fn push_input(&self, body: &mut String, text: &str) {
+        match self {
+            ConversionOperation::LatexToMarkdown => {
+                body.push_str("LaTeX:\n");
+                body.push_str(text);
+            }
+            ConversionOperation::LatexToJson | ConversionOperation::MarkdownToJson => {
+                body.push_str("```\n");
+                body.push_str(text);
+                body.push_str("\n```");
+            }
+        }
+    }
+}
+
 impl LatexConverter {
-    pub fn new(api_key: String, monitor: RunMonitor, quota: Option<QuotaMonitor>) -> Result<Self> {
-        let client = Client::builder()
-            .timeout(std::time::Duration::from_secs(600))
-            .build()?;
+    pub fn new(
+        api_key: String,
+        monitor: RunMonitor,
+        quota: Option<QuotaMonitor>,
+        retry: RetryPolicy,
+    ) -> Result<Self> {
         Ok(Self {
-            http: client,
+            http: retry.http_client()?,
             api_key,
             monitor,
             quota,
+            retry,
         })
     }
 
@@ -47,11 +129,13 @@ impl LatexConverter {
         latex_text: &str,
         metadata: Map<String, Value>,
     ) -> Result<String> {
-        if latex_text.trim().is_empty() {
-            return Ok(String::new());
-        }
-        let body_text = format!("Instructions:\n{prompt}\n\nLaTeX:\n{latex_text}");
-        self.generate(model, &body_text, "latex_to_markdown", metadata)
+        self.convert(
+            ConversionOperation::LatexToMarkdown,
+            model,
+            prompt,
+            latex_text,
+            metadata,
+        )
     }
 
     pub fn latex_to_json(
@@ -61,11 +145,13 @@ impl LatexConverter {
         latex_text: &str,
         metadata: Map<String, Value>,
     ) -> Result<String> {
-        if latex_text.trim().is_empty() {
-            return Ok("[]".to_string());
-        }
-        let body_text = format!("Instructions:\n{prompt}\n\n```\n{latex_text}\n```");
-        self.generate(model, &body_text, "latex_to_json", metadata)
+        self.convert(
+            ConversionOperation::LatexToJson,
+            model,
+            prompt,
+            latex_text,
+            metadata,
+        )
     }
 
     pub fn markdown_to_json(
@@ -75,11 +161,119 @@ impl LatexConverter {
         markdown_text: &str,
         metadata: Map<String, Value>,
     ) -> Result<String> {
-        if markdown_text.trim().is_empty() {
-            return Ok("[]".to_string());
+        self.convert(
+            ConversionOperation::MarkdownToJson,
+            model,
+            prompt,
+            markdown_text,
+            metadata,
+        )
+    }
+
+    fn convert(
+        &self,
+        operation: ConversionOperation,
+        model: &str,
+        prompt: &str,
+        text: &str,
+        metadata: Map<String, Value>,
+    ) -> Result<String> {
+        if text.trim().is_empty() {
+            return Ok(operation.empty_output().to_string());
         }
-        let body_text = format!("Instructions:\n{prompt}\n\n```\n{markdown_text}\n```");
-        self.generate(model, &body_text, "markdown_to_json", metadata)
+        let mut body_text = String::with_capacity(prompt.len() + text.len() + 32);
+        body_text.push_str("Instructions:\n");
+        body_text.push_str(prompt);
+        body_text.push_str("\n\n");
+        operation.push_input(&mut body_text, text);
+        self.generate(
+            model,
+            &body_text,
+            operation.as_str(),
+            operation.response_mime_type(),
+            metadata,
+        )
+    }
+
+    /// Packs several inputs into one generateContent request and splits the
+    /// reply on `<<<ITEM n>>>` markers. Falls back to one request per input
+    /// when the reply does not contain exactly one valid section per input.
+    pub fn convert_batch(
+        &self,
+        operation: ConversionOperation,
+        model: &str,
+        prompt: &str,
+        items: &[(&str, Map<String, Value>)],
+    ) -> Result<Vec<String>> {
+        let mut outputs = vec![operation.empty_output().to_string(); items.len()];
+        let pending: Vec<usize> = items
+            .iter()
+            .enumerate()
+            .filter(|(_, (text, _))| !text.trim().is_empty())
+            .map(|(idx, _)| idx)
+            .collect();
+        if pending.len() <= 1 {
+            for idx in pending {
+                let (text, metadata) = &items[idx];
+                outputs[idx] = self.convert(operation, model, prompt, text, metadata.clone())?;
+            }
+            return Ok(outputs);
+        }
+
+        let mut body_text = format!(
+            "Instructions:\n{prompt}\n\nThe request contains {} independent inputs. Convert each input separately. Begin each result with a line containing only its marker (for example {}) and do not merge inputs.\n\n",
+            pending.len(),
+            batch_marker(1)
+        );
+        body_text.reserve(pending.iter().map(|idx| items[*idx].0.len() + 32).sum());
+        for (position, idx) in pending.iter().enumerate() {
+            body_text.push_str(&batch_marker(position + 1));
+            body_text.push('\n');
+            operation.push_input(&mut body_text, items[*idx].0);
+            body_text.push_str("\n\n");
+        }
+
+        let mut metadata = Map::new();
+        metadata.insert(
+            "sources".into(),
+            Value::Array(
+                pending
+                    .iter()
+                    .filter_map(|idx| items[*idx].1.get("source").cloned())
+                    .collect(),
+            ),
+        );
+        metadata.insert("batch_size".into(), Value::from(pending.len() as u64));
+        let text = self.generate(model, &body_text, operation.as_str(), None, metadata)?;
+
+        let sections = split_batch_response(&text, pending.len()).and_then(|sections| {
+            sections
+                .into_iter()
+                .map(|section| operation.batch_section(section))
+                .collect::<Option<Vec<_>>>()
+        });
+        match sections {
+            Some(sections) => {
+                for (idx, section) in pending.into_iter().zip(sections) {
+                    outputs[idx] = section;
+                }
+            }
+            None => {
+                self.monitor.note_event(
+                    "conversion.batch.fallback",
+                    json!({
+                        "operation": operation.as_str(),
+                        "batch_size": pending.len(),
+                    }),
+                );
+                for idx in pending {
+                    let (text, metadata) = &items[idx];
+                    outputs[idx] =
+                        self.convert(operation, model, prompt, text, metadata.clone())?;
+                }
+            }
+        }
+        Ok(outputs)
     }
 
     fn generate(
@@ -87,13 +281,14 @@ impl LatexConverter {
         model: &str,
         user_text: &str,
         modality: &str,
-        metadata: Map<String, Value>,
+        response_mime_type: Option<&str>,
+        mut metadata: Map<String, Value>,
     ) -> Result<String> {
         let url = format!(
             "https://generativelanguage.googleapis.com/v1beta/models/{}:generateContent",
             model
         );
-        let request_body = json!({
+        let mut request_body = json!({
             "contents": [
                 {
                     "role": "user",
@@ -103,36 +298,53 @@ impl LatexConverter {
                 }
             ]
         });
+        if let Some(mime) = response_mime_type {
+            request_body["generationConfig"] = json!({ "responseMimeType": mime });
+        }
+        // Encoded once; retries resend the same bytes.
+        let body = Bytes::from(serde_json::to_vec(&request_body).context("encoding request body")?);
+        drop(request_body);
 
+        let estimated_tokens = estimate_text_tokens(user_text);
         let (payload, started, finished, retries) = {
             let mut attempt = 0;
             let mut retries = 0;
             loop {
-                self.apply_quota_delay(model);
+                self.apply_quota_delay(model, if attempt == 0 { estimated_tokens } else { 0 });
                 let started_at = OffsetDateTime::now_utc();
+                let clock = Instant::now();
                 match self
                     .http
                     .post(&url)
                     .query(&[("key", self.api_key.as_str())])
-                    .json(&request_body)
+                    .header(CONTENT_TYPE, "application/json")
+                    .body(body.clone())
                     .send()
                 {
                     Ok(resp) => {
                         if resp.status().is_success() {
-                            let finished_at = OffsetDateTime::now_utc();
+                            let finished_at = started_at + clock.elapsed();
                             let payload: Value =
                                 resp.json().context("parsing generateContent response")?;
                             break (payload, started_at, finished_at, retries);
                         }
 
-                        if should_retry_status(resp.status()) && attempt < MAX_RETRIES {
-                            let delay = backoff_delay(attempt);
+                        let status = resp.status();
+                        if status == StatusCode::TOO_MANY_REQUESTS {
+                            self.register_throttle(model);
+                        }
+                        if should_retry_status(status) && attempt < self.retry.max_retries {
+                            let delay = if status == StatusCode::TOO_MANY_REQUESTS {
+                                throttle_delay(resp, backoff_delay(attempt))
+                            } else {
+                                backoff_delay(attempt)
+                            };
                             self.monitor.note_event(
                                 "retry.generateContent",
                                 json!({
                                     "attempt": attempt + 1,
                                     "delay_ms": delay.as_millis(),
-                                    "status": resp.status().as_u16(),
+                                    "status": status.as_u16(),
                                     "model": model,
                                     "operation": modality,
                                 }),
@@ -143,7 +355,6 @@ impl LatexConverter {
                             continue;
                         }
 
-                        let status = resp.status();
                         let text = resp.text().unwrap_or_default();
                         return Err(anyhow!(
                             "generateContent failed with status {}: {}",
@@ -152,7 +363,7 @@ impl LatexConverter {
                         ));
                     }
                     Err(err) => {
-                        if is_retryable_error(&err) && attempt < MAX_RETRIES {
+                        if is_retryable_error(&err) && attempt < self.retry.max_retries {
                             let delay = backoff_delay(attempt);
                             self.monitor.note_event(
                                 "retry.generateContent",
@@ -177,15 +388,12 @@ impl LatexConverter {
 
         let text =
             extract_text(&payload).ok_or_else(|| anyhow!("response missing candidate text"))?;
-        let usage = payload.get("usageMetadata");
-        let (input_tokens, output_tokens, total_tokens) = extract_usage(usage);
+        let (input_tokens, output_tokens, total_tokens) = usage_counts(&payload);
 
-        let mut meta_value = metadata.clone();
-        meta_value.insert("operation".into(), Value::String(modality.to_string()));
-        meta_value.insert("retries".into(), Value::from(retries as u64));
-        let metadata_map: HashMap<String, Value> = meta_value.into_iter().collect();
+        metadata.insert("operation".into(), Value::String(modality.to_string()));
+        metadata.insert("retries".into(), Value::from(retries as u64));
 
-        let event = RequestEvent {
+        self.monitor.record(RequestEvent {
             model: model.to_string(),
             modality: modality.to_string(),
             started_at: started,
@@ -193,19 +401,18 @@ impl LatexConverter {
             input_tokens,
             output_tokens,
             total_tokens,
-            metadata: metadata_map.clone(),
-        };
-        self.monitor.record(event.clone());
+            metadata: metadata.into_iter().collect(),
+        });
         if let Some(quota) = &self.quota {
-            quota.register_tokens(model, event.total_tokens);
+            quota.register_tokens(model, estimated_tokens, total_tokens);
         }
 
         Ok(text.trim().to_string())
     }
 
-    fn apply_quota_delay(&self, bucket: &str) {
+    fn apply_quota_delay(&self, bucket: &str, estimated_tokens: u32) {
         if let Some(quota) = &self.quota {
-            if let Some(delay) = quota.register_request(bucket) {
+            if let Some(delay) = quota.register_request(bucket, estimated_tokens) {
                 if !delay.is_zero() {
                     self.monitor.note_event(
                         "quota.sleep",
@@ -219,6 +426,14 @@ impl LatexConverter {
             }
         }
     }
+
+    fn register_throttle(&self, bucket: &str) {
+        if let Some(quota) = &self.quota {
+            quota.register_throttle(bucket);
+            self.monitor
+                .note_event("quota.throttle", json!({ "bucket": bucket }));
+        }
+    }
 }
 
 fn extract_text(payload: &Value) -> Option<String> {
@@ -238,6 +453,78 @@ fn extract_text(payload: &Value) -> Option<String> {
     }
 }
 
+/// Groups consecutive inputs into batches of at most `max_items` entries and
+/// `max_chars` total characters; an input larger than the budget gets a batch
+/// of its own.
+pub fn plan_batches(lengths: &[usize], max_items: usize, max_chars: usize) -> Vec<Range<usize>> {
+    let max_items = max_items.max(1);
+    let mut batches = Vec::new();
+    let mut start = 0;
+    let mut chars = 0;
+    for (idx, len) in lengths.iter().enumerate() {
+        if idx > start && (idx - start == max_items || chars + len > max_chars) {
+            batches.push(start..idx);
+            start = idx;
+            chars = 0;
+        }
+        chars += len;
+    }
+    if start < lengths.len() {
+        batches.push(start..lengths.len());
+    }
+    batches
+}
+
+fn batch_marker(index: usize) -> String {
+    format!("<<<ITEM {index}>>>")
+}
+
+fn split_batch_response(text: &str, expected: usize) -> Option<Vec<String>> {
+    let re =
+        BATCH_MARKER_RE.get_or_init(|| Regex::new(r"(?m)^[ \t]*<<<ITEM (\d+)>>>[ \t]*$").unwrap());
+    let markers: Vec<(usize, usize, usize)> = re
+        .captures_iter(text)
+        .filter_map(|caps| {
+            let whole = caps.get(0)?;
+            let number: usize = caps[1].parse().ok()?;
+            Some((number, whole.start(), whole.end()))
+        })
+        .collect();
+    if markers.len() != expected
+        || markers
+            .iter()
+            .enumerate()
+            .any(|(position, (number, _, _))| *number != position + 1)
+    {
+        return None;
+    }
+    let mut sections = Vec::with_capacity(expected);
+    for (position, (_, _, body_start)) in markers.iter().enumerate() {
+        let body_end = markers
+            .get(position + 1)
+            .map(|(_, start, _)| *start)
+            .unwrap_or(text.len());
+        sections.push(text[*body_start..body_end].trim().to_string());
+    }
+    Some(sections)
+}
+
+/// The body of a reply wrapped in one markdown code fence (with or without
+/// an info string such as `json`), or the trimmed reply when it is not fenced.
+fn strip_code_fence(text: &str) -> &str {
+    let trimmed = text.trim();
+    let Some(rest) = trimmed.strip_prefix("```") else {
+        return trimmed;
+    };
+    let Some(body) = rest.strip_suffix("```") else {
+        return trimmed;
+    };
+    // Drop the info string ("json") on the opening fence line.
+    body.split_once('\n')
+        .map_or(body, |(_, inner)| inner)
+        .trim()
+}
+
 fn should_retry_status(status: StatusCode) -> bool {
     status == StatusCode::TOO_MANY_REQUESTS || status.is_server_error()
 }
@@ -259,28 +546,6 @@ fn backoff_delay(attempt: usize) -> Duration {
     Duration::from_secs_f64((capped * jitter).min(BACKOFF_CAP_SECONDS))
 }
 
-fn extract_usage(usage: Option<&Value>) -> (Option<u32>, Option<u32>, Option<u32>) {
-    let Some(usage) = usage else {
-        return (None, None, None);
-    };
-    let prompt = usage
-        .get("promptTokenCount")
-        .or_else(|| usage.get("inputTokenCount"))
-        .and_then(|v| v.as_u64())
-        .map(|v| v as u32);
-    let output = usage
-        .get("candidatesTokenCount")
-        .or_else(|| usage.get("outputTokenCount"))
-        .and_then(|v| v.as_u64())
-        .map(|v| v as u32);
-    let total = usage
-        .get("totalTokenCount")
-        .or_else(|| usage.get("totalTokens"))
-        .and_then(|v| v.as_u64())
-        .map(|v| v as u32);
-    (prompt, output, total)
-}
-
 pub fn collect_tex_files(source: &Path, pattern: &str, recursive: bool) -> Result<Vec<PathBuf>> {
     if source.is_file() {
         return Ok(vec![source.to_path_buf()]);
@@ -320,3 +585,49 @@ pub fn collect_tex_files(source: &Path, pattern: &str, recursive: bool) -> Resul
     files.sort();
     Ok(files)
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn splits_numbered_batch_sections() {
+        let text = "<<<ITEM 1>>>\n# One\n\n<<<ITEM 2>>>\n[]\n";
+        assert_eq!(
+            split_batch_response(text, 2).unwrap(),
+            vec!["# One".to_string(), "[]".to_string()]
+        );
+    }
+
+    #[test]
+    fn batches_respect_item_and_size_limits() {
+        assert_eq!(
+            plan_batches(&[1, 1, 1, 1, 1], 2, 100),
+            vec![0..2, 2..4, 4..5]
+        );
+        assert_eq!(
+            plan_batches(&[40, 40, 40, 200, 10], 10, 100),
+            vec![0..2, 2..3, 3..4, 4..5]
+        );
+        assert!(plan_batches(&[], 4, 100).is_empty());
+    }
+
+    #[test]
+    fn json_batch_sections_are_unfenced_and_validated() {
+        let operation = ConversionOperation::MarkdownToJson;
+        assert_eq!(
+            operation.batch_section("```json\n[{\"a\": 1}]\n```".into()),
+            Some("[{\"a\": 1}]".to_string())
+        );
+        assert_eq!(operation.batch_section("[]".into()), Some("[]".to_string()));
+        assert!(operation
+            .batch_section("```\nnot json\n```".into())
+            .is_none());
+    }
+
+    #[test]
+    fn rejects_missing_or_reordered_sections() {
+        assert!(split_batch_response("<<<ITEM 1>>>\nonly", 2).is_none());
+        assert!(split_batch_response("<<<ITEM 2>>>\na\n<<<ITEM 1>>>\nb", 2).is_none());
+    }
+}
@@ -118,12 +118,12 @@ pub trait Normalizer: Send + Sync {
 
     fn normalize(&mut self, assets: &[Asset], pdf_mode: PdfMode) -> anyhow::Result<Vec<Asset>>;
 
-    fn chunk_descriptors(&self) -> Vec<Value> {
-        Vec::new()
+    fn chunk_descriptors(&self) -> &[Value] {
+        &[]
     }
 
-    fn artifact_paths(&self) -> Vec<PathBuf> {
-        Vec::new()
+    fn artifact_paths(&self) -> &[PathBuf] {
+        &[]
     }
 }
 
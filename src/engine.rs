@@ -1,10 +1,14 @@
 use std::collections::{HashMap, HashSet};
 use std::fs;
 use std::path::{Path, PathBuf};
+use std::time::UNIX_EPOCH;
 
 use anyhow::{anyhow, Result};
+use rayon::prelude::*;
 use serde_json::{json, Map, Value};
+use sha2::{Digest, Sha256};
 use tokio::sync::mpsc::UnboundedSender;
+use tracing::warn;
 
 use crate::config::AppConfig;
 use crate::conversion::LatexConverter;
@@ -12,13 +16,14 @@ use crate::core::{
     Asset, Ingestor, Job, Kind, Normalizer, OutputFormat, PromptStrategy, Provider, Writer,
 };
 use crate::cost::CostEstimator;
+use crate::ingest::resolve_job_root;
 use crate::pdf;
 use crate::progress::{Progress, ProgressScope, ProgressStage};
 use crate::prompts::TemplatePromptStrategy;
 use crate::render::subtitles::SubtitleExporter;
 use crate::telemetry::RunMonitor;
 use crate::templates::TemplateLoader;
-use crate::utils::ensure_dir;
+use crate::utils::{ensure_dir, write_atomic};
 
 pub struct Engine {
     pub ingestor: Box<dyn Ingestor>,
@@ -32,6 +37,7 @@ pub struct Engine {
     pub progress: UnboundedSender<Progress>,
     converter: Option<LatexConverter>,
     templates: TemplateLoader,
+    after_normalize: Option<Box<dyn FnOnce() + Send>>,
 }
 
 impl Engine {
@@ -48,13 +54,7 @@ impl Engine {
     ) -> Result<Self> {
         let loader = TemplateLoader::new(config.templates_dir.clone());
         let mut prompts = HashMap::new();
-        for kind in [
-            Kind::Slides,
-            Kind::Lecture,
-            Kind::Document,
-            Kind::Image,
-            Kind::Video,
-        ] {
+        for kind in ALL_KINDS {
             prompts.insert(
                 kind,
                 Box::new(TemplatePromptStrategy::new(loader.clone(), kind)) as _,
@@ -72,14 +72,27 @@ impl Engine {
             progress,
             converter,
             templates: loader,
+            after_normalize: None,
         })
     }
 
+    /// Runs `hook` once this job's own normalization has finished, so work
+    /// started there (the next job's normalization) never overlaps it.
+    pub fn with_after_normalize(mut self, hook: Box<dyn FnOnce() + Send>) -> Self {
+        self.after_normalize = Some(hook);
+        self
+    }
+
     pub async fn run(&mut self, job: &Job) -> Result<Option<PathBuf>> {
         self.normalizer.prepare(job)?;
 
         let job_label = job.job_label.clone();
         let job_id = job.job_id.clone();
+        let job_scope = ProgressScope::Job {
+            id: job_id.clone(),
+            label: job_label.clone(),
+        };
+        let source_stem = source_stem(job);
 
         // Run-level start (single job today, but keep structure for future multi-job runs).
         self.emit(Progress {
@@ -91,6 +104,8 @@ impl Engine {
             finished: false,
         });
 
+        let needs_folder = needs_folder(job);
+
         // Discover
         let assets = self.ingestor.discover(job)?;
         if assets.is_empty() {
@@ -98,15 +113,29 @@ impl Engine {
                 .note_event("discover.empty", json!({"source": job.source.clone()}));
             return Ok(None);
         }
+        if let Some(existing) = up_to_date_output(job, &assets, &self.templates) {
+            self.monitor.note_event(
+                "skip.existing",
+                json!({"source": job.source.clone(), "path": existing}),
+            );
+            self.emit(Progress {
+                scope: job_scope.clone(),
+                stage: ProgressStage::Write,
+                current: 1,
+                total: 1,
+                status: "up to date".into(),
+                finished: true,
+            });
+            return Ok(Some(existing));
+        }
+        // Taken before any work so that a source edited mid-run is redone next time.
+        let fingerprint = job_fingerprint(job, &assets, &self.templates);
         let discover_total = assets.len() as u64;
         let media_summary = media_summary(&assets);
 
         // For single-job single-chunk scenario we drive the single bar through phases; for chunked we keep run bar static until job completion.
         self.emit(Progress {
-            scope: ProgressScope::Job {
-                id: job_id.clone(),
-                label: job_label.clone(),
-            },
+            scope: job_scope.clone(),
             stage: ProgressStage::Discover,
             current: discover_total,
             total: discover_total,
@@ -118,10 +147,7 @@ impl Engine {
 
         // Normalize
         self.emit(Progress {
-            scope: ProgressScope::Job {
-                id: job_id.clone(),
-                label: job_label.clone(),
-            },
+            scope: job_scope.clone(),
             stage: ProgressStage::Normalize,
             current: 0,
             total: assets.len() as u64,
@@ -129,13 +155,13 @@ impl Engine {
             finished: false,
         });
         let normalized = self.normalizer.normalize(&assets, job.pdf_mode)?;
+        if let Some(hook) = self.after_normalize.take() {
+            hook();
+        }
         let normalize_total = normalized.len() as u64;
         let page_total = estimate_page_total(&normalized);
         self.emit(Progress {
-            scope: ProgressScope::Job {
-                id: job_id.clone(),
-                label: job_label.clone(),
-            },
+            scope: job_scope.clone(),
             stage: ProgressStage::Normalize,
             current: normalize_total,
             total: normalize_total,
@@ -157,20 +183,11 @@ impl Engine {
             });
         }
         let modality = modality_for(&normalized);
+        let max_output_tokens = max_output_tokens_for(modality, &normalized);
 
         let output_format = job.format;
-        let needs_folder = job.save_metadata
-            || job.save_full_response
-            || job.save_intermediates
-            || !job.export.is_empty();
-
-        let mut output_name = format!(
-            "{}-transcribed",
-            Path::new(&job.source)
-                .file_stem()
-                .and_then(|s| s.to_str())
-                .unwrap_or("output")
-        );
+
+        let mut output_name = format!("{source_stem}-transcribed");
         let base_root = job.output_dir.clone().unwrap_or_else(|| PathBuf::from("."));
         let mut base_dir = if needs_folder {
             base_root.join(&output_name)
@@ -208,10 +225,7 @@ impl Engine {
 
         let segment_total = normalized.len() as u64;
         self.emit(Progress {
-            scope: ProgressScope::Job {
-                id: job_id.clone(),
-                label: job_label.clone(),
-            },
+            scope: job_scope.clone(),
             stage: ProgressStage::Transcribe,
             current: 0,
             total: segment_total,
@@ -236,6 +250,7 @@ impl Engine {
             "max_workers": job.max_workers,
             "max_video_workers": job.max_video_workers,
             "pdf_dpi": job.pdf_dpi,
+            "max_output_tokens": max_output_tokens,
             "job_id": job_id,
             "job_label": job_label,
         });
@@ -243,10 +258,7 @@ impl Engine {
             .provider
             .transcribe(&instruction, &normalized, modality, &meta)?;
         self.emit(Progress {
-            scope: ProgressScope::Job {
-                id: meta["job_id"].as_str().unwrap_or_default().to_string(),
-                label: meta["job_label"].as_str().unwrap_or_default().to_string(),
-            },
+            scope: job_scope.clone(),
             stage: ProgressStage::Transcribe,
             current: normalize_total,
             total: normalize_total,
@@ -255,10 +267,7 @@ impl Engine {
         });
 
         self.emit(Progress {
-            scope: ProgressScope::Job {
-                id: meta["job_id"].as_str().unwrap_or_default().to_string(),
-                label: meta["job_label"].as_str().unwrap_or_default().to_string(),
-            },
+            scope: job_scope.clone(),
             stage: ProgressStage::Write,
             current: 0,
             total: 1,
@@ -269,10 +278,7 @@ impl Engine {
             self.writer
                 .write(output_format, &base_dir, &output_name, &preamble, &text)?;
         self.emit(Progress {
-            scope: ProgressScope::Job {
-                id: meta["job_id"].as_str().unwrap_or_default().to_string(),
-                label: meta["job_label"].as_str().unwrap_or_default().to_string(),
-            },
+            scope: job_scope.clone(),
             stage: ProgressStage::Write,
             current: 1,
             total: 1,
@@ -291,16 +297,14 @@ impl Engine {
             extra_files.push(full_path);
         }
         if let Some(subtitles) = &self.subtitles {
-            if !job.export.is_empty() {
-                let chunks = self.normalizer.chunk_descriptors();
-                for fmt in &job.export {
-                    if let Some(path) =
-                        subtitles.write(fmt, &base_dir, &output_name, &text, &chunks)?
-                    {
-                        extra_files.push(path);
-                    }
-                }
-            }
+            let chunks = self.normalizer.chunk_descriptors();
+            extra_files.extend(subtitles.write_all(
+                &job.export,
+                &base_dir,
+                &output_name,
+                &text,
+                chunks,
+            )?);
         }
 
         match output_format {
@@ -430,10 +434,9 @@ impl Engine {
             }
         }
 
-        let artifacts = self.normalizer.artifact_paths();
         let mut files = vec![output_path.clone()];
-        files.extend(artifacts.clone());
-        files.extend(extra_files.clone());
+        files.extend_from_slice(self.normalizer.artifact_paths());
+        files.extend(extra_files);
 
         self.provider.cleanup()?;
 
@@ -462,6 +465,25 @@ impl Engine {
             )?;
         }
 
+        // A transcript cut off at the output cap is kept for inspection but
+        // never stamped, so the next run transcribes it again.
+        let stamp = json!({"source": job.source.clone(), "fingerprint": fingerprint});
+        if self.monitor.has_note("generate.truncated") {
+            warn!(
+                target: "recapit::engine",
+                "{} is incomplete: a reply hit the output cap",
+                output_path.display()
+            );
+            let _ = fs::remove_file(stamp_path(&output_path));
+        } else if let Err(err) =
+            write_atomic(&stamp_path(&output_path), stamp.to_string().as_bytes())
+        {
+            self.monitor.note_event(
+                "skip.stamp_error",
+                json!({"path": output_path, "error": err.to_string()}),
+            );
+        }
+
         Ok(Some(output_path))
     }
 
@@ -470,6 +492,151 @@ impl Engine {
     }
 }
 
+const ALL_KINDS: [Kind; 5] = [
+    Kind::Slides,
+    Kind::Lecture,
+    Kind::Document,
+    Kind::Image,
+    Kind::Video,
+];
+
+/// With `--skip-existing`, returns the transcript a previous run wrote for
+/// this job when the stamp saved beside it records the same discovered
+/// assets and settings, so the rest of the pipeline can be skipped.
+pub fn up_to_date_output(
+    job: &Job,
+    assets: &[Asset],
+    templates: &TemplateLoader,
+) -> Option<PathBuf> {
+    if !job.skip_existing {
+        return None;
+    }
+    let target = default_output_path(job);
+    let stamp: Value = serde_json::from_slice(&fs::read(stamp_path(&target)).ok()?).ok()?;
+    let recorded = stamp.get("fingerprint").and_then(Value::as_str)?;
+    (target.is_file() && recorded == job_fingerprint(job, assets, templates)).then_some(target)
+}
+
+/// Where the writer puts this job's transcript when nothing is renamed.
+fn default_output_path(job: &Job) -> PathBuf {
+    let name = format!("{}-transcribed", source_stem(job));
+    let extension = match job.format {
+        OutputFormat::Markdown => "md",
+        OutputFormat::Latex => "tex",
+    };
+    let mut target = job.output_dir.clone().unwrap_or_else(|| PathBuf::from("."));
+    if needs_folder(job) {
+        target.push(&name);
+    }
+    target.push(format!("{name}.{extension}"));
+    target
+}
+
+fn source_stem(job: &Job) -> &str {
+    Path::new(&job.source)
+        .file_stem()
+        .and_then(|s| s.to_str())
+        .unwrap_or("output")
+}
+
+fn needs_folder(job: &Job) -> bool {
+    job.save_metadata || job.save_full_response || job.save_intermediates || !job.export.is_empty()
+}
+
+/// Directories this job writes into that sit strictly inside its source
+/// tree: the transcript folder (or output directory) and the normalizer's
+/// working root.
+fn excluded_roots(job: &Job) -> Vec<PathBuf> {
+    let Ok(source) = fs::canonicalize(&job.source) else {
+        return Vec::new();
+    };
+    let mut roots: Vec<PathBuf> = default_output_path(job)
+        .parent()
+        .map(Path::to_path_buf)
+        .into_iter()
+        .collect();
+    if let Some(output_dir) = &job.output_dir {
+        roots.push(output_dir.clone());
+        roots.push(resolve_job_root(job, output_dir));
+    }
+    roots
+        .into_iter()
+        .filter_map(|root| fs::canonicalize(root).ok())
+        .filter(|root| root != &source && root.starts_with(&source))
+        .collect()
+}
+
+fn stamp_path(output: &Path) -> PathBuf {
+    let name = output
+        .file_name()
+        .map(|name| name.to_string_lossy().into_owned())
+        .unwrap_or_default();
+    output.with_file_name(format!(".{name}.recapit.json"))
+}
+
+/// Hashes everything that decides a transcript's content: the assets
+/// discovery returned (path, size and mtime, plus the URL and its cache
+/// validators for downloads) and the settings and prompts of the job.
+/// Assets under this job's own output or working directories are left out,
+/// so a run writing inside its source tree does not change its fingerprint.
+fn job_fingerprint(job: &Job, assets: &[Asset], templates: &TemplateLoader) -> String {
+    let excluded = excluded_roots(job);
+    let mut entries: Vec<String> = assets
+        .iter()
+        .filter_map(|asset| {
+            let path = fs::canonicalize(&asset.path).unwrap_or_else(|_| asset.path.clone());
+            if excluded.iter().any(|root| path.starts_with(root)) {
+                return None;
+            }
+            let (size, modified) = fs::metadata(&path)
+                .map(|meta| {
+                    let modified = meta
+                        .modified()
+                        .ok()
+                        .and_then(|time| time.duration_since(UNIX_EPOCH).ok())
+                        .map_or(0, |elapsed| elapsed.as_nanos());
+                    (meta.len(), modified)
+                })
+                .unwrap_or((0, 0));
+            let remote = ["url", "etag", "last_modified"]
+                .map(|key| asset.meta.get(key).and_then(Value::as_str).unwrap_or(""));
+            Some(format!(
+                "{}\t{size}\t{modified}\t{}\n",
+                path.display(),
+                remote.join("\t")
+            ))
+        })
+        .collect();
+    entries.sort();
+
+    let mut hasher = Sha256::new();
+    hasher.update(job.source.as_bytes());
+    for entry in entries {
+        hasher.update(entry.as_bytes());
+    }
+    hasher.update(
+        format!(
+            "\n{}|{:?}|{:?}|{:?}|{}|{:?}|{:?}|{}\n",
+            job.model,
+            job.preset,
+            job.kind,
+            job.pdf_mode,
+            job.format.as_str(),
+            job.page_selection,
+            job.media_resolution,
+            job.pdf_dpi
+        )
+        .as_bytes(),
+    );
+    for kind in ALL_KINDS {
+        let prompt = TemplatePromptStrategy::new(templates.clone(), kind);
+        let preamble = prompt.preamble(job.format);
+        hasher.update(preamble.as_bytes());
+        hasher.update(prompt.instruction(job.format, &preamble).as_bytes());
+    }
+    hex::encode(hasher.finalize())
+}
+
 fn media_summary(assets: &[Asset]) -> String {
     let mut counts: HashMap<String, u64> = HashMap::new();
     for asset in assets {
@@ -526,19 +693,18 @@ fn estimate_page_total(assets: &[Asset]) -> Option<u64> {
         return Some(page_indexes.len() as u64);
     }
 
-    let mut seen: HashSet<PathBuf> = HashSet::new();
-    let mut max_pages = None;
-    for asset in assets {
-        if asset.media == "pdf" && seen.insert(asset.path.clone()) {
-            if let Ok(count) = pdf::page_count(&asset.path) {
-                let count = count as u64;
-                if max_pages.is_none_or(|current| count > current) {
-                    max_pages = Some(count);
-                }
-            }
-        }
-    }
-    max_pages
+    // pdfinfo only reads the xref and page tree, so each lookup is cheap; the
+    // cost is the process spawn, which is overlapped across distinct files.
+    let mut seen: HashSet<&Path> = HashSet::new();
+    let pdfs: Vec<&Path> = assets
+        .iter()
+        .filter(|asset| asset.media == "pdf" && seen.insert(asset.path.as_path()))
+        .map(|asset| asset.path.as_path())
+        .collect();
+    pdfs.par_iter()
+        .filter_map(|path| pdf::page_count(path).ok())
+        .map(|count| count as u64)
+        .max()
 }
 
 fn infer_kind(assets: &[Asset]) -> Kind {
@@ -552,6 +718,26 @@ fn infer_kind(assets: &[Asset]) -> Kind {
     Kind::Document
 }
 
+/// Per-request output cap so one runaway completion cannot drain the TPM
+/// budget. Image requests carry every page at once, so they scale per page;
+/// video is transcribed one chunk per request. Thinking tokens share the cap.
+fn max_output_tokens_for(modality: &str, assets: &[Asset]) -> u32 {
+    use crate::constants::{
+        IMAGE_OUTPUT_TOKENS_PER_PAGE, MAX_OUTPUT_TOKENS, MIN_IMAGE_OUTPUT_TOKENS,
+        THINKING_TOKEN_HEADROOM, VIDEO_OUTPUT_TOKENS_PER_CHUNK,
+    };
+    let transcript = match modality {
+        "image" => (assets.len() as u32)
+            .saturating_mul(IMAGE_OUTPUT_TOKENS_PER_PAGE)
+            .max(MIN_IMAGE_OUTPUT_TOKENS),
+        "video" => VIDEO_OUTPUT_TOKENS_PER_CHUNK,
+        _ => return MAX_OUTPUT_TOKENS,
+    };
+    transcript
+        .saturating_add(THINKING_TOKEN_HEADROOM)
+        .min(MAX_OUTPUT_TOKENS)
+}
+
 fn modality_for(assets: &[Asset]) -> &str {
     assets
         .first()
@@ -562,3 +748,125 @@ fn modality_for(assets: &[Asset]) -> &str {
         })
         .unwrap_or("image")
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::core::{PdfMode, SourceKind};
+
+    fn job_for(source: &Path, output_dir: &Path) -> Job {
+        Job {
+            source: source.display().to_string(),
+            job_label: "test".into(),
+            job_id: "test".into(),
+            job_index: 0,
+            job_total: 1,
+            recursive: true,
+            kind: None,
+            pdf_mode: PdfMode::Auto,
+            output_dir: Some(output_dir.to_path_buf()),
+            model: "gemini-2.5-flash".into(),
+            preset: None,
+            export: Vec::new(),
+            format: OutputFormat::Markdown,
+            skip_existing: true,
+            page_selection: None,
+            media_resolution: None,
+            save_full_response: false,
+            save_intermediates: false,
+            save_metadata: true,
+            max_workers: 1,
+            max_video_workers: 1,
+            pdf_dpi: 200,
+        }
+    }
+
+    fn asset(path: &Path, meta: Value) -> Asset {
+        Asset {
+            path: path.to_path_buf(),
+            media: "pdf".into(),
+            page_index: None,
+            source_kind: SourceKind::Local,
+            mime: None,
+            meta,
+        }
+    }
+
+    #[test]
+    fn fingerprint_ignores_files_written_inside_the_source_tree() {
+        let dir = tempfile::tempdir().unwrap();
+        let templates = TemplateLoader::new(dir.path().join("templates"));
+        let source = dir.path().join("course");
+        fs::create_dir_all(&source).unwrap();
+        let slides = source.join("slides.pdf");
+        fs::write(&slides, b"%PDF-1.4").unwrap();
+        let job = job_for(&source, &source);
+        let before = job_fingerprint(&job, &[asset(&slides, Value::Null)], &templates);
+
+        let transcript = default_output_path(&job);
+        fs::create_dir_all(transcript.parent().unwrap()).unwrap();
+        fs::write(&transcript, "# notes").unwrap();
+        let page = transcript.parent().unwrap().join("page-1.png");
+        fs::write(&page, b"png").unwrap();
+        let after = job_fingerprint(
+            &job,
+            &[asset(&slides, Value::Null), asset(&page, Value::Null)],
+            &templates,
+        );
+        assert_eq!(before, after);
+
+        fs::write(&slides, b"%PDF-1.4 edited").unwrap();
+        assert_ne!(
+            before,
+            job_fingerprint(&job, &[asset(&slides, Value::Null)], &templates)
+        );
+    }
+
+    #[test]
+    fn fingerprint_tracks_url_validators() {
+        let dir = tempfile::tempdir().unwrap();
+        let templates = TemplateLoader::new(dir.path().join("templates"));
+        let download = dir.path().join("cached.pdf");
+        fs::write(&download, b"%PDF-1.4").unwrap();
+        let job = job_for(Path::new("https://example.com/a.pdf"), dir.path());
+        let with_etag = |etag: &str| {
+            let meta = json!({"url": "https://example.com/a.pdf", "etag": etag});
+            job_fingerprint(&job, &[asset(&download, meta)], &templates)
+        };
+        assert_eq!(with_etag("\"v1\""), with_etag("\"v1\""));
+        assert_ne!(with_etag("\"v1\""), with_etag("\"v2\""));
+    }
+
+    #[test]
+    fn skips_only_with_a_matching_stamp() {
+        let dir = tempfile::tempdir().unwrap();
+        let templates = TemplateLoader::new(dir.path().join("templates"));
+        let slides = dir.path().join("slides.pdf");
+        fs::write(&slides, b"%PDF-1.4").unwrap();
+        let out = dir.path().join("out");
+        let job = job_for(&slides, &out);
+        let assets = [asset(&slides, Value::Null)];
+        let transcript = default_output_path(&job);
+        fs::create_dir_all(transcript.parent().unwrap()).unwrap();
+        fs::write(&transcript, "# notes").unwrap();
+        assert!(up_to_date_output(&job, &assets, &templates).is_none());
+
+        let stamp = json!({"fingerprint": job_fingerprint(&job, &assets, &templates)});
+        fs::write(stamp_path(&transcript), stamp.to_string()).unwrap();
+        assert_eq!(
+            up_to_date_output(&job, &assets, &templates),
+            Some(transcript.clone())
+        );
+
+        let other_model = Job {
+            model: "gemini-2.5-pro".into(),
+            ..job.clone()
+        };
+        assert!(up_to_date_output(&other_model, &assets, &templates).is_none());
+        let no_skip = Job {
+            skip_existing: false,
+            ..job
+        };
+        assert!(up_to_date_output(&no_skip, &assets, &templates).is_none());
+    }
+}
@@ -0,0 +1,115 @@
+use anyhow::{bail, Context, Result};
+use sha2::{Digest, Sha256};
+use std::path::{Path, PathBuf};
+use std::process::Command;
+
+use crate::utils::ensure_dir;
+
+/// Longest edge, in pixels, an image is sent at with `--media-resolution low`.
+pub const LOW_RES_IMAGE_EDGE: u32 = 1024;
+
+/// JPEG quality (ffmpeg `-q:v`, 2 is near-lossless) for scaled copies.
+const JPEG_QUALITY: &str = "2";
+
+/// Images are only scaled down when the job asks Gemini for low media
+/// resolution; every other setting sends them as they are.
+pub fn max_image_edge(media_resolution: Option<&str>) -> Option<u32> {
+    (media_resolution == Some("low")).then_some(LOW_RES_IMAGE_EDGE)
+}
+
+pub fn image_dimensions(path: &Path) -> Result<(u32, u32)> {
+    let output = Command::new("ffprobe")
+        .args([
+            "-v",
+            "error",
+            "-select_streams",
+            "v:0",
+            "-show_entries",
+            "stream=width,height",
+            "-of",
+            "csv=p=0:s=x",
+            path.to_str().unwrap(),
+        ])
+        .output()
+        .context("ffprobe invocation failed")?;
+    if !output.status.success() {
+        bail!("ffprobe failed with status {}", output.status);
+    }
+    let text = String::from_utf8_lossy(&output.stdout);
+    let (width, height) = text
+        .trim()
+        .split_once('x')
+        .and_then(|(w, h)| Some((w.parse().ok()?, h.parse().ok()?)))
+        .with_context(|| format!("ffprobe reported no dimensions for {}", path.display()))?;
+    Ok((width, height))
+}
+
+/// Writes a copy of `source` into `out_dir` whose longest edge is at most
+/// `max_edge`, keeping the aspect ratio. Returns `None` when the image is
+/// already small enough; a previously scaled copy newer than the source is
+/// reused.
+pub fn downscale_image(source: &Path, out_dir: &Path, max_edge: u32) -> Result<Option<PathBuf>> {
+    let (width, height) = image_dimensions(source)?;
+    let longest = width.max(height);
+    if longest <= max_edge {
+        return Ok(None);
+    }
+
+    let stem = source
+        .file_stem()
+        .map(|s| s.to_string_lossy().to_string())
+        .unwrap_or_else(|| "image".into());
+    let extension = match source
+        .extension()
+        .map(|ext| ext.to_string_lossy().to_ascii_lowercase())
+        .as_deref()
+    {
+        Some("jpg" | "jpeg") => "jpg",
+        _ => "png",
+    };
+    // Same-named images from different directories share `out_dir`, so the
+    // name carries a hash of the source path.
+    let source_key = std::fs::canonicalize(source).unwrap_or_else(|_| source.to_path_buf());
+    let digest = hex::encode(Sha256::digest(source_key.to_string_lossy().as_bytes()));
+    let dest = out_dir.join(format!("{stem}-{}-{max_edge}.{extension}", &digest[..12]));
+    if is_fresh(source, &dest) {
+        return Ok(Some(dest));
+    }
+
+    let scale = f64::from(max_edge) / f64::from(longest);
+    let scaled_width = ((f64::from(width) * scale).round() as u32).max(1);
+    let scaled_height = ((f64::from(height) * scale).round() as u32).max(1);
+    ensure_dir(out_dir)?;
+    let mut command = Command::new("ffmpeg");
+    command.args([
+        "-y",
+        "-i",
+        source.to_str().unwrap(),
+        "-vf",
+        &format!("scale={scaled_width}:{scaled_height}:flags=lanczos"),
+        "-frames:v",
+        "1",
+    ]);
+    if extension == "jpg" {
+        command.args(["-q:v", JPEG_QUALITY]);
+    }
+    let output = command.arg(dest.to_str().unwrap()).output()?;
+    if !output.status.success() {
+        bail!(
+            "ffmpeg failed while scaling {}: {}",
+            source.display(),
+            String::from_utf8_lossy(&output.stderr)
+        );
+    }
+    Ok(Some(dest))
+}
+
+fn is_fresh(source: &Path, dest: &Path) -> bool {
+    let (Ok(dest_meta), Ok(source_meta)) = (dest.metadata(), source.metadata()) else {
+        return false;
+    };
+    match (dest_meta.modified(), source_meta.modified()) {
+        (Ok(dest_time), Ok(source_time)) => dest_time >= source_time && dest_meta.len() > 0,
+        _ => false,
+    }
+}
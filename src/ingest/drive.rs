@@ -1,6 +1,7 @@
 use std::fs::{self, File};
-use std::io::copy;
+use std::io::{copy, BufWriter};
 use std::path::{Path, PathBuf};
+use std::sync::{Arc, Mutex};
 
 use anyhow::{anyhow, bail, Context, Result};
 use jsonwebtoken::{encode, Algorithm, EncodingKey, Header};
@@ -8,16 +9,28 @@ use reqwest::blocking::Client;
 use serde::{Deserialize, Serialize};
 use time::{Duration, OffsetDateTime};
 
+use super::media::classify_path;
 use crate::core::{Asset, Job, SourceKind};
-use crate::utils::ensure_dir;
+use crate::utils::{ensure_dir, write_atomic};
 use crate::video::sha256sum;
 
 const SCOPE: &str = "https://www.googleapis.com/auth/drive.readonly";
+const DOWNLOAD_BUFFER_BYTES: usize = 1024 * 1024;
+const TOKEN_LIFETIME_MINUTES: i64 = 55;
+const TOKEN_REFRESH_MARGIN_MINUTES: i64 = 5;
 
 #[derive(Debug, Clone)]
 pub struct DriveIngestor {
     cache_dir: PathBuf,
     client: Client,
+    session: Arc<Mutex<Option<DriveSession>>>,
+}
+
+#[derive(Debug)]
+struct DriveSession {
+    credentials: ServiceAccountCredentials,
+    token: String,
+    expires_at: OffsetDateTime,
 }
 
 impl DriveIngestor {
@@ -29,6 +42,7 @@ impl DriveIngestor {
             client: Client::builder()
                 .timeout(std::time::Duration::from_secs(120))
                 .build()?,
+            session: Arc::new(Mutex::new(None)),
         })
     }
 
@@ -45,18 +59,36 @@ impl DriveIngestor {
         if file_id.is_empty() {
             bail!("Drive URI missing file identifier");
         }
-        let destination = self.cache_dir.join(file_id);
-        if !destination.exists() {
-            let creds = ServiceAccountCredentials::load_from_env()?;
-            let token = creds.fetch_token(&self.client)?;
-            self.download_file(file_id, &destination, &token)?;
-        }
+        let token = self.access_token()?;
+        let remote = self.fetch_metadata(file_id, &token)?;
+        let destination = self.cache_path(file_id, &remote);
+        let sidecar = sidecar_path(&destination);
+        let cached =
+            read_sidecar(&sidecar).filter(|entry| entry.is_valid_for(&remote, &destination));
+        let sha256 = match cached {
+            Some(entry) => entry.sha256,
+            None => {
+                self.download_file(file_id, &destination, &token)?;
+                let entry = CacheEntry {
+                    md5: remote.md5_checksum.clone(),
+                    size: destination.metadata()?.len(),
+                    modified_time: remote.modified_time.clone(),
+                    version: remote.version.clone(),
+                    sha256: sha256sum(&destination)?,
+                };
+                if remote.has_revision_key() {
+                    write_atomic(&sidecar, &serde_json::to_vec_pretty(&entry)?)?;
+                }
+                entry.sha256
+            }
+        };
 
-        let media = infer_media(&destination);
-        let mime = guess_mime(&destination);
+        let (media, mime) =
+            classify_path(&destination).unwrap_or(("pdf", "application/octet-stream"));
         let meta = serde_json::json!({
             "drive_file_id": file_id,
-            "sha256": sha256sum(&destination)?,
+            "drive_md5": remote.md5_checksum,
+            "sha256": sha256,
             "size_bytes": destination.metadata().ok().map(|m| m.len()),
         });
         Ok(vec![Asset {
@@ -69,6 +101,59 @@ impl DriveIngestor {
         }])
     }
 
+    fn access_token(&self) -> Result<String> {
+        let mut session = self.session.lock().unwrap();
+        let now = OffsetDateTime::now_utc();
+        if let Some(active) = session.as_ref() {
+            if active.expires_at > now {
+                return Ok(active.token.clone());
+            }
+        }
+        let credentials = match session.take() {
+            Some(previous) => previous.credentials,
+            None => ServiceAccountCredentials::load_from_env()?,
+        };
+        let token = credentials.fetch_token(&self.client)?;
+        *session = Some(DriveSession {
+            credentials,
+            token: token.clone(),
+            expires_at: now
+                + Duration::minutes(TOKEN_LIFETIME_MINUTES - TOKEN_REFRESH_MARGIN_MINUTES),
+        });
+        Ok(token)
+    }
+
+    fn fetch_metadata(&self, file_id: &str, token: &str) -> Result<DriveMetadata> {
+        let url = format!("https://www.googleapis.com/drive/v3/files/{file_id}");
+        let response = self
+            .client
+            .get(url)
+            .query(&[("fields", "name,md5Checksum,size,modifiedTime,version")])
+            .bearer_auth(token)
+            .send()
+            .with_context(|| format!("Fetching Drive metadata for {file_id}"))?;
+        if !response.status().is_success() {
+            bail!(
+                "Drive metadata request failed with status {}",
+                response.status()
+            );
+        }
+        Ok(response.json()?)
+    }
+
+    fn cache_path(&self, file_id: &str, remote: &DriveMetadata) -> PathBuf {
+        let suffix = remote
+            .name
+            .as_deref()
+            .and_then(|name| Path::new(name).extension())
+            .map(|ext| format!(".{}", ext.to_string_lossy().to_lowercase()))
+            .unwrap_or_default();
+        match remote.md5_checksum.as_deref() {
+            Some(md5) => self.cache_dir.join(format!("{file_id}-{md5}{suffix}")),
+            None => self.cache_dir.join(format!("{file_id}{suffix}")),
+        }
+    }
+
     fn download_file(&self, file_id: &str, destination: &Path, token: &str) -> Result<()> {
         ensure_dir(destination.parent().unwrap_or_else(|| Path::new(".")))?;
         let url = format!("https://www.googleapis.com/drive/v3/files/{file_id}?alt=media");
@@ -81,14 +166,99 @@ impl DriveIngestor {
         if !response.status().is_success() {
             bail!("Drive download failed with status {}", response.status());
         }
-        let temp = destination.with_extension("part");
-        let mut file = File::create(&temp)?;
-        copy(&mut response, &mut file)?;
+        let temp = append_suffix(destination, ".part");
+        let written = File::create(&temp)
+            .map(|file| BufWriter::with_capacity(DOWNLOAD_BUFFER_BYTES, file))
+            .and_then(|mut writer| {
+                copy(&mut response, &mut writer)?;
+                writer
+                    .into_inner()
+                    .map_err(|err| err.into_error())?
+                    .sync_all()
+            });
+        if let Err(err) = written {
+            let _ = fs::remove_file(&temp);
+            return Err(err).with_context(|| format!("Writing Drive file {file_id}"));
+        }
         fs::rename(temp, destination)?;
         Ok(())
     }
 }
 
+#[derive(Debug, Deserialize)]
+#[serde(rename_all = "camelCase")]
+struct DriveMetadata {
+    name: Option<String>,
+    md5_checksum: Option<String>,
+    #[serde(default, deserialize_with = "deserialize_size")]
+    size: Option<u64>,
+    modified_time: Option<String>,
+    version: Option<String>,
+}
+
+impl DriveMetadata {
+    /// Google Docs exports and some uploads carry no `md5Checksum`; their
+    /// `modifiedTime` (with `version` when present) still pins a revision.
+    fn has_revision_key(&self) -> bool {
+        self.md5_checksum.is_some() || self.modified_time.is_some()
+    }
+}
+
+fn deserialize_size<'de, D>(deserializer: D) -> Result<Option<u64>, D::Error>
+where
+    D: serde::Deserializer<'de>,
+{
+    // Drive encodes int64 fields as JSON strings.
+    let raw: Option<String> = Option::deserialize(deserializer)?;
+    raw.map(|value| value.parse().map_err(serde::de::Error::custom))
+        .transpose()
+}
+
+#[derive(Debug, Serialize, Deserialize)]
+struct CacheEntry {
+    md5: Option<String>,
+    size: u64,
+    modified_time: Option<String>,
+    #[serde(default)]
+    version: Option<String>,
+    sha256: String,
+}
+
+impl CacheEntry {
+    fn is_valid_for(&self, remote: &DriveMetadata, path: &Path) -> bool {
+        if !remote.has_revision_key() || self.md5 != remote.md5_checksum {
+            return false;
+        }
+        if remote.md5_checksum.is_none()
+            && (self.modified_time != remote.modified_time || self.version != remote.version)
+        {
+            return false;
+        }
+        if remote.size.is_some_and(|size| size != self.size) {
+            return false;
+        }
+        File::open(path)
+            .and_then(|file| file.metadata())
+            .map(|meta| meta.len() == self.size)
+            .unwrap_or(false)
+    }
+}
+
+fn sidecar_path(path: &Path) -> PathBuf {
+    append_suffix(path, ".meta.json")
+}
+
+fn append_suffix(path: &Path, suffix: &str) -> PathBuf {
+    let mut name = path.as_os_str().to_owned();
+    name.push(suffix);
+    PathBuf::from(name)
+}
+
+fn read_sidecar(path: &Path) -> Option<CacheEntry> {
+    let bytes = fs::read(path).ok()?;
+    serde_json::from_slice(&bytes).ok()
+}
+
 #[derive(Debug, Deserialize)]
 struct ServiceAccountCredentials {
     client_email: String,
@@ -111,7 +281,9 @@ impl ServiceAccountCredentials {
             iss: &self.client_email,
             scope: SCOPE,
             aud: "https://oauth2.googleapis.com/token",
-            exp: now.saturating_add(Duration::minutes(55)).unix_timestamp(),
+            exp: now
+                .saturating_add(Duration::minutes(TOKEN_LIFETIME_MINUTES))
+                .unix_timestamp(),
             iat: now.unix_timestamp(),
         };
         let jwt = encode(
@@ -149,32 +321,55 @@ struct TokenResponse {
     access_token: String,
 }
 
-fn infer_media(path: &Path) -> &'static str {
-    let ext = path
-        .extension()
-        .map(|ext| ext.to_string_lossy().to_lowercase())
-        .unwrap_or_default();
-    match ext.as_str() {
-        "pdf" => "pdf",
-        "png" | "jpg" | "jpeg" | "gif" => "image",
-        "mp4" | "mov" | "mkv" => "video",
-        "mp3" | "wav" | "m4a" => "audio",
-        _ => "pdf",
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn remote(md5: Option<&str>, modified: Option<&str>, version: Option<&str>) -> DriveMetadata {
+        DriveMetadata {
+            name: Some("notes.pdf".into()),
+            md5_checksum: md5.map(Into::into),
+            size: None,
+            modified_time: modified.map(Into::into),
+            version: version.map(Into::into),
+        }
+    }
+
+    fn entry_for(remote: &DriveMetadata, size: u64) -> CacheEntry {
+        CacheEntry {
+            md5: remote.md5_checksum.clone(),
+            size,
+            modified_time: remote.modified_time.clone(),
+            version: remote.version.clone(),
+            sha256: String::new(),
+        }
+    }
+
+    #[test]
+    fn checksum_keys_the_cache_when_drive_has_one() {
+        let dir = tempfile::tempdir().unwrap();
+        let path = dir.path().join("notes.pdf");
+        fs::write(&path, b"pdf").unwrap();
+        let current = remote(Some("abc"), Some("2024-01-01T00:00:00Z"), Some("3"));
+        let entry = entry_for(&current, 3);
+        assert!(entry.is_valid_for(&current, &path));
+        assert!(!entry.is_valid_for(&remote(Some("def"), None, None), &path));
+        assert!(!entry_for(&current, 4).is_valid_for(&current, &path));
     }
-}
 
-fn guess_mime(path: &Path) -> &'static str {
-    let ext = path
-        .extension()
-        .map(|ext| ext.to_string_lossy().to_lowercase())
-        .unwrap_or_default();
-    match ext.as_str() {
-        "pdf" => "application/pdf",
-        "png" => "image/png",
-        "jpg" | "jpeg" => "image/jpeg",
-        "gif" => "image/gif",
-        "mp4" | "mov" | "mkv" => "video/mp4",
-        "mp3" | "wav" | "m4a" => "audio/mpeg",
-        _ => "application/octet-stream",
+    #[test]
+    fn files_without_checksum_fall_back_to_modified_time_and_version() {
+        let dir = tempfile::tempdir().unwrap();
+        let path = dir.path().join("notes.pdf");
+        fs::write(&path, b"pdf").unwrap();
+        let current = remote(None, Some("2024-01-01T00:00:00Z"), Some("7"));
+        let entry = entry_for(&current, 3);
+        assert!(entry.is_valid_for(&current, &path));
+        let edited = remote(None, Some("2024-02-01T00:00:00Z"), Some("8"));
+        assert!(!entry.is_valid_for(&edited, &path));
+        let bumped = remote(None, Some("2024-01-01T00:00:00Z"), Some("8"));
+        assert!(!entry.is_valid_for(&bumped, &path));
+        let unknown = remote(None, None, None);
+        assert!(!entry_for(&unknown, 3).is_valid_for(&unknown, &path));
     }
 }
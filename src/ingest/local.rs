@@ -3,26 +3,10 @@ use std::path::{Path, PathBuf};
 
 use anyhow::Result;
 
+use super::media::classify_path;
 use crate::core::{Asset, Job, SourceKind};
 use crate::utils::slugify;
 
-const MEDIA_BY_SUFFIX: &[(&str, &str)] = &[
-    (".pdf", "pdf"),
-    (".png", "image"),
-    (".jpg", "image"),
-    (".jpeg", "image"),
-    (".tif", "image"),
-    (".tiff", "image"),
-    (".bmp", "image"),
-    (".gif", "image"),
-    (".mp4", "video"),
-    (".mov", "video"),
-    (".mkv", "video"),
-    (".mp3", "audio"),
-    (".wav", "audio"),
-    (".m4a", "audio"),
-];
-
 pub struct LocalIngestor;
 
 impl Default for LocalIngestor {
@@ -72,15 +56,7 @@ impl LocalIngestor {
     }
 
     fn asset_from_path(&self, path: &Path) -> Option<Asset> {
-        let extension = path.extension()?.to_string_lossy().to_lowercase();
-        let media = MEDIA_BY_SUFFIX
-            .iter()
-            .find(|(suffix, _)| {
-                suffix
-                    .trim_start_matches('.')
-                    .eq_ignore_ascii_case(&extension)
-            })
-            .map(|(_, media)| *media)?;
+        let (media, _) = classify_path(path)?;
         Some(Asset {
             path: path.to_path_buf(),
             media: media.to_string(),
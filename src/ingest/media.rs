@@ -0,0 +1,25 @@
+/// Maps a lowercase file extension (without the dot) to its media bucket and
+/// the MIME type sent to Gemini.
+pub fn classify_extension(ext: &str) -> Option<(&'static str, &'static str)> {
+    let entry = match ext {
+        "pdf" => ("pdf", "application/pdf"),
+        "png" => ("image", "image/png"),
+        "jpg" | "jpeg" => ("image", "image/jpeg"),
+        "gif" => ("image", "image/gif"),
+        "tif" | "tiff" => ("image", "image/tiff"),
+        "bmp" => ("image", "image/bmp"),
+        "mp4" | "mov" | "mkv" => ("video", "video/mp4"),
+        "mp3" | "wav" | "m4a" => ("audio", "audio/mpeg"),
+        _ => return None,
+    };
+    Some(entry)
+}
+
+pub fn classify_path(path: &std::path::Path) -> Option<(&'static str, &'static str)> {
+    let ext = path.extension()?.to_str()?;
+    if ext.bytes().any(|byte| byte.is_ascii_uppercase()) {
+        classify_extension(&ext.to_ascii_lowercase())
+    } else {
+        classify_extension(ext)
+    }
+}
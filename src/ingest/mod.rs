@@ -1,17 +1,22 @@
 mod drive;
 mod local;
+mod media;
 mod normalize;
 mod url;
 mod youtube;
 
 pub use drive::DriveIngestor;
 pub use local::LocalIngestor;
-pub use normalize::CompositeNormalizer;
-pub use url::UrlIngestor;
+pub use normalize::{resolve_job_root, CompositeNormalizer, PrefetchedNormalizer};
+pub use url::{url_cache_dirs, UrlIngestor};
 pub use youtube::YouTubeIngestor;
 
+use std::sync::Mutex;
+
 use ::url::Url;
 use anyhow::Result;
+use rayon::prelude::*;
+use rayon::ThreadPoolBuilder;
 
 use crate::core::{Asset, Ingestor, Job};
 
@@ -31,6 +36,20 @@ impl CompositeIngestor {
             drive: DriveIngestor::new(None)?,
         })
     }
+
+    /// Discovers every job concurrently; results are returned in job order.
+    /// Discovery is mostly network and subprocess waits, so it runs on its own
+    /// pool of up to `workers` threads rather than the CPU-sized global one.
+    pub fn discover_all(&self, jobs: &[Job], workers: usize) -> Vec<Result<Vec<Asset>>> {
+        let discover = || jobs.par_iter().map(|job| self.discover(job)).collect();
+        match ThreadPoolBuilder::new()
+            .num_threads(workers.clamp(1, jobs.len().max(1)))
+            .build()
+        {
+            Ok(pool) => pool.install(discover),
+            Err(_) => discover(),
+        }
+    }
 }
 
 impl Default for CompositeIngestor {
@@ -41,16 +60,18 @@ impl Default for CompositeIngestor {
 
 impl Ingestor for CompositeIngestor {
     fn discover(&self, job: &Job) -> Result<Vec<Asset>> {
+        // The source is parsed once here and handed to the URL-based
+        // ingestors rather than each of them parsing it again.
         let parsed = Url::parse(&job.source);
         if let Ok(url) = parsed {
             match url.scheme() {
                 "http" | "https" => {
                     if self.youtube.supports(&url) {
-                        return self.youtube.discover(job);
+                        return self.youtube.discover_url(&url);
                     }
-                    return self.url.discover(job);
+                    return self.url.discover_url(job, &url);
                 }
-                "yt" | "youtube" => return self.youtube.discover(job),
+                "yt" | "youtube" => return self.youtube.discover_url(&url),
                 "drive" | "gdrive" => return self.drive.discover(job),
                 _ => {}
             }
@@ -60,3 +81,28 @@ impl Ingestor for CompositeIngestor {
         self.local.discover(job)
     }
 }
+
+/// Serves a discovery result computed ahead of time (see
+/// `CompositeIngestor::discover_all`), falling back to live discovery.
+pub struct PrefetchedIngestor {
+    inner: CompositeIngestor,
+    prefetched: Mutex<Option<Result<Vec<Asset>>>>,
+}
+
+impl PrefetchedIngestor {
+    pub fn new(inner: CompositeIngestor, prefetched: Option<Result<Vec<Asset>>>) -> Self {
+        Self {
+            inner,
+            prefetched: Mutex::new(prefetched),
+        }
+    }
+}
+
+impl Ingestor for PrefetchedIngestor {
+    fn discover(&self, job: &Job) -> Result<Vec<Asset>> {
+        match self.prefetched.lock().unwrap().take() {
+            Some(result) => result,
+            None => self.inner.discover(job),
+        }
+    }
+}
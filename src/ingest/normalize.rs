@@ -1,16 +1,22 @@
 use std::fs;
 use std::path::{Path, PathBuf};
+use std::thread::ScopedJoinHandle;
+use std::time::UNIX_EPOCH;
 
 use anyhow::{bail, Result};
+use rayon::prelude::*;
+use serde::{Deserialize, Serialize};
 use serde_json::{json, Map, Value};
+use sha2::{Digest, Sha256};
 use time::OffsetDateTime;
 use tracing::warn;
 
 use super::youtube::{YouTubeDownload, YouTubeDownloadError, YouTubeDownloader};
 use crate::constants::DEFAULT_PDF_DPI;
 use crate::core::{Asset, Job, PdfMode, SourceKind};
+use crate::image::{downscale_image, max_image_edge};
 use crate::pdf::pdf_to_png;
-use crate::utils::{ensure_dir, slugify};
+use crate::utils::{ensure_dir, slugify, write_atomic};
 use crate::video::{
     plan_video_chunks, probe_video, select_encoder_chain, sha256sum, VideoChunkPlan,
     VideoEncoderPreference, DEFAULT_MAX_CHUNK_BYTES, DEFAULT_MAX_CHUNK_SECONDS,
@@ -27,6 +33,7 @@ pub struct CompositeNormalizer {
     pdf_dpi: u32,
     supports: Box<dyn Fn(&str) -> bool + Send + Sync>,
     job: Option<Job>,
+    job_root: PathBuf,
     chunk_info: Vec<Value>,
     manifest_path: Option<PathBuf>,
     youtube_downloader: YouTubeDownloader,
@@ -43,9 +50,12 @@ impl CompositeNormalizer {
         pdf_dpi: Option<u32>,
         capability_checker: Option<Box<dyn Fn(&str) -> bool + Send + Sync>>,
     ) -> Result<Self> {
+        // Nothing is created here: chunk, page-image and `.cache` directories
+        // appear only once a video, rasterized PDF or downscaled image needs
+        // them, so text and as-is PDF jobs leave the video root alone.
         let video_root = video_root.unwrap_or_else(|| std::env::temp_dir().join("recapit-video"));
-        ensure_dir(&video_root)?;
         Ok(Self {
+            job_root: video_root.clone(),
             video_root,
             encoder_preference,
             max_chunk_seconds: max_chunk_seconds.unwrap_or(DEFAULT_MAX_CHUNK_SECONDS),
@@ -65,21 +75,85 @@ impl CompositeNormalizer {
         self.chunk_info.clear();
         self.manifest_path = None;
         let resolved = self.resolve_pdf_mode(pdf_mode)?;
+        // Only runs that shell out to ffmpeg/pdftoppm are worth caching, and
+        // only when every input has a local file to key the entry on.
+        let cache_path = if needs_normalize_cache(assets, resolved) {
+            self.normalize_cache_path(assets, resolved)
+        } else {
+            None
+        };
+        let Some(cache_path) = cache_path else {
+            return self.normalize_uncached(assets, resolved);
+        };
+        let skip_existing = self.job.as_ref().is_some_and(|job| job.skip_existing);
+        if skip_existing {
+            if let Some(cached) = read_normalize_cache(&cache_path) {
+                self.chunk_info = cached.chunk_info;
+                self.manifest_path = cached.manifest_path;
+                return Ok(cached.assets);
+            }
+        }
+        let normalized = self.normalize_uncached(assets, resolved)?;
+        let entry = NormalizeCache {
+            assets: normalized,
+            chunk_info: self.chunk_info.clone(),
+            manifest_path: self.manifest_path.clone(),
+        };
+        if let Err(err) = write_normalize_cache(&cache_path, &entry) {
+            warn!(
+                target: "recapit::normalize",
+                "Failed to write normalize cache {}: {}",
+                cache_path.display(),
+                err
+            );
+        }
+        Ok(entry.assets)
+    }
+
+    /// Normalizes assets independently (in parallel when there is more than
+    /// one) and stitches the results back together in input order.
+    fn normalize_uncached(&mut self, assets: &[Asset], resolved: PdfMode) -> Result<Vec<Asset>> {
+        let results: Vec<Result<(Vec<Asset>, Option<PathBuf>)>> = if assets.len() > 1 {
+            let this = &*self;
+            assets
+                .par_iter()
+                .map(|asset| this.normalize_asset(asset, resolved))
+                .collect()
+        } else {
+            assets
+                .iter()
+                .map(|asset| self.normalize_asset(asset, resolved))
+                .collect()
+        };
         let mut normalized = Vec::new();
-        for asset in assets {
-            match asset.media.as_str() {
-                "pdf" => normalized.extend(self.normalize_pdf(asset, resolved)?),
-                "video" | "audio" => normalized.extend(self.normalize_video(asset)?),
-                _ => normalized.push(asset.clone()),
+        for result in results {
+            let (outputs, manifest_path) = result?;
+            if manifest_path.is_some() {
+                self.chunk_info
+                    .extend(outputs.iter().map(|asset| asset.meta.clone()));
+                self.manifest_path = manifest_path;
             }
+            normalized.extend(outputs);
         }
         Ok(normalized)
     }
 
+    fn normalize_asset(
+        &self,
+        asset: &Asset,
+        resolved: PdfMode,
+    ) -> Result<(Vec<Asset>, Option<PathBuf>)> {
+        match asset.media.as_str() {
+            "pdf" => Ok((self.normalize_pdf(asset, resolved)?, None)),
+            "video" | "audio" => self.normalize_video(asset),
+            "image" => Ok((vec![self.normalize_image(asset)], None)),
+            _ => Ok((vec![asset.clone()], None)),
+        }
+    }
+
     fn normalize_pdf(&self, asset: &Asset, mode: PdfMode) -> Result<Vec<Asset>> {
         match mode {
-            PdfMode::Pdf => Ok(vec![asset.clone()]),
-            PdfMode::Auto => Ok(vec![asset.clone()]),
+            PdfMode::Pdf | PdfMode::Auto => Ok(vec![asset.clone()]),
             PdfMode::Images => {
                 let output_dir = self.pdf_output_dir(asset);
                 let prefix = asset
@@ -124,30 +198,112 @@ impl CompositeNormalizer {
         }
     }
 
-    fn pdf_output_dir(&self, asset: &Asset) -> PathBuf {
-        let slug = asset
-            .path
-            .file_stem()
-            .map(|s| slugify(s.to_string_lossy()))
-            .unwrap_or_else(|| "document".into());
-        self.job_root().join("page-images").join(slug)
-    }
-
-    fn job_root(&self) -> PathBuf {
-        if let Some(job) = &self.job {
-            if let Some(output_dir) = &job.output_dir {
-                let slug = if job.source.contains("://") {
-                    "remote".to_string()
-                } else {
-                    job.source
-                        .rsplit_once('/')
-                        .map(|(_, tail)| tail.to_string())
-                        .unwrap_or_else(|| job.source.clone())
-                };
-                return output_dir.join(slugify(slug));
+    /// With low media resolution, oversized images are scaled down before
+    /// upload; anything ffmpeg cannot read is passed through unchanged.
+    fn normalize_image(&self, asset: &Asset) -> Asset {
+        let media_resolution = self
+            .job
+            .as_ref()
+            .and_then(|job| job.media_resolution.as_deref());
+        let Some(max_edge) = max_image_edge(media_resolution) else {
+            return asset.clone();
+        };
+        let out_dir = self.job_root().join("images");
+        match downscale_image(&asset.path, &out_dir, max_edge) {
+            Ok(None) => asset.clone(),
+            Ok(Some(path)) => {
+                let mut scaled = asset.clone();
+                scaled.mime = mime_guess::from_path(&path)
+                    .first_raw()
+                    .map(|s| s.to_string());
+                if let Some(meta) = scaled.meta.as_object_mut() {
+                    meta.remove("inline_bytes");
+                    meta.insert("original_path".into(), json!(asset.path));
+                }
+                scaled.path = path;
+                scaled
+            }
+            Err(err) => {
+                warn!(
+                    target: "recapit::normalize",
+                    "Sending {} at full resolution: {}",
+                    asset.path.display(),
+                    err
+                );
+                asset.clone()
             }
         }
-        self.video_root.clone()
+    }
+
+    fn pdf_output_dir(&self, asset: &Asset) -> PathBuf {
+        self.job_root()
+            .join("page-images")
+            .join(asset_slug(&asset.path, "document"))
+    }
+
+    fn job_root(&self) -> &Path {
+        &self.job_root
+    }
+
+    /// Cache location keyed on every input that changes normalization output:
+    /// source stat (size + mtime, plus cache validators for downloads),
+    /// resolved PDF mode and the chunking knobs. `None` when an input has no
+    /// local file yet (an undownloaded YouTube video), since nothing about it
+    /// could tell a stale entry apart.
+    fn normalize_cache_path(&self, assets: &[Asset], mode: PdfMode) -> Option<PathBuf> {
+        let mut hasher = Sha256::new();
+        hasher.update(
+            format!(
+                "{mode:?}|{}|{}|{}|{:?}|{}|{:?}\n",
+                self.pdf_dpi,
+                self.max_chunk_seconds,
+                self.max_chunk_bytes,
+                self.token_limit,
+                self.tokens_per_second,
+                self.encoder_preference,
+            )
+            .as_bytes(),
+        );
+        if let Some(selection) = self
+            .job
+            .as_ref()
+            .and_then(|job| job.page_selection.as_ref())
+        {
+            hasher.update(format!("{selection:?}\n").as_bytes());
+        }
+        if let Some(edge) = self
+            .job
+            .as_ref()
+            .and_then(|job| max_image_edge(job.media_resolution.as_deref()))
+        {
+            hasher.update(format!("image-edge {edge}\n").as_bytes());
+        }
+        for asset in assets {
+            let meta = fs::metadata(&asset.path).ok()?;
+            let mtime_ns = meta
+                .modified()
+                .ok()
+                .and_then(|time| time.duration_since(UNIX_EPOCH).ok())
+                .map_or(0, |elapsed| elapsed.as_nanos());
+            let validators = ["etag", "last_modified"]
+                .map(|key| asset.meta.get(key).and_then(Value::as_str).unwrap_or(""));
+            hasher.update(
+                format!(
+                    "{}|{}|{}|{mtime_ns}|{}\n",
+                    asset.path.display(),
+                    asset.media,
+                    meta.len(),
+                    validators.join("|")
+                )
+                .as_bytes(),
+            );
+        }
+        let key = hex::encode(hasher.finalize());
+        Some(
+            self.job_root()
+                .join(".cache")
+                .join(format!("normalize-{}.json", &key[..16])),
+        )
     }
 
     fn resolve_pdf_mode(&self, requested: PdfMode) -> Result<PdfMode> {
@@ -163,7 +319,9 @@ impl CompositeNormalizer {
         Ok(requested)
     }
 
-    fn normalize_video(&mut self, asset: &Asset) -> Result<Vec<Asset>> {
+    /// Returns the chunk assets plus the manifest path; the manifest is absent
+    /// when the video is passed through untouched.
+    fn normalize_video(&self, asset: &Asset) -> Result<(Vec<Asset>, Option<PathBuf>)> {
         let realized = self.materialize_video(asset)?;
         if realized
             .meta
@@ -172,16 +330,11 @@ impl CompositeNormalizer {
             .and_then(|value| value.as_bool())
             .unwrap_or(false)
         {
-            return Ok(vec![realized]);
+            return Ok((vec![realized], None));
         }
 
         let job_root = self.job_root();
-        ensure_dir(&job_root)?;
-        let slug = realized
-            .path
-            .file_stem()
-            .map(|s| slugify(s.to_string_lossy()))
-            .unwrap_or_else(|| "video".into());
+        let slug = asset_slug(&realized.path, "video");
         let normalized_dir = job_root
             .join("pickles")
             .join("video-chunks")
@@ -189,55 +342,86 @@ impl CompositeNormalizer {
         ensure_dir(&normalized_dir)?;
 
         let encoder_specs = select_encoder_chain(self.encoder_preference);
-        let normalization =
-            crate::video::normalize_video(&realized.path, &normalized_dir, &encoder_specs)?;
-        let normalized_path = normalization.path.clone();
-        let metadata = probe_video(&normalized_path)?;
         let manifest_path = job_root.join("manifests").join(format!("{slug}.json"));
-
-        ensure_dir(manifest_path.parent().unwrap())?;
-        let chunk_plan = plan_video_chunks(
-            &metadata,
-            &normalized_path,
-            self.max_chunk_seconds,
-            self.max_chunk_bytes,
-            self.token_limit,
-            self.tokens_per_second,
-            &normalized_dir.join("chunks"),
-            self.job
-                .as_ref()
-                .map(|job| job.max_video_workers)
-                .unwrap_or(1),
-        )?;
-        self.write_manifest(&chunk_plan, &realized, &manifest_path)?;
-        self.manifest_path = Some(manifest_path.clone());
-
-        let chunk_total = chunk_plan.chunks.len();
-        let mut outputs = Vec::new();
-        for chunk in &chunk_plan.chunks {
-            let meta = json!({
-                "chunk_index": chunk.index,
-                "chunk_total": chunk_total,
-                "chunk_start_seconds": chunk.start_seconds,
-                "chunk_end_seconds": chunk.end_seconds,
-                "manifest_path": manifest_path,
-                "normalized_path": chunk_plan.normalized_path,
-                "source_video": realized.path,
-            });
-            outputs.push(Asset {
-                path: chunk.path.clone(),
-                media: "video".into(),
-                page_index: None,
-                source_kind: realized.source_kind,
-                mime: Some("video/mp4".into()),
-                meta: meta.clone(),
+        let previous = read_manifest(&manifest_path);
+        // Hashing is pure read throughput, so it runs on scoped threads while
+        // ffmpeg encodes and the chunks are cut instead of queueing after them.
+        // Files whose size and mtime match the previous manifest keep their
+        // recorded digest instead of being read again.
+        let (chunk_plan, source_hash, normalized_hash) = std::thread::scope(|scope| {
+            let previous = previous.as_ref();
+            let source_path = &realized.path;
+            let source_hash = scope.spawn(move || {
+                recorded_hash(previous, "source", source_path)
+                    .map_or_else(|| sha256sum(source_path), Ok)
             });
-            self.chunk_info.push(meta);
-        }
-        Ok(outputs)
+            let normalization =
+                crate::video::normalize_video(&realized.path, &normalized_dir, &encoder_specs)?;
+            let normalized_path = normalization.path;
+            let normalized_hash = {
+                let path = normalized_path.clone();
+                scope.spawn(move || {
+                    recorded_hash(previous, "normalized", &path)
+                        .map_or_else(|| sha256sum(&path), Ok)
+                })
+            };
+            let metadata = probe_video(&normalized_path)?;
+            let chunk_plan = plan_video_chunks(
+                &metadata,
+                &normalized_path,
+                self.max_chunk_seconds,
+                self.max_chunk_bytes,
+                self.token_limit,
+                self.tokens_per_second,
+                &normalized_dir.join("chunks"),
+                self.job
+                    .as_ref()
+                    .map(|job| job.max_video_workers)
+                    .unwrap_or(1),
+            )?;
+            Ok::<_, anyhow::Error>((
+                chunk_plan,
+                join_hash(source_hash)?,
+                join_hash(normalized_hash)?,
+            ))
+        })?;
+        self.write_manifest(
+            &chunk_plan,
+            &realized,
+            &manifest_path,
+            &source_hash,
+            &normalized_hash,
+            previous,
+        )?;
+
+        let shared = value_to_map(&json!({
+            "chunk_total": chunk_plan.chunks.len(),
+            "manifest_path": manifest_path,
+            "normalized_path": chunk_plan.normalized_path,
+            "source_video": realized.path,
+        }));
+        let outputs = chunk_plan
+            .chunks
+            .iter()
+            .map(|chunk| {
+                let mut meta = shared.clone();
+                meta.insert("chunk_index".into(), json!(chunk.index));
+                meta.insert("chunk_start_seconds".into(), json!(chunk.start_seconds));
+                meta.insert("chunk_end_seconds".into(), json!(chunk.end_seconds));
+                Asset {
+                    path: chunk.path.clone(),
+                    media: "video".into(),
+                    page_index: None,
+                    source_kind: realized.source_kind,
+                    mime: Some("video/mp4".into()),
+                    meta: Value::Object(meta),
+                }
+            })
+            .collect();
+        Ok((outputs, Some(manifest_path)))
     }
 
-    fn materialize_video(&mut self, asset: &Asset) -> Result<Asset> {
+    fn materialize_video(&self, asset: &Asset) -> Result<Asset> {
         if asset.source_kind != SourceKind::Youtube {
             return Ok(asset.clone());
         }
@@ -316,11 +500,39 @@ impl CompositeNormalizer {
         plan: &VideoChunkPlan,
         asset: &Asset,
         manifest_path: &Path,
+        source_hash: &str,
+        normalized_hash: &str,
+        mut existing: Option<Map<String, Value>>,
     ) -> Result<()> {
         ensure_dir(manifest_path.parent().unwrap())?;
-        let mut chunks = Vec::<Value>::new();
+        let source_hash = format!("sha256:{source_hash}");
+        let normalized_hash = format!("sha256:{normalized_hash}");
+        // Chunks cut from the same normalized bytes keep the provider's
+        // progress (status, saved response, uploaded file URI).
+        let mut carried: Vec<Option<&Map<String, Value>>> = vec![None; plan.chunks.len()];
+        let previous_chunks = existing
+            .as_ref()
+            .filter(|map| {
+                map.get("normalized_hash").and_then(Value::as_str) == Some(normalized_hash.as_str())
+            })
+            .and_then(|map| map.get("chunks"))
+            .and_then(Value::as_array);
+        for entry in previous_chunks
+            .into_iter()
+            .flatten()
+            .filter_map(Value::as_object)
+        {
+            let slot = entry
+                .get("index")
+                .and_then(Value::as_u64)
+                .and_then(|index| carried.get_mut(index as usize));
+            if let Some(slot) = slot {
+                *slot = Some(entry);
+            }
+        }
+        let mut chunks = Vec::<Value>::with_capacity(plan.chunks.len());
         for chunk in &plan.chunks {
-            chunks.push(json!({
+            let mut entry = json!({
                 "index": chunk.index,
                 "start_seconds": chunk.start_seconds,
                 "end_seconds": chunk.end_seconds,
@@ -328,10 +540,21 @@ impl CompositeNormalizer {
                 "end_iso": crate::video::seconds_to_iso(chunk.end_seconds),
                 "path": chunk.path,
                 "status": "pending",
-            }));
+            });
+            let previous = carried
+                .get(chunk.index)
+                .copied()
+                .flatten()
+                .filter(|prev| prev.get("path") == entry.get("path"));
+            if let Some(previous) = previous {
+                for key in ["status", "response_path", "file_uri"] {
+                    if let Some(value) = previous.get(key) {
+                        entry[key] = value.clone();
+                    }
+                }
+            }
+            chunks.push(entry);
         }
-        let source_hash = sha256sum(&asset.path)?;
-        let normalized_hash = sha256sum(&plan.normalized_path)?;
         let downloaded = asset
             .meta
             .as_object()
@@ -350,31 +573,43 @@ impl CompositeNormalizer {
             .and_then(|meta| meta.get("youtube_id"))
             .cloned()
             .unwrap_or(Value::Null);
-        let payload = json!({
+        let mut payload = json!({
             "version": 1,
             "source": asset.path,
-            "source_hash": format!("sha256:{source_hash}"),
+            "source_hash": source_hash,
+            "source_stamp": file_stamp(&asset.path),
             "source_kind": asset.source_kind,
             "source_url": source_url_value,
             "downloaded": downloaded,
             "youtube_id": youtube_id_value,
             "normalized": plan.normalized_path,
-            "normalized_hash": format!("sha256:{normalized_hash}"),
+            "normalized_hash": normalized_hash,
+            "normalized_stamp": file_stamp(&plan.normalized_path),
             "duration_seconds": plan.metadata.duration_seconds,
             "size_bytes": plan.metadata.size_bytes,
             "fps": plan.metadata.fps,
             "tokens_per_second": self.tokens_per_second,
-            "created_utc": OffsetDateTime::now_utc(),
-            "updated_utc": OffsetDateTime::now_utc(),
             "chunks": chunks,
         });
-        fs::write(manifest_path, serde_json::to_string_pretty(&payload)?)?;
+        let created = existing.as_mut().and_then(|map| map.remove("created_utc"));
+        if let (Some(existing), Value::Object(fresh)) = (existing.as_mut(), &payload) {
+            // Re-running an unchanged job leaves the manifest alone.
+            existing.remove("updated_utc");
+            if existing == fresh {
+                return Ok(());
+            }
+        }
+        let now = json!(OffsetDateTime::now_utc());
+        payload["created_utc"] = created.unwrap_or_else(|| now.clone());
+        payload["updated_utc"] = now;
+        write_atomic(manifest_path, &serde_json::to_vec_pretty(&payload)?)?;
         Ok(())
     }
 }
 
 impl crate::core::Normalizer for CompositeNormalizer {
     fn prepare(&mut self, job: &Job) -> Result<()> {
+        self.job_root = resolve_job_root(job, &self.video_root);
         self.job = Some(job.clone());
         Ok(())
     }
@@ -383,15 +618,160 @@ impl crate::core::Normalizer for CompositeNormalizer {
         self.normalize_inner(assets, pdf_mode)
     }
 
-    fn chunk_descriptors(&self) -> Vec<Value> {
-        self.chunk_info.clone()
+    fn chunk_descriptors(&self) -> &[Value] {
+        &self.chunk_info
     }
 
-    fn artifact_paths(&self) -> Vec<PathBuf> {
-        self.manifest_path.clone().into_iter().collect()
+    fn artifact_paths(&self) -> &[PathBuf] {
+        self.manifest_path.as_slice()
     }
 }
 
+/// Wraps a normalizer whose `prepare` + `normalize` already ran ahead of time
+/// (overlapped with the previous job), replaying that result once.
+pub struct PrefetchedNormalizer {
+    inner: CompositeNormalizer,
+    prefetched: Option<Result<Vec<Asset>>>,
+}
+
+impl PrefetchedNormalizer {
+    pub fn new(inner: CompositeNormalizer, prefetched: Option<Result<Vec<Asset>>>) -> Self {
+        Self { inner, prefetched }
+    }
+}
+
+impl crate::core::Normalizer for PrefetchedNormalizer {
+    fn prepare(&mut self, job: &Job) -> Result<()> {
+        if self.prefetched.is_some() {
+            return Ok(());
+        }
+        self.inner.prepare(job)
+    }
+
+    fn normalize(&mut self, assets: &[Asset], pdf_mode: PdfMode) -> Result<Vec<Asset>> {
+        match self.prefetched.take() {
+            Some(result) => result,
+            None => self.inner.normalize(assets, pdf_mode),
+        }
+    }
+
+    fn chunk_descriptors(&self) -> &[Value] {
+        self.inner.chunk_descriptors()
+    }
+
+    fn artifact_paths(&self) -> &[PathBuf] {
+        self.inner.artifact_paths()
+    }
+}
+
+#[derive(Serialize, Deserialize)]
+struct NormalizeCache {
+    assets: Vec<Asset>,
+    chunk_info: Vec<Value>,
+    manifest_path: Option<PathBuf>,
+}
+
+/// Whether normalizing `assets` runs ffmpeg or pdftoppm at all; images and
+/// PDFs sent as-is are cheaper to redo than to cache.
+fn needs_normalize_cache(assets: &[Asset], mode: PdfMode) -> bool {
+    assets.iter().any(|asset| match asset.media.as_str() {
+        "video" | "audio" => true,
+        "pdf" => mode == PdfMode::Images,
+        _ => false,
+    })
+}
+
+fn read_normalize_cache(path: &Path) -> Option<NormalizeCache> {
+    let bytes = fs::read(path).ok()?;
+    let cached: NormalizeCache = serde_json::from_slice(&bytes).ok()?;
+    let complete = cached.assets.iter().all(|asset| {
+        let pass_through = asset
+            .meta
+            .get("pass_through")
+            .and_then(Value::as_bool)
+            .unwrap_or(false);
+        pass_through || asset.path.exists()
+    }) && cached
+        .manifest_path
+        .as_ref()
+        .is_none_or(|path| path.exists());
+    complete.then_some(cached)
+}
+
+fn write_normalize_cache(path: &Path, entry: &NormalizeCache) -> Result<()> {
+    ensure_dir(path.parent().unwrap())?;
+    write_atomic(path, &serde_json::to_vec(entry)?)?;
+    Ok(())
+}
+
+/// Working-directory name for one source: its slugified stem plus a short
+/// hash of its canonical path, so same-named files from different
+/// directories (normalized in parallel, or by overlapping jobs sharing a
+/// root) never write into the same place.
+fn asset_slug(path: &Path, fallback: &str) -> String {
+    let stem = path
+        .file_stem()
+        .map(|s| slugify(s.to_string_lossy()))
+        .unwrap_or_else(|| fallback.into());
+    let key = fs::canonicalize(path).unwrap_or_else(|_| path.to_path_buf());
+    let digest = hex::encode(Sha256::digest(key.to_string_lossy().as_bytes()));
+    format!("{stem}-{}", &digest[..12])
+}
+
+pub fn resolve_job_root(job: &Job, video_root: &Path) -> PathBuf {
+    let Some(output_dir) = &job.output_dir else {
+        return video_root.to_path_buf();
+    };
+    let slug = if job.source.contains("://") {
+        "remote"
+    } else {
+        job.source
+            .rsplit_once('/')
+            .map_or(job.source.as_str(), |(_, tail)| tail)
+    };
+    output_dir.join(slugify(slug))
+}
+
+fn read_manifest(path: &Path) -> Option<Map<String, Value>> {
+    let bytes = fs::read(path).ok()?;
+    match serde_json::from_slice(&bytes).ok()? {
+        Value::Object(map) => Some(map),
+        _ => None,
+    }
+}
+
+/// Size and mtime recorded next to each manifest hash so an untouched file
+/// can reuse its digest on the next run.
+fn file_stamp(path: &Path) -> Option<Value> {
+    let meta = fs::metadata(path).ok()?;
+    let mtime_ns = meta
+        .modified()
+        .ok()?
+        .duration_since(UNIX_EPOCH)
+        .ok()?
+        .as_nanos() as u64;
+    Some(json!({ "size_bytes": meta.len(), "mtime_ns": mtime_ns }))
+}
+
+fn recorded_hash(previous: Option<&Map<String, Value>>, key: &str, path: &Path) -> Option<String> {
+    let previous = previous?;
+    if previous.get(key)?.as_str()? != path.to_str()? {
+        return None;
+    }
+    let stamp = file_stamp(path)?;
+    if previous.get(&format!("{key}_stamp"))? != &stamp {
+        return None;
+    }
+    let hash = previous.get(&format!("{key}_hash"))?.as_str()?;
+    hash.strip_prefix("sha256:").map(str::to_string)
+}
+
+fn join_hash(handle: ScopedJoinHandle<'_, Result<String>>) -> Result<String> {
+    handle
+        .join()
+        .unwrap_or_else(|payload| std::panic::resume_unwind(payload))
+}
+
 fn value_to_map(value: &Value) -> Map<String, Value> {
     value.as_object().cloned().unwrap_or_else(Map::new)
 }
@@ -446,3 +826,36 @@ fn extract_duration(metadata: &Value) -> Option<f64> {
                 .or_else(|| value.as_u64().map(|v| v as f64))
         })
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn same_named_sources_get_distinct_working_dirs() {
+        let first = asset_slug(Path::new("a/lecture.mp4"), "video");
+        let second = asset_slug(Path::new("b/lecture.mp4"), "video");
+        assert!(first.starts_with("lecture-"));
+        assert_ne!(first, second);
+        assert_eq!(first, asset_slug(Path::new("a/lecture.mp4"), "video"));
+    }
+
+    #[test]
+    fn only_ffmpeg_and_rasterized_pdf_jobs_are_cached() {
+        let asset = |media: &str| Asset {
+            path: PathBuf::from("input"),
+            media: media.to_string(),
+            page_index: None,
+            source_kind: SourceKind::Local,
+            mime: None,
+            meta: json!({}),
+        };
+        assert!(!needs_normalize_cache(&[asset("image")], PdfMode::Images));
+        assert!(!needs_normalize_cache(&[asset("pdf")], PdfMode::Pdf));
+        assert!(needs_normalize_cache(&[asset("pdf")], PdfMode::Images));
+        assert!(needs_normalize_cache(
+            &[asset("image"), asset("video")],
+            PdfMode::Pdf
+        ));
+    }
+}
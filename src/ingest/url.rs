@@ -1,95 +1,154 @@
-use anyhow::Result;
+use anyhow::{bail, Result};
 use base64::engine::general_purpose::STANDARD as BASE64;
 use base64::Engine;
+use rayon::prelude::*;
 use reqwest::blocking::{Client, Response};
-use reqwest::header::{CONTENT_LENGTH, CONTENT_TYPE};
+use reqwest::header::{
+    HeaderMap, HeaderName, ACCEPT_ENCODING, ACCEPT_RANGES, CONTENT_LENGTH, CONTENT_RANGE,
+    CONTENT_TYPE, ETAG, IF_MODIFIED_SINCE, IF_NONE_MATCH, IF_RANGE, LAST_MODIFIED, RANGE,
+};
+use reqwest::StatusCode;
+use serde::{Deserialize, Serialize};
+use serde_json::Value;
 use sha2::{Digest, Sha256};
-use std::fs::File;
-use std::io::{copy, Read, Write};
+use std::fs::{self, File, OpenOptions};
+use std::io::{copy, BufWriter, Read, Seek, SeekFrom, Write};
 use std::path::{Path, PathBuf};
 use std::str::FromStr;
+use std::sync::OnceLock;
+use tracing::warn;
 use url::Url;
 
+use super::media::classify_path;
 use crate::core::{Asset, Job, SourceKind};
-use crate::utils::ensure_dir;
+use crate::utils::{ensure_dir, write_atomic};
 
 const INLINE_THRESHOLD: usize = 20 * 1024 * 1024;
+const RANGED_DOWNLOAD_THRESHOLD: usize = 16 * 1024 * 1024;
+const RANGE_PART_BYTES: usize = 8 * 1024 * 1024;
+const MAX_RANGE_PARTS: usize = 8;
+const DOWNLOAD_BUFFER_BYTES: usize = 1024 * 1024;
+const STREAM_BUFFER_BYTES: usize = 4 * 1024 * 1024;
+
+static HTTP_CLIENT: OnceLock<Client> = OnceLock::new();
+
+/// One connection pool for every URL ingestor in the process; a new ingestor
+/// is built per job, and fetches from the same host should keep their
+/// TCP/TLS sessions alive across jobs.
+fn shared_client() -> Result<Client> {
+    if let Some(client) = HTTP_CLIENT.get() {
+        return Ok(client.clone());
+    }
+    let client = Client::builder()
+        .timeout(std::time::Duration::from_secs(30))
+        .tcp_keepalive(std::time::Duration::from_secs(60))
+        .build()?;
+    Ok(HTTP_CLIENT.get_or_init(|| client).clone())
+}
 
 pub struct UrlIngestor {
     client: Client,
-    cache_dir: PathBuf,
+    cache_dirs: Vec<PathBuf>,
 }
 
 impl UrlIngestor {
     pub fn new(cache_dir: Option<PathBuf>) -> Result<Self> {
-        let cache = cache_dir.unwrap_or_else(|| std::env::temp_dir().join("recapit-url-cache"));
-        ensure_dir(&cache)?;
+        let cache_dirs = match cache_dir {
+            Some(dir) => vec![dir],
+            None => url_cache_dirs(),
+        };
+        for dir in &cache_dirs {
+            ensure_dir(dir)?;
+        }
         Ok(Self {
-            client: Client::builder()
-                .timeout(std::time::Duration::from_secs(30))
-                .build()?,
-            cache_dir: cache,
+            client: shared_client()?,
+            cache_dirs,
         })
     }
 
+    /// Each download lives under one of the cache roots, picked from its key,
+    /// so large files spread across every configured mount.
+    fn cache_root(&self, key: &str) -> &Path {
+        let slot = u64::from_str_radix(&key[..key.len().min(16)], 16).unwrap_or(0);
+        &self.cache_dirs[(slot % self.cache_dirs.len() as u64) as usize]
+    }
+
     pub fn discover(&self, job: &Job) -> Result<Vec<Asset>> {
-        let parsed = Url::parse(&job.source)?;
+        self.discover_url(job, &Url::parse(&job.source)?)
+    }
+
+    /// Discovery for a source the caller has already parsed.
+    pub fn discover_url(&self, job: &Job, parsed: &Url) -> Result<Vec<Asset>> {
         if parsed.scheme() != "http" && parsed.scheme() != "https" {
             return Ok(vec![]);
         }
 
-        let size_hint = self.head_size(&parsed).unwrap_or(None);
-        let inline_allowed = size_hint
-            .map(|size| size <= INLINE_THRESHOLD)
-            .unwrap_or(false);
-
-        let (path, mime, meta) = if inline_allowed {
-            let mut response = self.client.get(parsed.clone()).send()?;
-            let mime = response
-                .headers()
-                .get(CONTENT_TYPE)
-                .and_then(|value| value.to_str().ok())
-                .map(|s| s.to_string());
-            let bytes = read_all(&mut response)?;
-            let cache_key = cache_key(parsed.as_str());
-            let dest = self.cache_dir.join(format!(
-                "{cache_key}{}",
-                guess_suffix(&parsed, mime.as_deref())
-            ));
-            let encoded = BASE64.encode(&bytes);
-            ensure_dir(dest.parent().unwrap())?;
-            File::create(&dest)?.write_all(&bytes)?;
-            let meta = serde_json::json!({
-                "url": job.source,
-                "size_bytes": bytes.len(),
-                "inline_bytes": encoded,
-                "upload_cache_key": cache_key,
-            });
-            (dest, mime, meta)
-        } else {
-            let mut response = self.client.get(parsed.clone()).send()?;
-            let mime = response
-                .headers()
-                .get(CONTENT_TYPE)
-                .and_then(|value| value.to_str().ok())
-                .map(|s| s.to_string());
-            let target = self.cache_dir.join(format!(
-                "{}{}",
-                cache_key(parsed.as_str()),
-                guess_suffix(&parsed, mime.as_deref())
-            ));
-            ensure_dir(target.parent().unwrap())?;
-            let mut file = File::create(&target)?;
-            let size = copy(&mut response, &mut file)? as usize;
-            let meta = serde_json::json!({
-                "url": job.source,
-                "size_bytes": size,
-                "upload_cache_key": cache_key(parsed.as_str()),
-            });
-            (target, mime, meta)
+        let key = cache_key(parsed.as_str());
+        let cache_root = self.cache_root(&key);
+        let sidecar = cache_root.join(format!("{key}.meta.json"));
+        let cached =
+            read_cache_entry(&sidecar).filter(|entry| cache_root.join(&entry.file).exists());
+
+        // One GET decides everything: it is conditional when a cached copy
+        // exists, and its own headers pick the inline, ranged or streamed
+        // path, so no separate HEAD round trip is needed.
+        let mut request = self.client.get(parsed.clone());
+        if let Some(entry) = &cached {
+            if let Some(etag) = &entry.etag {
+                request = request.header(IF_NONE_MATCH, etag);
+            }
+            if let Some(last_modified) = &entry.last_modified {
+                request = request.header(IF_MODIFIED_SINCE, last_modified);
+            }
+        }
+        let response = request.send()?;
+
+        let fetched = match cached.filter(|_| response.status() == StatusCode::NOT_MODIFIED) {
+            Some(entry) => {
+                let path = cache_root.join(&entry.file);
+                let inline = if entry.inline {
+                    Some(BASE64.encode(fs::read(&path)?))
+                } else {
+                    None
+                };
+                Fetched {
+                    path,
+                    mime: entry.mime,
+                    size: entry.size_bytes,
+                    inline,
+                    validators: Validators {
+                        etag: entry.etag,
+                        last_modified: entry.last_modified,
+                    },
+                }
+            }
+            None => {
+                // Error pages must not be downloaded or recorded as the source.
+                let response = response.error_for_status()?;
+                let fetched = self.fetch(parsed, &key, response)?;
+                self.record_cache_entry(&sidecar, &fetched);
+                fetched
+            }
         };
 
-        let media = infer_media(&parsed, mime.as_deref());
+        let mut meta = serde_json::json!({
+            "url": job.source,
+            "size_bytes": fetched.size,
+            "upload_cache_key": key,
+        });
+        // Recorded so a skip-existing fingerprint notices a changed remote file.
+        if let Some(etag) = fetched.validators.etag {
+            meta["etag"] = Value::String(etag);
+        }
+        if let Some(last_modified) = fetched.validators.last_modified {
+            meta["last_modified"] = Value::String(last_modified);
+        }
+        if let Some(encoded) = fetched.inline {
+            meta["inline_bytes"] = Value::String(encoded);
+        }
+        let (path, mime) = (fetched.path, fetched.mime);
+
+        let media = infer_media(parsed, mime.as_deref());
         if media.is_none() {
             return Ok(vec![]);
         }
@@ -103,21 +162,417 @@ impl UrlIngestor {
         }])
     }
 
-    fn head_size(&self, url: &Url) -> Result<Option<usize>> {
-        let response = self.client.head(url.clone()).send();
-        match response {
-            Ok(resp) => Ok(resp
-                .headers()
-                .get(CONTENT_LENGTH)
-                .and_then(|value| value.to_str().ok())
-                .and_then(|value| value.parse().ok())),
-            Err(_) => Ok(None),
+    fn fetch(&self, url: &Url, key: &str, mut response: Response) -> Result<Fetched> {
+        let headers = response.headers();
+        let mime = header_string(headers, CONTENT_TYPE);
+        let validators = Validators::from_headers(headers);
+        let size = header_string(headers, CONTENT_LENGTH).and_then(|value| value.parse().ok());
+        let accepts_ranges =
+            header_string(headers, ACCEPT_RANGES).is_some_and(|value| value == "bytes");
+        let target = self
+            .cache_root(key)
+            .join(format!("{key}{}", guess_suffix(url, mime.as_deref())));
+
+        if let Some(size) = size.filter(|size: &usize| *size <= INLINE_THRESHOLD) {
+            let bytes = read_all(&mut response, size)?;
+            File::create(&target)?.write_all(&bytes)?;
+            return Ok(Fetched {
+                path: target,
+                mime,
+                size: bytes.len(),
+                inline: Some(BASE64.encode(&bytes)),
+                validators,
+            });
         }
+
+        let ranged_size = size.filter(|size| accepts_ranges && *size > RANGED_DOWNLOAD_THRESHOLD);
+        let mut response = match ranged_size {
+            Some(size) => {
+                // Every slice, the first included, is its own range request;
+                // the full-body response is closed before any of it is read.
+                drop(response);
+                match self.ranged_download(url, &target, size) {
+                    Ok(()) => {
+                        return Ok(Fetched {
+                            path: target,
+                            mime,
+                            size,
+                            inline: None,
+                            validators,
+                        })
+                    }
+                    Err(err) => {
+                        warn!(
+                            target: "recapit::ingest::url",
+                            "Ranged download of {} failed, retrying as one stream: {}",
+                            url,
+                            err
+                        );
+                        self.client.get(url.clone()).send()?.error_for_status()?
+                    }
+                }
+            }
+            None => response,
+        };
+
+        let temp = part_path(&target);
+        let mut resume_from = 0;
+        if let Some((offset, if_range)) = resumable_part(&temp, &validators) {
+            // Only the missing tail is wanted; release the full response
+            // before asking for it.
+            drop(response);
+            response = match self.resume_partial(url, offset, &if_range) {
+                Ok((resumed, start)) => {
+                    resume_from = start;
+                    resumed
+                }
+                Err(err) => {
+                    warn!(
+                        target: "recapit::ingest::url",
+                        "Resuming {} failed, downloading it again: {}",
+                        url,
+                        err
+                    );
+                    self.client.get(url.clone()).send()?.error_for_status()?
+                }
+            };
+        }
+        // A restarted body may be a newer revision than the first response.
+        let validators = if resume_from == 0 {
+            let current = Validators::from_headers(response.headers());
+            save_part_validators(&temp, &current);
+            current
+        } else {
+            validators
+        };
+        let expected = expected_total(response.headers(), resume_from);
+        let size = stream_to_disk(&mut response, &temp, &target, resume_from, expected)?;
+        let _ = fs::remove_file(part_validators_path(&temp));
+        Ok(Fetched {
+            path: target,
+            mime,
+            size,
+            inline: None,
+            validators,
+        })
+    }
+
+    /// Continues a `.part` file at `offset` with a `Range` request guarded
+    /// by `If-Range`, so the server only sends the missing tail when the
+    /// resource is unchanged. A server that answers with the whole body
+    /// instead restarts the download. Returns the response and the offset its
+    /// body starts at.
+    fn resume_partial(&self, url: &Url, offset: u64, if_range: &str) -> Result<(Response, u64)> {
+        let response = self
+            .client
+            .get(url.clone())
+            .header(RANGE, format!("bytes={offset}-"))
+            .header(IF_RANGE, if_range)
+            .header(ACCEPT_ENCODING, "identity")
+            .send()?
+            .error_for_status()?;
+        if response.status() != StatusCode::PARTIAL_CONTENT {
+            return Ok((response, 0));
+        }
+        let start = header_string(response.headers(), CONTENT_RANGE)
+            .and_then(|value| parse_content_range(&value))
+            .map(|(start, _)| start);
+        if start != Some(offset) {
+            bail!("server answered range {offset}- with {start:?}");
+        }
+        Ok((response, offset))
+    }
+
+    /// Remembers the validators of a fresh download so the next run can ask
+    /// the server whether the cached copy is still current.
+    fn record_cache_entry(&self, sidecar: &Path, fetched: &Fetched) {
+        let Validators {
+            etag,
+            last_modified,
+        } = fetched.validators.clone();
+        if etag.is_none() && last_modified.is_none() {
+            let _ = fs::remove_file(sidecar);
+            return;
+        }
+        let entry = UrlCacheEntry {
+            file: fetched
+                .path
+                .file_name()
+                .map(|name| name.to_string_lossy().into_owned())
+                .unwrap_or_default(),
+            mime: fetched.mime.clone(),
+            size_bytes: fetched.size,
+            inline: fetched.inline.is_some(),
+            etag,
+            last_modified,
+        };
+        let written = serde_json::to_vec_pretty(&entry)
+            .map_err(anyhow::Error::from)
+            .and_then(|bytes| write_atomic(sidecar, &bytes));
+        if let Err(err) = written {
+            warn!(
+                target: "recapit::ingest::url",
+                "Failed to record cache validators {}: {}",
+                sidecar.display(),
+                err
+            );
+        }
+    }
+
+    /// Large downloads from servers that accept byte ranges are split across
+    /// several connections, each writing its own slice of a preallocated
+    /// `.part` file, the first slice included. Any error removes the `.part`
+    /// file so the caller can fall back to one stream.
+    fn ranged_download(&self, url: &Url, target: &Path, size: usize) -> Result<()> {
+        let mut temp_name = target.as_os_str().to_owned();
+        temp_name.push(".ranges.part");
+        let temp = PathBuf::from(temp_name);
+        let parts = (size / RANGE_PART_BYTES).clamp(2, MAX_RANGE_PARTS);
+        let span = size.div_ceil(parts);
+        let result = File::create(&temp)
+            .and_then(|file| file.set_len(size as u64))
+            .map_err(anyhow::Error::from)
+            .and_then(|_| {
+                (0..parts).into_par_iter().try_for_each(|part| {
+                    let start = part * span;
+                    let end = (start + span).min(size);
+                    self.fetch_range(url, &temp, start, end, size)
+                })
+            })
+            .and_then(|_| Ok(fs::rename(&temp, target)?));
+        if result.is_err() {
+            let _ = fs::remove_file(&temp);
+        }
+        result
+    }
+
+    fn fetch_range(
+        &self,
+        url: &Url,
+        temp: &Path,
+        start: usize,
+        end: usize,
+        size: usize,
+    ) -> Result<()> {
+        let response = self
+            .client
+            .get(url.clone())
+            .header(RANGE, format!("bytes={start}-{}", end - 1))
+            .header(ACCEPT_ENCODING, "identity")
+            .send()?;
+        let range = header_string(response.headers(), CONTENT_RANGE)
+            .and_then(|value| parse_content_range(&value));
+        if response.status() != StatusCode::PARTIAL_CONTENT
+            || range != Some((start as u64, Some(size as u64)))
+        {
+            bail!("server ignored range {start}-{end} of {size}");
+        }
+        write_range(response, temp, start, end)
     }
 }
 
-fn read_all(response: &mut Response) -> Result<Vec<u8>> {
-    let mut bytes = Vec::new();
+/// Streams the body through a large buffer into the `.part` file `temp`,
+/// appending when `resume_from` bytes are already there, and renames it over
+/// `target` once it holds the `expected` total. A failed or short transfer
+/// keeps the `.part` file so the next run can resume it.
+fn stream_to_disk(
+    response: &mut Response,
+    temp: &Path,
+    target: &Path,
+    resume_from: u64,
+    expected: Option<u64>,
+) -> Result<usize> {
+    let file = if resume_from > 0 {
+        OpenOptions::new().append(true).open(temp)?
+    } else {
+        File::create(temp)?
+    };
+    let mut writer = BufWriter::with_capacity(STREAM_BUFFER_BYTES, file);
+    let written = copy(response, &mut writer)?;
+    writer.flush()?;
+    let total = resume_from + written;
+    if let Some(expected) = expected.filter(|expected| *expected != total) {
+        bail!(
+            "download of {} stopped at {total} of {expected} bytes",
+            target.display()
+        );
+    }
+    fs::rename(temp, target)?;
+    Ok(total as usize)
+}
+
+/// Full size of the resource a response body belongs to: the total from
+/// `Content-Range` for a partial response, otherwise `Content-Length` past
+/// the bytes already on disk. `None` when the server does not say.
+fn expected_total(headers: &HeaderMap, resume_from: u64) -> Option<u64> {
+    if let Some((_, total)) =
+        header_string(headers, CONTENT_RANGE).and_then(|value| parse_content_range(&value))
+    {
+        return total;
+    }
+    header_string(headers, CONTENT_LENGTH)
+        .and_then(|value| value.parse::<u64>().ok())
+        .map(|length| resume_from + length)
+}
+
+/// Parses `bytes <start>-<end>/<total>` into the start offset and the total
+/// (`None` when the server sends `*`).
+fn parse_content_range(value: &str) -> Option<(u64, Option<u64>)> {
+    let (range, total) = value.trim().strip_prefix("bytes ")?.split_once('/')?;
+    let (start, end) = range.split_once('-')?;
+    let start: u64 = start.trim().parse().ok()?;
+    let end: u64 = end.trim().parse().ok()?;
+    if end < start {
+        return None;
+    }
+    let total = match total.trim() {
+        "*" => None,
+        total => Some(total.parse().ok()?),
+    };
+    Some((start, total))
+}
+
+/// Offset and `If-Range` value for continuing the `.part` file `temp`, when
+/// it was started from a response with the same validators. A `.part` file
+/// whose saved validators differ from the current ones is discarded.
+fn resumable_part(temp: &Path, validators: &Validators) -> Option<(u64, String)> {
+    let offset = fs::metadata(temp).ok()?.len();
+    if offset == 0 {
+        return None;
+    }
+    let saved = read_part_validators(temp);
+    if saved.as_ref() != Some(validators) {
+        let _ = fs::remove_file(temp);
+        let _ = fs::remove_file(part_validators_path(temp));
+        return None;
+    }
+    let saved = saved?;
+    // If-Range only accepts strong validators.
+    let if_range = saved
+        .etag
+        .filter(|etag| !etag.starts_with("W/"))
+        .or(saved.last_modified)?;
+    Some((offset, if_range))
+}
+
+fn part_path(target: &Path) -> PathBuf {
+    let mut name = target.as_os_str().to_owned();
+    name.push(".part");
+    PathBuf::from(name)
+}
+
+/// Validators of the response a `.part` file was started from, kept beside
+/// it so a later resume can tell whether the bytes on disk are still valid.
+fn part_validators_path(temp: &Path) -> PathBuf {
+    let mut name = temp.as_os_str().to_owned();
+    name.push(".validators.json");
+    PathBuf::from(name)
+}
+
+fn save_part_validators(temp: &Path, validators: &Validators) {
+    let written = serde_json::to_vec(validators)
+        .map_err(anyhow::Error::from)
+        .and_then(|bytes| write_atomic(&part_validators_path(temp), &bytes));
+    if let Err(err) = written {
+        warn!(
+            target: "recapit::ingest::url",
+            "Failed to record validators for {}: {}",
+            temp.display(),
+            err
+        );
+    }
+}
+
+fn read_part_validators(temp: &Path) -> Option<Validators> {
+    let bytes = fs::read(part_validators_path(temp)).ok()?;
+    serde_json::from_slice(&bytes).ok()
+}
+
+/// Copies exactly `end - start` bytes of `response` into `temp` at `start`.
+fn write_range(mut response: Response, temp: &Path, start: usize, end: usize) -> Result<()> {
+    let mut file = OpenOptions::new().write(true).open(temp)?;
+    file.seek(SeekFrom::Start(start as u64))?;
+    let expected = (end - start) as u64;
+    let mut writer = BufWriter::with_capacity(DOWNLOAD_BUFFER_BYTES, file);
+    let written = copy(&mut (&mut response).take(expected), &mut writer)?;
+    writer.flush()?;
+    if written != expected {
+        bail!("short read for range {start}-{end}: {written} of {expected} bytes");
+    }
+    Ok(())
+}
+
+#[derive(Debug, Clone, Default, PartialEq, Serialize, Deserialize)]
+struct Validators {
+    etag: Option<String>,
+    last_modified: Option<String>,
+}
+
+impl Validators {
+    fn from_headers(headers: &HeaderMap) -> Self {
+        Self {
+            etag: header_string(headers, ETAG),
+            last_modified: header_string(headers, LAST_MODIFIED),
+        }
+    }
+}
+
+struct Fetched {
+    path: PathBuf,
+    mime: Option<String>,
+    size: usize,
+    inline: Option<String>,
+    validators: Validators,
+}
+
+/// Sidecar stored as `{cache_key}.meta.json` next to a cached download.
+#[derive(Debug, Serialize, Deserialize)]
+struct UrlCacheEntry {
+    file: String,
+    mime: Option<String>,
+    size_bytes: usize,
+    #[serde(default)]
+    inline: bool,
+    etag: Option<String>,
+    last_modified: Option<String>,
+}
+
+/// `RECAPIT_CACHE_DIRS` (a path list, like `PATH`) names the mounts URL
+/// downloads may use; otherwise they go under the system temp directory.
+/// `recapit cleanup cache` clears the same roots.
+pub fn url_cache_dirs() -> Vec<PathBuf> {
+    let configured: Vec<PathBuf> = std::env::var_os("RECAPIT_CACHE_DIRS")
+        .map(|value| {
+            std::env::split_paths(&value)
+                .filter(|path| !path.as_os_str().is_empty())
+                .map(|path| path.join("recapit-url-cache"))
+                .collect()
+        })
+        .unwrap_or_default();
+    if configured.is_empty() {
+        vec![std::env::temp_dir().join("recapit-url-cache")]
+    } else {
+        configured
+    }
+}
+
+fn read_cache_entry(path: &Path) -> Option<UrlCacheEntry> {
+    let bytes = fs::read(path).ok()?;
+    serde_json::from_slice(&bytes).ok()
+}
+
+fn header_string(headers: &HeaderMap, name: HeaderName) -> Option<String> {
+    headers
+        .get(name)
+        .and_then(|value| value.to_str().ok())
+        .map(|value| value.to_string())
+}
+
+/// Reads the body into a buffer sized from Content-Length up front, so a
+/// body of up to `INLINE_THRESHOLD` bytes is not copied through repeated
+/// reallocations as it grows.
+fn read_all(response: &mut Response, expected: usize) -> Result<Vec<u8>> {
+    let mut bytes = Vec::with_capacity(expected);
     response.read_to_end(&mut bytes)?;
     Ok(bytes)
 }
@@ -139,8 +594,11 @@ fn guess_suffix(url: &Url, mime: Option<&str>) -> String {
 }
 
 fn infer_media(url: &Url, mime: Option<&str>) -> Option<&'static str> {
+    // Content-Type may carry parameters ("video/mp4; codecs=...") that would
+    // otherwise miss the table and fall through to the path lookup.
     if let Some(mime) = mime {
-        match mime {
+        let essence = mime.split(';').next().unwrap_or_default().trim();
+        match essence {
             "application/pdf" => return Some("pdf"),
             "image/png" | "image/jpeg" | "image/gif" | "image/tiff" => return Some("image"),
             "video/mp4" => return Some("video"),
@@ -148,17 +606,65 @@ fn infer_media(url: &Url, mime: Option<&str>) -> Option<&'static str> {
             _ => {}
         }
     }
-    Path::new(url.path())
-        .extension()
-        .and_then(|ext| match ext.to_str()?.to_lowercase().as_str() {
-            "pdf" => Some("pdf"),
-            "png" | "jpg" | "jpeg" | "gif" | "tif" | "tiff" | "bmp" => Some("image"),
-            "mp4" | "mov" | "mkv" => Some("video"),
-            "mp3" | "wav" | "m4a" => Some("audio"),
-            _ => None,
-        })
+    classify_path(Path::new(url.path())).map(|(media, _)| media)
 }
 
 fn cache_key(url: &str) -> String {
     format!("{:x}", Sha256::digest(url.as_bytes()))
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use reqwest::header::HeaderValue;
+
+    #[test]
+    fn content_range_yields_start_and_total() {
+        assert_eq!(
+            parse_content_range("bytes 100-199/1000"),
+            Some((100, Some(1000)))
+        );
+        assert_eq!(parse_content_range("bytes 0-0/*"), Some((0, None)));
+        assert_eq!(parse_content_range("bytes 200-100/1000"), None);
+        assert_eq!(parse_content_range("bytes */1000"), None);
+        assert_eq!(parse_content_range("items 0-9/10"), None);
+    }
+
+    #[test]
+    fn expected_total_prefers_content_range() {
+        let mut headers = HeaderMap::new();
+        headers.insert(CONTENT_LENGTH, HeaderValue::from_static("900"));
+        assert_eq!(expected_total(&headers, 0), Some(900));
+        assert_eq!(expected_total(&headers, 100), Some(1000));
+        headers.insert(
+            CONTENT_RANGE,
+            HeaderValue::from_static("bytes 100-999/1000"),
+        );
+        assert_eq!(expected_total(&headers, 100), Some(1000));
+        assert_eq!(expected_total(&HeaderMap::new(), 0), None);
+    }
+
+    #[test]
+    fn part_resumes_only_with_matching_strong_validators() {
+        let dir = tempfile::tempdir().unwrap();
+        let temp = dir.path().join("file.bin.part");
+        let validators = Validators {
+            etag: Some("W/\"weak\"".into()),
+            last_modified: Some("Mon, 01 Jan 2024 00:00:00 GMT".into()),
+        };
+        fs::write(&temp, b"partial").unwrap();
+        save_part_validators(&temp, &validators);
+        assert_eq!(
+            resumable_part(&temp, &validators),
+            Some((7, "Mon, 01 Jan 2024 00:00:00 GMT".to_string()))
+        );
+
+        let changed = Validators {
+            etag: Some("\"new\"".into()),
+            last_modified: None,
+        };
+        assert_eq!(resumable_part(&temp, &changed), None);
+        assert!(!temp.exists());
+        assert!(!part_validators_path(&temp).exists());
+    }
+}
@@ -1,6 +1,5 @@
 use anyhow::{Context, Result};
 use serde_json::{json, Value};
-use std::collections::HashSet;
 use std::env;
 use std::path::{Path, PathBuf};
 use std::process::Command;
@@ -19,29 +18,25 @@ const YOUTUBE_HOSTS: [&str; 4] = [
     "m.youtube.com",
 ];
 
-pub struct YouTubeIngestor {
-    hosts: HashSet<&'static str>,
-}
-
-impl Default for YouTubeIngestor {
-    fn default() -> Self {
-        Self {
-            hosts: HashSet::from(YOUTUBE_HOSTS),
-        }
-    }
-}
+#[derive(Default)]
+pub struct YouTubeIngestor;
 
 impl YouTubeIngestor {
     pub fn supports(&self, url: &Url) -> bool {
         if matches!(url.scheme(), "yt" | "youtube") {
             return true;
         }
-        self.hosts.contains(url.host_str().unwrap_or_default())
+        url.host_str()
+            .is_some_and(|host| YOUTUBE_HOSTS.contains(&host))
     }
 
     pub fn discover(&self, job: &Job) -> Result<Vec<Asset>> {
-        let parsed = parse_url(&job.source)?;
-        if !self.supports(&parsed) {
+        self.discover_url(&parse_url(&job.source)?)
+    }
+
+    /// Discovery for a source the caller has already parsed.
+    pub fn discover_url(&self, parsed: &Url) -> Result<Vec<Asset>> {
+        if !self.supports(parsed) {
             return Ok(vec![]);
         }
         let url = parsed.to_string();
@@ -98,7 +93,7 @@ impl YouTubeDownloader {
                 .join("recapit")
                 .join("youtube")
         });
-        ensure_dir(&base)?;
+        // Created on first download; most runs never touch YouTube.
         Ok(Self { cache_dir: base })
     }
 
@@ -115,79 +110,84 @@ impl YouTubeDownloader {
             .unwrap_or_else(|| self.cache_dir.clone());
         ensure_dir(&base_dir).map_err(|err| YouTubeDownloadError::Other(err.to_string()))?;
 
-        let metadata_output = Command::new(&ytdlp)
-            .arg("--dump-json")
-            .arg("--skip-download")
-            .arg("--no-warnings")
-            .arg("--no-progress")
-            .arg(url)
-            .output()
-            .map_err(|err| {
-                YouTubeDownloadError::Other(format!("failed to execute yt-dlp: {err}"))
-            })?;
-
-        if !metadata_output.status.success() {
-            let stderr = String::from_utf8_lossy(&metadata_output.stderr);
-            return Err(YouTubeDownloadError::Metadata(stderr.trim().to_string()));
-        }
+        // yt-dlp writes the extracted metadata next to the video, so a URL
+        // whose id is visible needs a single yt-dlp run (none once cached)
+        // instead of a separate metadata probe before every download.
+        let (video_id, mut metadata) = match video_id_from_url(url) {
+            Some(id) => {
+                let recorded = read_info_json(&base_dir.join(format!("{id}.info.json")));
+                (id, recorded)
+            }
+            None => {
+                let metadata = probe_metadata(&ytdlp, url)?;
+                let id = metadata
+                    .get("id")
+                    .and_then(|value| value.as_str())
+                    .map(|value| value.to_string())
+                    .ok_or_else(|| {
+                        YouTubeDownloadError::Metadata("yt-dlp metadata missing video id".into())
+                    })?;
+                (id, Some(metadata))
+            }
+        };
 
-        let metadata: Value = serde_json::from_slice(&metadata_output.stdout).map_err(|err| {
-            YouTubeDownloadError::Other(format!("unable to parse yt-dlp metadata JSON: {err}"))
-        })?;
+        let expected_mp4 = base_dir.join(format!("{video_id}.mp4"));
+        let cached_path = metadata.as_ref().and_then(|metadata| {
+            let expected_ext = base_dir.join(format!("{video_id}.{}", metadata_ext(metadata)));
+            [expected_mp4.clone(), expected_ext]
+                .into_iter()
+                .find(|path| path.exists())
+        });
 
-        let video_id = metadata
-            .get("id")
-            .and_then(|value| value.as_str())
-            .map(|value| value.to_string())
-            .ok_or_else(|| {
-                YouTubeDownloadError::Metadata("yt-dlp metadata missing video id".into())
-            })?;
-        let ext = metadata
-            .get("ext")
-            .and_then(|value| value.as_str())
-            .unwrap_or("mp4");
+        let (path, cached) = match cached_path {
+            Some(path) => (path, true),
+            None => {
+                let template = base_dir.join(format!("{video_id}.%(ext)s"));
+                let status = Command::new(&ytdlp)
+                    .arg("--quiet")
+                    .arg("--no-warnings")
+                    .arg("--no-progress")
+                    .arg("--write-info-json")
+                    .arg("--merge-output-format")
+                    .arg("mp4")
+                    .arg("--ffmpeg-location")
+                    .arg(ffmpeg.to_string_lossy().to_string())
+                    .arg("-o")
+                    .arg(template.to_string_lossy().to_string())
+                    .arg(url)
+                    .status()
+                    .map_err(|err| {
+                        YouTubeDownloadError::Other(format!("failed to execute yt-dlp: {err}"))
+                    })?;
 
-        let expected_mp4 = base_dir.join(format!("{video_id}.mp4"));
-        let expected_ext = base_dir.join(format!("{video_id}.{ext}"));
-
-        let (path, cached) = if expected_mp4.exists() {
-            (expected_mp4.clone(), true)
-        } else if expected_ext.exists() {
-            (expected_ext.clone(), true)
-        } else {
-            let template = base_dir.join(format!("{video_id}.%(ext)s"));
-            let status = Command::new(&ytdlp)
-                .arg("--quiet")
-                .arg("--no-warnings")
-                .arg("--no-progress")
-                .arg("--merge-output-format")
-                .arg("mp4")
-                .arg("--ffmpeg-location")
-                .arg(ffmpeg.to_string_lossy().to_string())
-                .arg("-o")
-                .arg(template.to_string_lossy().to_string())
-                .arg(url)
-                .status()
-                .map_err(|err| {
-                    YouTubeDownloadError::Other(format!("failed to execute yt-dlp: {err}"))
-                })?;
-
-            if !status.success() {
-                return Err(YouTubeDownloadError::Download(format!(
-                    "yt-dlp exit status {status}"
-                )));
-            }
+                if !status.success() {
+                    return Err(YouTubeDownloadError::Download(format!(
+                        "yt-dlp exit status {status}"
+                    )));
+                }
 
-            if expected_mp4.exists() {
-                (expected_mp4.clone(), false)
-            } else if expected_ext.exists() {
-                (expected_ext.clone(), false)
-            } else {
-                return Err(YouTubeDownloadError::Download(
-                    "yt-dlp reported success but no output file was produced".into(),
+                if metadata.is_none() {
+                    metadata = read_info_json(&base_dir.join(format!("{video_id}.info.json")));
+                }
+                let expected_ext = base_dir.join(format!(
+                    "{video_id}.{}",
+                    metadata.as_ref().map_or("mp4", metadata_ext)
                 ));
+                if expected_mp4.exists() {
+                    (expected_mp4.clone(), false)
+                } else if expected_ext.exists() {
+                    (expected_ext, false)
+                } else {
+                    return Err(YouTubeDownloadError::Download(
+                        "yt-dlp reported success but no output file was produced".into(),
+                    ));
+                }
             }
         };
+        let metadata = metadata.ok_or_else(|| {
+            YouTubeDownloadError::Metadata("yt-dlp did not write video metadata".into())
+        })?;
+        let ext = metadata_ext(&metadata).to_string();
 
         let size_bytes = path.metadata().ok().map(|meta| meta.len());
         let sha = sha256sum(&path).ok();
@@ -204,6 +204,58 @@ impl YouTubeDownloader {
     }
 }
 
+fn probe_metadata(ytdlp: &Path, url: &str) -> std::result::Result<Value, YouTubeDownloadError> {
+    let output = Command::new(ytdlp)
+        .arg("--dump-json")
+        .arg("--skip-download")
+        .arg("--no-warnings")
+        .arg("--no-progress")
+        .arg(url)
+        .output()
+        .map_err(|err| YouTubeDownloadError::Other(format!("failed to execute yt-dlp: {err}")))?;
+    if !output.status.success() {
+        let stderr = String::from_utf8_lossy(&output.stderr);
+        return Err(YouTubeDownloadError::Metadata(stderr.trim().to_string()));
+    }
+    serde_json::from_slice(&output.stdout).map_err(|err| {
+        YouTubeDownloadError::Other(format!("unable to parse yt-dlp metadata JSON: {err}"))
+    })
+}
+
+fn read_info_json(path: &Path) -> Option<Value> {
+    let bytes = std::fs::read(path).ok()?;
+    serde_json::from_slice(&bytes).ok()
+}
+
+fn metadata_ext(metadata: &Value) -> &str {
+    metadata
+        .get("ext")
+        .and_then(|value| value.as_str())
+        .unwrap_or("mp4")
+}
+
+/// Video id from the common watch/short-link URL shapes, when present.
+fn video_id_from_url(input: &str) -> Option<String> {
+    let url = Url::parse(input).ok()?;
+    let host = url.host_str()?;
+    let mut segments = url.path_segments()?;
+    let candidate = if host == "youtu.be" {
+        segments.next()?.to_string()
+    } else if let Some((_, id)) = url.query_pairs().find(|(key, _)| key == "v") {
+        id.into_owned()
+    } else {
+        match segments.next()? {
+            "shorts" | "embed" | "live" => segments.next()?.to_string(),
+            _ => return None,
+        }
+    };
+    let valid = candidate.len() == 11
+        && candidate
+            .chars()
+            .all(|c| c.is_ascii_alphanumeric() || c == '-' || c == '_');
+    valid.then_some(candidate)
+}
+
 fn parse_url(input: &str) -> Result<Url> {
     match Url::parse(input) {
         Ok(url) => Ok(url),
@@ -5,12 +5,14 @@ mod conversion;
 mod core;
 mod cost;
 mod engine;
+mod image;
 mod ingest;
 mod pdf;
 mod progress;
 mod prompts;
 mod providers;
 mod quota;
+mod ratelimit;
 mod render;
 mod selection;
 mod telemetry;
@@ -22,21 +24,30 @@ mod video;
 use anyhow::{anyhow, Context};
 use clap::Parser;
 use cli::{ConversionTarget, OutputFormatArg};
-use conversion::{collect_tex_files, LatexConverter};
+use conversion::{
+    collect_tex_files, plan_batches, ConversionOperation, LatexConverter, BATCH_CHAR_BUDGET,
+};
 use core::{Asset, Ingestor, Job, Kind, Normalizer, OutputFormat, PdfMode};
 use crossterm::style::Stylize;
 use engine::Engine;
-use ingest::{CompositeIngestor, CompositeNormalizer};
+use ingest::{
+    url_cache_dirs, CompositeIngestor, CompositeNormalizer, PrefetchedIngestor,
+    PrefetchedNormalizer,
+};
 use progress::{Progress, ProgressScope, ProgressStage};
 use providers::gemini::GeminiProvider;
 use quota::{QuotaConfig, QuotaMonitor};
 use render::writer::CompositeWriter;
 use selection::IndexSelection;
-use serde_json::{json, Map, Value};
+use serde::Serialize;
+use serde_json::{Map, Value};
 use serde_yaml::Value as YamlValue;
 use std::collections::HashMap;
 use std::fs;
+use std::io::Write;
 use std::path::{Path, PathBuf};
+use std::sync::atomic::{AtomicBool, Ordering};
+use std::sync::Arc;
 use tokio::sync::mpsc;
 use utils::slugify;
 
@@ -112,6 +123,8 @@ async fn run_primary(cli: cli::Cli) -> anyhow::Result<()> {
     };
 
     // Handle conversion-first flow (single source only)
+    let skip_existing = cli.skip_existing && !cli.no_skip_existing;
+
     if let Some(target) = cli.to {
         let source = sources
             .first()
@@ -134,7 +147,7 @@ async fn run_primary(cli: cli::Cli) -> anyhow::Result<()> {
             PathBuf::from(source),
             cli.output_dir.clone(),
             pattern,
-            cli.skip_existing,
+            skip_existing,
             cli.model.clone(),
             if cli.no_recursive {
                 false
@@ -142,6 +155,7 @@ async fn run_primary(cli: cli::Cli) -> anyhow::Result<()> {
                 cli.recursive
             },
             kind,
+            cli.batch_size,
         );
     }
 
@@ -244,7 +258,7 @@ async fn run_primary(cli: cli::Cli) -> anyhow::Result<()> {
                     OutputFormatArg::Latex => OutputFormat::Latex,
                 })
                 .unwrap_or(cfg.default_format),
-            skip_existing: cli.skip_existing,
+            skip_existing,
             page_selection,
             media_resolution: resolve_media_resolution(Some(cfg.media_resolution.as_str()))?.1,
             save_full_response,
@@ -311,6 +325,7 @@ async fn run_primary(cli: cli::Cli) -> anyhow::Result<()> {
 
     let mut summaries = Vec::new();
 
+    let mut jobs = Vec::with_capacity(total_jobs);
     for (idx, source) in sources.iter().enumerate() {
         let job_label = source.clone();
         let job_id = slugify(&job_label);
@@ -407,7 +422,7 @@ async fn run_primary(cli: cli::Cli) -> anyhow::Result<()> {
             pdf_mode = PdfMode::Images;
         }
 
-        let job = Job {
+        jobs.push(Job {
             source: source.clone(),
             job_label: job_label.clone(),
             job_id: job_id.clone(),
@@ -421,7 +436,7 @@ async fn run_primary(cli: cli::Cli) -> anyhow::Result<()> {
             preset: Some(preset_key.clone()),
             export: exports.clone(),
             format: effective_format,
-            skip_existing: cli.skip_existing,
+            skip_existing,
             page_selection,
             media_resolution: media_enum.clone(),
             save_full_response,
@@ -430,27 +445,26 @@ async fn run_primary(cli: cli::Cli) -> anyhow::Result<()> {
             max_workers,
             max_video_workers,
             pdf_dpi: effective_pdf_dpi,
-        };
+        });
+    }
 
-        let capability_table = crate::constants::model_capabilities();
-        let model_key = job.model.clone();
-        let capability_checker = move |capability: &str| {
-            capability_table
-                .get(model_key.as_str())
-                .or_else(|| capability_table.get(crate::constants::DEFAULT_MODEL))
-                .map(|caps| caps.contains(&capability))
-                .unwrap_or(true)
-        };
+    // Discovery is mostly network/filesystem latency, so resolve every
+    // source up front in parallel and hand each engine its own result.
+    let mut prefetched: Vec<Option<anyhow::Result<Vec<Asset>>>> = if total_jobs > 1 {
+        CompositeIngestor::new()?
+            .discover_all(&jobs, cfg.max_ingest_workers)
+            .into_iter()
+            .map(Some)
+            .collect()
+    } else {
+        Vec::new()
+    };
 
-        let monitor = telemetry::RunMonitor::new();
-        let provider = GeminiProvider::new(
-            cfg.api_key.clone(),
-            job.model.clone(),
-            monitor.clone(),
-            Some(quota.clone()),
-        )
-        .with_progress(tx.clone());
-        let normalizer = CompositeNormalizer::new(
+    let build_normalizer = |job: &Job| -> anyhow::Result<CompositeNormalizer> {
+        let capabilities = crate::constants::model_capabilities(&job.model);
+        let capability_checker =
+            move |capability: &str| capabilities.is_none_or(|caps| caps.contains(&capability));
+        CompositeNormalizer::new(
             None,
             cfg.video_encoder_preference,
             Some(cfg.video_max_chunk_seconds),
@@ -459,10 +473,46 @@ async fn run_primary(cli: cli::Cli) -> anyhow::Result<()> {
             Some(tokens_per_second),
             Some(job.pdf_dpi),
             Some(Box::new(capability_checker)),
+        )
+    };
+    let prefetch_templates = templates::TemplateLoader::new(cfg.templates_dir.clone());
+    let mut pending_normalize: Option<NormalizePrefetch> = None;
+
+    for (idx, job) in jobs.iter().enumerate() {
+        let job_label = job.job_label.clone();
+
+        let monitor = telemetry::RunMonitor::new();
+        let provider = GeminiProvider::new(
+            cfg.api_key.clone(),
+            job.model.clone(),
+            monitor.clone(),
+            Some(quota.clone()),
+            cfg.retry,
+        )
+        .with_progress(tx.clone());
+        // A prefetch that failed, or never started, is redone by this job's
+        // own normalize call so its error surfaces like any other job's.
+        let prefetched_normalize = match pending_normalize.take() {
+            Some(prefetch) => match prefetch.wait().await {
+                Ok((normalizer, Ok(assets))) => Some((normalizer, assets)),
+                _ => None,
+            },
+            None => None,
+        };
+        let normalizer = match prefetched_normalize {
+            Some((normalizer, assets)) => PrefetchedNormalizer::new(normalizer, Some(Ok(assets))),
+            None => PrefetchedNormalizer::new(build_normalizer(job)?, None),
+        };
+        let ingestor = PrefetchedIngestor::new(
+            CompositeIngestor::new()?,
+            prefetched.get_mut(idx).and_then(Option::take),
+        );
+        let converter = LatexConverter::new(
+            cfg.api_key.clone(),
+            monitor.clone(),
+            Some(quota.clone()),
+            cfg.retry,
         )?;
-        let ingestor = CompositeIngestor::new()?;
-        let converter =
-            LatexConverter::new(cfg.api_key.clone(), monitor.clone(), Some(quota.clone()))?;
         let mut engine = Engine::new(
             Box::new(ingestor),
             Box::new(normalizer),
@@ -485,8 +535,26 @@ async fn run_primary(cli: cli::Cli) -> anyhow::Result<()> {
         })
         .ok();
 
+        // Normalize (ffmpeg/pdftoppm) the next source on its own thread once
+        // this one's normalization is done and it is waiting on Gemini,
+        // unless that job will be skipped.
+        if let Some(Some(Ok(next_assets))) = prefetched.get(idx + 1) {
+            let next_job = &jobs[idx + 1];
+            if !next_assets.is_empty()
+                && engine::up_to_date_output(next_job, next_assets, &prefetch_templates).is_none()
+            {
+                let (prefetch, start) = NormalizePrefetch::prepare(
+                    next_job.clone(),
+                    next_assets.clone(),
+                    build_normalizer(next_job)?,
+                );
+                pending_normalize = Some(prefetch);
+                engine = engine.with_after_normalize(start);
+            }
+        }
+
         let result = tokio::select! {
-            res = engine.run(&job) => res,
+            res = engine.run(job) => res,
             _ = cancel_rx.recv() => {
                 println!("run cancelled by user (Ctrl+C)");
                 break;
@@ -562,6 +630,56 @@ async fn run_primary(cli: cli::Cli) -> anyhow::Result<()> {
     Ok(())
 }
 
+type NormalizeResult = (CompositeNormalizer, anyhow::Result<Vec<Asset>>);
+
+/// The next job's normalization, run on a detached thread so that shutdown
+/// never waits for it. Dropping it (Ctrl+C or a failed job) stops the work at
+/// the next step boundary and discards the result.
+struct NormalizePrefetch {
+    result: tokio::sync::oneshot::Receiver<NormalizeResult>,
+    cancelled: Arc<AtomicBool>,
+}
+
+impl NormalizePrefetch {
+    /// Returns the handle plus the closure that starts the work; if the
+    /// closure is never called, `wait` reports the prefetch as not done.
+    fn prepare(
+        job: Job,
+        assets: Vec<Asset>,
+        mut normalizer: CompositeNormalizer,
+    ) -> (Self, Box<dyn FnOnce() + Send>) {
+        let (sender, result) = tokio::sync::oneshot::channel();
+        let cancelled = Arc::new(AtomicBool::new(false));
+        let flag = cancelled.clone();
+        let start = move || {
+            std::thread::spawn(move || {
+                if flag.load(Ordering::Relaxed) {
+                    return;
+                }
+                let prepared = normalizer.prepare(&job);
+                if flag.load(Ordering::Relaxed) {
+                    return;
+                }
+                let normalized = prepared.and_then(|_| normalizer.normalize(&assets, job.pdf_mode));
+                let _ = sender.send((normalizer, normalized));
+            });
+        };
+        (Self { result, cancelled }, Box::new(start))
+    }
+
+    async fn wait(mut self) -> anyhow::Result<NormalizeResult> {
+        (&mut self.result)
+            .await
+            .map_err(|_| anyhow!("normalization prefetch stopped before finishing"))
+    }
+}
+
+impl Drop for NormalizePrefetch {
+    fn drop(&mut self) {
+        self.cancelled.store(true, Ordering::Relaxed);
+    }
+}
+
 fn parse_kind(input: &str) -> Option<Kind> {
     match input.to_lowercase().as_str() {
         "slides" => Some(Kind::Slides),
@@ -613,6 +731,15 @@ enum ConversionKind {
     Json,
 }
 
+struct PendingConversion {
+    source: PathBuf,
+    extension: String,
+    /// Size on disk; contents are read only when the input's batch is sent.
+    size: usize,
+    out_path: PathBuf,
+    operation: ConversionOperation,
+}
+
 fn run_conversion(
     source: PathBuf,
     output_dir: Option<PathBuf>,
@@ -621,6 +748,7 @@ fn run_conversion(
     model_override: Option<String>,
     recursive: bool,
     kind: ConversionKind,
+    batch_size: usize,
 ) -> anyhow::Result<()> {
     use std::fs;
 
@@ -638,7 +766,7 @@ fn run_conversion(
         .collect();
     let quota = QuotaMonitor::new(QuotaConfig::new(request_limits, token_limits));
     let monitor = telemetry::RunMonitor::new();
-    let converter = LatexConverter::new(cfg.api_key.clone(), monitor, Some(quota))?;
+    let converter = LatexConverter::new(cfg.api_key.clone(), monitor, Some(quota), cfg.retry)?;
 
     let mut files = collect_tex_files(&source, &file_pattern, recursive)?;
     if files.is_empty() && matches!(kind, ConversionKind::Json) && file_pattern == "*.tex" {
@@ -653,70 +781,38 @@ fn run_conversion(
     let prompt_json = loader.latex_to_json_prompt();
     let prompt_markdown_json = loader.markdown_to_json_prompt();
 
+    let mut pending = Vec::new();
     for tex_file in files {
-        let content = fs::read_to_string(&tex_file)
-            .with_context(|| format!("reading {}", tex_file.display()))?;
+        let size = fs::metadata(&tex_file)
+            .with_context(|| format!("reading {}", tex_file.display()))?
+            .len() as usize;
         let extension = tex_file
             .extension()
             .and_then(|ext| ext.to_str())
             .unwrap_or_default()
             .to_lowercase();
 
-        let mut metadata = Map::new();
-        metadata.insert(
-            "source".into(),
-            Value::String(tex_file.to_string_lossy().to_string()),
-        );
-        metadata.insert("input_extension".into(), Value::String(extension.clone()));
-
         let output_root = output_dir
             .clone()
             .or_else(|| cfg.output_dir.clone())
             .unwrap_or_else(|| tex_file.parent().unwrap_or(Path::new(".")).to_path_buf());
         fs::create_dir_all(&output_root)?;
 
-        match kind {
-            ConversionKind::Markdown => {
-                let metadata = metadata.clone();
-                let out_path = output_root.join(format!(
-                    "{}.md",
-                    tex_file.file_stem().unwrap_or_default().to_string_lossy()
-                ));
-                if skip_existing && out_path.exists() {
-                    continue;
-                }
-                let text = converter.latex_to_markdown(
-                    &default_model,
-                    &prompt_markdown,
-                    &content,
-                    metadata,
-                )?;
-                let mut value = text;
-                if !value.ends_with('\n') {
-                    value.push('\n');
-                }
-                fs::write(out_path, value)?;
-            }
+        let stem = tex_file
+            .file_stem()
+            .unwrap_or_default()
+            .to_string_lossy()
+            .to_string();
+        let (out_path, operation) = match kind {
+            ConversionKind::Markdown => (
+                output_root.join(format!("{stem}.md")),
+                ConversionOperation::LatexToMarkdown,
+            ),
             ConversionKind::Json => {
-                let metadata = metadata.clone();
-                let out_path = output_root.join(format!(
-                    "{}.json",
-                    tex_file.file_stem().unwrap_or_default().to_string_lossy()
-                ));
-                if skip_existing && out_path.exists() {
-                    continue;
-                }
-                let operation = extension.as_str();
-                let text = match operation {
-                    "tex" | "ltx" => {
-                        converter.latex_to_json(&default_model, &prompt_json, &content, metadata)?
-                    }
-                    "md" | "markdown" | "mdown" => converter.markdown_to_json(
-                        &default_model,
-                        &prompt_markdown_json,
-                        &content,
-                        metadata,
-                    )?,
+                let out_path = output_root.join(format!("{stem}.json"));
+                let operation = match extension.as_str() {
+                    "tex" | "ltx" => ConversionOperation::LatexToJson,
+                    "md" | "markdown" | "mdown" => ConversionOperation::MarkdownToJson,
                     _ => {
                         println!(
                             "Skipping {} (unsupported extension {})",
@@ -726,11 +822,68 @@ fn run_conversion(
                         continue;
                     }
                 };
+                (out_path, operation)
+            }
+        };
+        if skip_existing && out_path.exists() {
+            continue;
+        }
+        pending.push(PendingConversion {
+            source: tex_file,
+            extension,
+            size,
+            out_path,
+            operation,
+        });
+    }
+
+    for operation in [
+        ConversionOperation::LatexToMarkdown,
+        ConversionOperation::LatexToJson,
+        ConversionOperation::MarkdownToJson,
+    ] {
+        let prompt = match operation {
+            ConversionOperation::LatexToMarkdown => &prompt_markdown,
+            ConversionOperation::LatexToJson => &prompt_json,
+            ConversionOperation::MarkdownToJson => &prompt_markdown_json,
+        };
+        let group: Vec<&PendingConversion> = pending
+            .iter()
+            .filter(|item| item.operation == operation)
+            .collect();
+        let lengths: Vec<usize> = group.iter().map(|item| item.size).collect();
+        for range in plan_batches(&lengths, batch_size, BATCH_CHAR_BUDGET) {
+            let batch = &group[range];
+            let contents = batch
+                .iter()
+                .map(|item| {
+                    fs::read_to_string(&item.source)
+                        .with_context(|| format!("reading {}", item.source.display()))
+                })
+                .collect::<anyhow::Result<Vec<String>>>()?;
+            let items: Vec<(&str, Map<String, Value>)> = batch
+                .iter()
+                .zip(&contents)
+                .map(|(item, content)| {
+                    let mut metadata = Map::new();
+                    metadata.insert(
+                        "source".into(),
+                        Value::String(item.source.to_string_lossy().to_string()),
+                    );
+                    metadata.insert(
+                        "input_extension".into(),
+                        Value::String(item.extension.clone()),
+                    );
+                    (content.as_str(), metadata)
+                })
+                .collect();
+            let outputs = converter.convert_batch(operation, &default_model, prompt, &items)?;
+            for (item, text) in batch.iter().zip(outputs) {
                 let mut value = text;
                 if !value.ends_with('\n') {
                     value.push('\n');
                 }
-                fs::write(out_path, value)?;
+                fs::write(&item.out_path, value)?;
             }
         }
     }
@@ -746,37 +899,36 @@ fn run_plan(cfg: &config::AppConfig, job: Job, json_output: bool) -> anyhow::Res
     let normalized = normalizer.normalize(&assets, job.pdf_mode)?;
     let final_kind = job.kind.unwrap_or_else(|| infer_kind_from_assets(&assets));
     let modality = modality_for_assets(&normalized);
-    let chunks = normalizer.chunk_descriptors();
-
-    let report = json!({
-        "job": {
-            "source": job.source,
-            "recursive": job.recursive,
-            "kind": final_kind.as_str(),
-            "pdf_mode": pdf_mode_to_str(job.pdf_mode),
-            "pages": job.page_selection.as_ref().map(|value| value.to_string()),
-            "model": job.model,
-            "preset": job.preset,
-            "export": job.export,
-            "skip_existing": job.skip_existing,
-            "media_resolution": job.media_resolution,
-            "format": job.format.as_str(),
-            "pdf_dpi": job.pdf_dpi,
+
+    let report = PlanReport {
+        assets: assets.iter().map(PlanAsset::from).collect(),
+        chunks: normalizer.chunk_descriptors(),
+        job: PlanJob {
+            export: &job.export,
+            format: job.format.as_str(),
+            kind: final_kind.as_str(),
+            media_resolution: job.media_resolution.as_deref(),
+            model: &job.model,
+            pages: job.page_selection.as_ref().map(|value| value.to_string()),
+            pdf_dpi: job.pdf_dpi,
+            pdf_mode: pdf_mode_to_str(job.pdf_mode),
+            preset: job.preset.as_deref(),
+            recursive: job.recursive,
+            skip_existing: job.skip_existing,
+            source: &job.source,
         },
-        "kind": final_kind.as_str(),
-        "modality": modality,
-        "assets": assets.iter().map(asset_to_value).collect::<Vec<_>>(),
-        "normalized": normalized
-            .iter()
-            .map(asset_to_value)
-            .collect::<Vec<_>>(),
-        "chunks": chunks,
-    });
+        kind: final_kind.as_str(),
+        modality,
+        normalized: normalized.iter().map(PlanAsset::from).collect(),
+    };
 
     if json_output {
-        println!("{}", serde_json::to_string_pretty(&report)?);
+        let stdout = std::io::stdout();
+        let mut handle = stdout.lock();
+        serde_json::to_writer_pretty(&mut handle, &report)?;
+        writeln!(handle)?;
     } else {
-        print_plan_human(&report)?;
+        print_plan_human(&report);
     }
     Ok(())
 }
@@ -786,15 +938,9 @@ fn build_ingestion_stack(
     model: &str,
     pdf_dpi: u32,
 ) -> anyhow::Result<(CompositeIngestor, CompositeNormalizer)> {
-    let capability_table = constants::model_capabilities();
-    let model_key = model.to_string();
-    let capability_checker = move |capability: &str| {
-        capability_table
-            .get(model_key.as_str())
-            .or_else(|| capability_table.get(constants::DEFAULT_MODEL))
-            .map(|caps| caps.contains(&capability))
-            .unwrap_or(true)
-    };
+    let capabilities = constants::model_capabilities(model);
+    let capability_checker =
+        move |capability: &str| capabilities.is_none_or(|caps| caps.contains(&capability));
 
     let normalizer = CompositeNormalizer::new(
         None,
@@ -810,67 +956,72 @@ fn build_ingestion_stack(
     Ok((ingestor, normalizer))
 }
 
-fn asset_to_value(asset: &Asset) -> Value {
-    let mut meta = Value::Null;
-    if !asset.meta.is_null() {
-        meta = asset.meta.clone();
-    }
-    json!({
-        "path": asset.path.to_string_lossy(),
-        "media": asset.media,
-        "page_index": asset.page_index,
-        "source_kind": format!("{:?}", asset.source_kind),
-        "mime": asset.mime,
-        "meta": meta,
-    })
+// Fields are declared in alphabetical order so the serialized report keeps
+// the sorted key order of the previous serde_json::Value-based output.
+#[derive(Serialize)]
+struct PlanReport<'a> {
+    assets: Vec<PlanAsset<'a>>,
+    chunks: &'a [Value],
+    job: PlanJob<'a>,
+    kind: &'a str,
+    modality: Option<String>,
+    normalized: Vec<PlanAsset<'a>>,
 }
 
-fn print_plan_human(report: &Value) -> anyhow::Result<()> {
-    let job = report
-        .get("job")
-        .and_then(|v| v.as_object())
-        .cloned()
-        .unwrap_or_default();
-    let source = job
-        .get("source")
-        .and_then(|v| v.as_str())
-        .unwrap_or("unknown");
-    let kind = report
-        .get("kind")
-        .and_then(|v| v.as_str())
-        .unwrap_or("unknown");
-    let modality = report
-        .get("modality")
-        .and_then(|v| v.as_str())
-        .unwrap_or("unknown");
-    let assets = report
-        .get("assets")
-        .and_then(|v| v.as_array())
-        .cloned()
-        .unwrap_or_default();
-    let chunks_len = report
-        .get("chunks")
-        .and_then(|v| v.as_array())
-        .map(|arr| arr.len())
-        .unwrap_or(0);
+#[derive(Serialize)]
+struct PlanJob<'a> {
+    export: &'a [String],
+    format: &'a str,
+    kind: &'a str,
+    media_resolution: Option<&'a str>,
+    model: &'a str,
+    pages: Option<String>,
+    pdf_dpi: u32,
+    pdf_mode: &'a str,
+    preset: Option<&'a str>,
+    recursive: bool,
+    skip_existing: bool,
+    source: &'a str,
+}
+
+#[derive(Serialize)]
+struct PlanAsset<'a> {
+    media: &'a str,
+    meta: &'a Value,
+    mime: Option<&'a str>,
+    page_index: Option<u32>,
+    path: std::borrow::Cow<'a, str>,
+    source_kind: String,
+}
+
+impl<'a> From<&'a Asset> for PlanAsset<'a> {
+    fn from(asset: &'a Asset) -> Self {
+        Self {
+            media: &asset.media,
+            meta: &asset.meta,
+            mime: asset.mime.as_deref(),
+            page_index: asset.page_index,
+            path: asset.path.to_string_lossy(),
+            source_kind: format!("{:?}", asset.source_kind),
+        }
+    }
+}
 
-    println!("Source: {}", source);
-    println!("Kind:   {}", kind);
-    println!("Modality: {}", modality);
-    println!("Assets: {}", assets.len());
-    for asset in assets.iter().take(10) {
-        let path = asset
-            .get("path")
-            .and_then(|v| v.as_str())
-            .unwrap_or("<unknown>");
-        let media = asset.get("media").and_then(|v| v.as_str()).unwrap_or("?");
-        println!("  - {} ({})", path, media);
+fn print_plan_human(report: &PlanReport) {
+    println!("Source: {}", report.job.source);
+    println!("Kind:   {}", report.kind);
+    println!(
+        "Modality: {}",
+        report.modality.as_deref().unwrap_or("unknown")
+    );
+    println!("Assets: {}", report.assets.len());
+    for asset in report.assets.iter().take(10) {
+        println!("  - {} ({})", asset.path, asset.media);
     }
-    if assets.len() > 10 {
-        println!("  ... {} more", assets.len() - 10);
+    if report.assets.len() > 10 {
+        println!("  ... {} more", report.assets.len() - 10);
     }
-    println!("Chunks planned: {}", chunks_len);
-    Ok(())
+    println!("Chunks planned: {}", report.chunks.len());
 }
 
 fn infer_kind_from_assets(assets: &[Asset]) -> Kind {
@@ -1018,26 +1169,33 @@ fn run_report_cost(path: &Path, json_output: bool) -> anyhow::Result<()> {
 }
 
 fn run_cleanup_cache(dry_run: bool, yes: bool) -> anyhow::Result<()> {
-    let Some(mut base) = dirs::cache_dir() else {
-        println!("No cache directory available on this platform.");
-        return Ok(());
-    };
-    base = base.join("recapit");
-    if !base.exists() {
-        println!("Cache directory not found: {}", base.display());
+    let mut candidates: Vec<PathBuf> = dirs::cache_dir()
+        .map(|base| base.join("recapit"))
+        .into_iter()
+        .collect();
+    candidates.extend(url_cache_dirs());
+    let targets: Vec<PathBuf> = candidates.into_iter().filter(|dir| dir.exists()).collect();
+    if targets.is_empty() {
+        println!("No cache directories found");
         return Ok(());
     }
     if !yes && !dry_run {
+        let listed: Vec<String> = targets
+            .iter()
+            .map(|dir| dir.display().to_string())
+            .collect();
         anyhow::bail!(
             "Refusing to remove {}; pass --yes to confirm",
-            base.display()
+            listed.join(", ")
         );
     }
-    if dry_run {
-        println!("Would remove {}", base.display());
-    } else {
-        fs::remove_dir_all(&base)?;
-        println!("Removed {}", base.display());
+    for target in targets {
+        if dry_run {
+            println!("Would remove {}", target.display());
+        } else {
+            fs::remove_dir_all(&target)?;
+            println!("Removed {}", target.display());
+        }
     }
     Ok(())
 }
@@ -1065,3 +1223,82 @@ fn run_cleanup_downloads(path: &Path, dry_run: bool, yes: bool) -> anyhow::Resul
     }
     Ok(())
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn prefetch_for(root: &Path) -> (NormalizePrefetch, Box<dyn FnOnce() + Send>) {
+        let job = Job {
+            source: root.join("notes.txt").display().to_string(),
+            job_label: "next".into(),
+            job_id: "next".into(),
+            job_index: 1,
+            job_total: 2,
+            recursive: false,
+            kind: None,
+            pdf_mode: PdfMode::Auto,
+            output_dir: Some(root.to_path_buf()),
+            model: crate::constants::DEFAULT_MODEL.into(),
+            preset: None,
+            export: Vec::new(),
+            format: OutputFormat::Markdown,
+            skip_existing: false,
+            page_selection: None,
+            media_resolution: None,
+            save_full_response: false,
+            save_intermediates: false,
+            save_metadata: false,
+            max_workers: 1,
+            max_video_workers: 1,
+            pdf_dpi: 200,
+        };
+        let asset = Asset {
+            path: root.join("notes.txt"),
+            media: "text".into(),
+            page_index: None,
+            source_kind: crate::core::SourceKind::Local,
+            mime: None,
+            meta: Value::Null,
+        };
+        let normalizer = CompositeNormalizer::new(
+            Some(root.to_path_buf()),
+            crate::video::VideoEncoderPreference::Auto,
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+        )
+        .unwrap();
+        NormalizePrefetch::prepare(job, vec![asset], normalizer)
+    }
+
+    #[tokio::test]
+    async fn started_prefetch_hands_back_its_result() {
+        let dir = tempfile::tempdir().unwrap();
+        let (prefetch, start) = prefetch_for(dir.path());
+        start();
+        let (_, normalized) = prefetch.wait().await.unwrap();
+        assert_eq!(normalized.unwrap().len(), 1);
+    }
+
+    #[tokio::test]
+    async fn prefetch_that_never_starts_reports_not_done() {
+        let dir = tempfile::tempdir().unwrap();
+        let (prefetch, start) = prefetch_for(dir.path());
+        drop(start);
+        assert!(prefetch.wait().await.is_err());
+    }
+
+    #[tokio::test]
+    async fn dropping_prefetch_flags_it_cancelled() {
+        let dir = tempfile::tempdir().unwrap();
+        let (prefetch, start) = prefetch_for(dir.path());
+        let cancelled = prefetch.cancelled.clone();
+        drop(prefetch);
+        assert!(cancelled.load(Ordering::Relaxed));
+        start();
+    }
+}
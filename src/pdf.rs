@@ -1,10 +1,16 @@
 use anyhow::{anyhow, bail, Context, Result};
+use rayon::prelude::*;
+use std::collections::HashMap;
 use std::fs;
 use std::path::{Path, PathBuf};
 use std::process::Command;
+use std::sync::{Mutex, OnceLock};
+use std::time::SystemTime;
 
 use crate::selection::IndexSelection;
 
+const RENDER_BATCH_PAGES: u32 = 20;
+
 #[derive(Debug, Clone)]
 pub struct PdfPage {
     pub path: PathBuf,
@@ -32,15 +38,30 @@ pub fn pdf_to_png(
         .unwrap_or_else(|| "page".into());
     let output = out_dir.join(stem);
 
-    let ranges = if let Some(selection) = selection {
-        let total_pages = page_count(pdf)? as u32;
-        Some(selection.merged_ranges(total_pages)?)
-    } else {
-        None
+    let ranges = match selection {
+        Some(selection) => {
+            let total_pages = page_count(pdf)? as u32;
+            Some(selection.merged_ranges(total_pages)?)
+        }
+        None => page_count(pdf)
+            .ok()
+            .filter(|&total| total > 0)
+            .map(|total| vec![(1, total as u32)]),
     };
 
     if let Some(ranges) = ranges {
-        for (start, end) in ranges {
+        // pdftoppm renders on a single core, so split the work into page
+        // batches and run one process per batch side by side.
+        let batch_pages = render_batch_pages(&ranges, rayon::current_num_threads());
+        let batches: Vec<(u32, u32)> = ranges
+            .into_iter()
+            .flat_map(|(start, end)| {
+                (start..=end)
+                    .step_by(batch_pages as usize)
+                    .map(move |first| (first, (first + batch_pages - 1).min(end)))
+            })
+            .collect();
+        batches.par_iter().try_for_each(|&(start, end)| {
             let status = Command::new(&pdftoppm)
                 .arg("-png")
                 .arg("-r")
@@ -58,7 +79,8 @@ pub fn pdf_to_png(
                     pdf.display()
                 );
             }
-        }
+            Ok(())
+        })?;
     } else {
         let status = Command::new(&pdftoppm)
             .arg("-png")
@@ -90,7 +112,40 @@ pub fn pdf_to_png(
     Ok(pages)
 }
 
+/// Pages per pdftoppm process: spread short documents across every worker
+/// instead of leaving them on one core, but cap batches so each process'
+/// document parse is amortized over at most `RENDER_BATCH_PAGES` pages.
+fn render_batch_pages(ranges: &[(u32, u32)], workers: usize) -> u32 {
+    let total: u32 = ranges.iter().map(|(start, end)| end + 1 - start).sum();
+    let workers = u32::try_from(workers.max(1)).unwrap_or(u32::MAX);
+    total.div_ceil(workers).clamp(1, RENDER_BATCH_PAGES)
+}
+
+type PageCountKey = (PathBuf, u64, Option<SystemTime>);
+
+static PAGE_COUNTS: OnceLock<Mutex<HashMap<PageCountKey, usize>>> = OnceLock::new();
+
+/// Page count via `pdfinfo`, memoized per file (path, size and mtime) so the
+/// same PDF is only inspected once per process.
 pub fn page_count(path: &Path) -> Result<usize> {
+    let key = fs::metadata(path)
+        .ok()
+        .map(|meta| (path.to_path_buf(), meta.len(), meta.modified().ok()));
+    let cache = PAGE_COUNTS.get_or_init(|| Mutex::new(HashMap::new()));
+    if let Some(count) = key
+        .as_ref()
+        .and_then(|key| cache.lock().unwrap().get(key).copied())
+    {
+        return Ok(count);
+    }
+    let count = read_page_count(path)?;
+    if let Some(key) = key {
+        cache.lock().unwrap().insert(key, count);
+    }
+    Ok(count)
+}
+
+fn read_page_count(path: &Path) -> Result<usize> {
     let output = Command::new("pdfinfo")
         .arg(path)
         .output()
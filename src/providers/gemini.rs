@@ -1,34 +1,42 @@
 use std::collections::{HashMap, HashSet};
 use std::fs;
 use std::path::{Path, PathBuf};
-use std::sync::Mutex;
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::{Arc, Mutex};
 use std::thread;
-use std::time::Duration;
+use std::time::{Duration, Instant};
 
 use std::io::ErrorKind;
 
 use anyhow::{anyhow, Context, Result};
 use base64::engine::general_purpose::STANDARD as BASE64;
 use base64::Engine;
+use bytes::Bytes;
 use rand::Rng;
 use rayon::prelude::*;
-use rayon::ThreadPoolBuilder;
+use rayon::{ThreadPool, ThreadPoolBuilder};
 use reqwest::blocking::Client;
 use reqwest::header::{HeaderMap, HeaderValue, CONTENT_LENGTH, CONTENT_TYPE};
 use reqwest::StatusCode;
 use serde_json::{json, Map, Value};
+use sha2::{Digest, Sha256};
 use time::format_description::well_known::Rfc3339;
 use time::OffsetDateTime;
 
+use crate::config::RetryPolicy;
+use crate::constants::MAX_OUTPUT_TOKENS;
 use crate::core::{Asset, Provider, SourceKind};
 use crate::progress::{Progress, ProgressScope, ProgressStage};
-use crate::telemetry::{RequestEvent, RunMonitor};
-use crate::utils::ensure_dir;
+use crate::ratelimit::{estimate_text_tokens, throttle_delay};
+use crate::telemetry::{usage_counts, RequestEvent, RunMonitor};
+use crate::utils::{ensure_dir, write_atomic};
 
 const INLINE_THRESHOLD_BYTES: usize = 20 * 1024 * 1024;
-const MAX_RETRIES: usize = 3;
 const BACKOFF_BASE_SECONDS: f64 = 1.0;
 const BACKOFF_CAP_SECONDS: f64 = 8.0;
+const STATE_POLL_INITIAL_SECONDS: f64 = 0.1;
+const STATE_POLL_FACTOR: f64 = 1.5;
+const STATE_POLL_CAP_SECONDS: f64 = 2.0;
 
 pub struct GeminiProvider {
     api_key: String,
@@ -38,7 +46,18 @@ pub struct GeminiProvider {
     progress: Option<tokio::sync::mpsc::UnboundedSender<Progress>>,
     upload_cache: Mutex<HashMap<String, CachedUpload>>,
     cleanup: Mutex<HashSet<String>>,
+    worker_pools: Mutex<HashMap<usize, Arc<ThreadPool>>>,
     quota: Option<crate::quota::QuotaMonitor>,
+    retry: RetryPolicy,
+}
+
+/// A chunk that still needs a generate call, prepared before the fan-out.
+struct PendingChunk<'a> {
+    position: usize,
+    chunk_index: u64,
+    asset: &'a Asset,
+    response_path: Option<PathBuf>,
+    meta: Value,
 }
 
 #[derive(Clone)]
@@ -54,11 +73,9 @@ impl GeminiProvider {
         model: String,
         monitor: RunMonitor,
         quota: Option<crate::quota::QuotaMonitor>,
+        retry: RetryPolicy,
     ) -> Self {
-        let http = Client::builder()
-            .timeout(std::time::Duration::from_secs(600))
-            .build()
-            .expect("failed to build reqwest client");
+        let http = retry.http_client().expect("failed to build reqwest client");
         Self {
             api_key,
             model,
@@ -67,7 +84,9 @@ impl GeminiProvider {
             progress: None,
             upload_cache: Mutex::new(HashMap::new()),
             cleanup: Mutex::new(HashSet::new()),
+            worker_pools: Mutex::new(HashMap::new()),
             quota,
+            retry,
         }
     }
 
@@ -76,6 +95,19 @@ impl GeminiProvider {
         self
     }
 
+    /// Pools are kept per size for the provider's lifetime, so every fan-out
+    /// of a job reuses the same worker threads (and through them the shared
+    /// HTTP connections) instead of spawning a pool per call.
+    fn worker_pool(&self, threads: usize) -> Result<Arc<ThreadPool>> {
+        let mut pools = self.worker_pools.lock().unwrap();
+        if let Some(pool) = pools.get(&threads) {
+            return Ok(pool.clone());
+        }
+        let pool = Arc::new(ThreadPoolBuilder::new().num_threads(threads).build()?);
+        pools.insert(threads, pool.clone());
+        Ok(pool)
+    }
+
     fn send_progress(&self, progress: Progress) {
         if let Some(tx) = &self.progress {
             let _ = tx.send(progress);
@@ -85,7 +117,8 @@ impl GeminiProvider {
     fn part_for_asset(&self, asset: &Asset) -> Result<(Value, Map<String, Value>)> {
         let mut metadata = Map::new();
         if let Some(obj) = asset.meta.as_object() {
-            for (key, value) in obj {
+            // The encoded payload goes into the request part, not telemetry.
+            for (key, value) in obj.iter().filter(|(key, _)| *key != "inline_bytes") {
                 metadata.insert(key.clone(), value.clone());
             }
         }
@@ -124,55 +157,47 @@ impl GeminiProvider {
             .get("inline_bytes")
             .and_then(|value| value.as_str())
         {
-            let part = json!({
-                "inline_data": {
-                    "data": inline_bytes,
-                    "mime_type": mime,
-                }
-            });
-            return Ok((part, metadata));
+            return Ok((inline_part(inline_bytes.to_string(), mime), metadata));
         }
 
         let bytes = fs::read(&asset.path)
             .with_context(|| format!("reading asset {}", asset.path.display()))?;
         if bytes.len() <= INLINE_THRESHOLD_BYTES {
-            let encoded = BASE64.encode(&bytes);
-            let part = json!({
-                "inline_data": {
-                    "data": encoded,
-                    "mime_type": mime,
-                }
-            });
-            return Ok((part, metadata));
+            return Ok((inline_part(BASE64.encode(&bytes), mime), metadata));
         }
 
-        if let Some(key) = asset.meta.get("upload_cache_key").and_then(|v| v.as_str()) {
-            if let Some(cached) = self.upload_cache.lock().unwrap().get(key).cloned() {
-                let part = json!({
-                    "file_data": {
-                        "file_uri": cached.uri,
-                        "mime_type": cached.mime_type,
-                    }
-                });
-                metadata.insert("file_uri".into(), Value::String(cached.uri));
-                if let Some(name) = cached.name.as_ref() {
-                    metadata.insert("file_name".into(), Value::String(name.clone()));
+        // URL sources carry a key derived from their address; anything else is
+        // keyed by content, so the same bytes are uploaded once per run.
+        let cache_key = asset
+            .meta
+            .get("upload_cache_key")
+            .and_then(|v| v.as_str())
+            .map(|key| key.to_string())
+            .unwrap_or_else(|| hex::encode(Sha256::digest(&bytes)));
+        let cached = self.upload_cache.lock().unwrap().get(&cache_key).cloned();
+        if let Some(cached) = cached {
+            let part = json!({
+                "file_data": {
+                    "file_uri": cached.uri,
+                    "mime_type": cached.mime_type,
                 }
-                return Ok((part, metadata));
+            });
+            metadata.insert("file_uri".into(), Value::String(cached.uri));
+            if let Some(name) = cached.name.as_ref() {
+                metadata.insert("file_name".into(), Value::String(name.clone()));
             }
+            return Ok((part, metadata));
         }
 
-        let upload = self.upload_file(asset, &bytes, &mime)?;
-        if let Some(cache_key) = asset.meta.get("upload_cache_key").and_then(|v| v.as_str()) {
-            self.upload_cache.lock().unwrap().insert(
-                cache_key.to_string(),
-                CachedUpload {
-                    uri: upload.uri.clone(),
-                    mime_type: upload.mime_type.clone(),
-                    name: upload.name.clone(),
-                },
-            );
-        }
+        let upload = self.upload_file(asset, Bytes::from(bytes), &mime)?;
+        self.upload_cache.lock().unwrap().insert(
+            cache_key,
+            CachedUpload {
+                uri: upload.uri.clone(),
+                mime_type: upload.mime_type.clone(),
+                name: upload.name.clone(),
+            },
+        );
         metadata.insert("file_uri".into(), Value::String(upload.uri.clone()));
         if let Some(name) = upload.name.as_ref() {
             metadata.insert("file_name".into(), Value::String(name.clone()));
@@ -186,7 +211,7 @@ impl GeminiProvider {
         Ok((part, metadata))
     }
 
-    fn upload_file(&self, asset: &Asset, bytes: &[u8], mime: &str) -> Result<CachedUpload> {
+    fn upload_file(&self, asset: &Asset, bytes: Bytes, mime: &str) -> Result<CachedUpload> {
         let start_url = format!(
             "https://generativelanguage.googleapis.com/v1beta/files:upload?key={}",
             self.api_key
@@ -202,7 +227,7 @@ impl GeminiProvider {
         let upload_url = {
             let mut attempt = 0;
             loop {
-                self.apply_quota_delay("files");
+                self.apply_quota_delay("files", 0);
 
                 let mut headers = HeaderMap::new();
                 headers.insert(
@@ -242,7 +267,7 @@ impl GeminiProvider {
                             return Err(anyhow!("missing X-Goog-Upload-URL header"));
                         }
 
-                        if should_retry_status(resp.status()) && attempt < MAX_RETRIES {
+                        if should_retry_status(resp.status()) && attempt < self.retry.max_retries {
                             let delay = backoff_delay(attempt);
                             self.monitor.note_event(
                                 "retry.files.upload_start",
@@ -267,7 +292,7 @@ impl GeminiProvider {
                         ));
                     }
                     Err(err) => {
-                        if is_retryable_error(&err) && attempt < MAX_RETRIES {
+                        if is_retryable_error(&err) && attempt < self.retry.max_retries {
                             let delay = backoff_delay(attempt);
                             self.monitor.note_event(
                                 "retry.files.upload_start",
@@ -308,12 +333,12 @@ impl GeminiProvider {
         let finalize_resp = {
             let mut attempt = 0;
             loop {
-                self.apply_quota_delay("files");
+                self.apply_quota_delay("files", 0);
                 match self
                     .http
                     .post(&upload_url)
                     .headers(upload_headers.clone())
-                    .body(bytes.to_owned())
+                    .body(bytes.clone())
                     .send()
                 {
                     Ok(resp) => {
@@ -321,7 +346,7 @@ impl GeminiProvider {
                             break resp;
                         }
 
-                        if should_retry_status(resp.status()) && attempt < MAX_RETRIES {
+                        if should_retry_status(resp.status()) && attempt < self.retry.max_retries {
                             let delay = backoff_delay(attempt);
                             self.monitor.note_event(
                                 "retry.files.upload_finalize",
@@ -346,7 +371,7 @@ impl GeminiProvider {
                         ));
                     }
                     Err(err) => {
-                        if is_retryable_error(&err) && attempt < MAX_RETRIES {
+                        if is_retryable_error(&err) && attempt < self.retry.max_retries {
                             let delay = backoff_delay(attempt);
                             self.monitor.note_event(
                                 "retry.files.upload_finalize",
@@ -435,8 +460,8 @@ impl GeminiProvider {
         modality: &str,
         meta: &Value,
     ) -> Result<(String, Vec<Map<String, Value>>)> {
-        let mut parts = Vec::new();
-        let mut asset_metadata = Vec::new();
+        let mut parts = Vec::with_capacity(assets.len() + 1);
+        let mut asset_metadata = Vec::with_capacity(assets.len());
         let mut event_metadata = meta.as_object().cloned().unwrap_or_default();
         let enumerated: Vec<(usize, &Asset)> = assets
             .iter()
@@ -457,9 +482,7 @@ impl GeminiProvider {
                     })
                     .collect::<Result<Vec<_>>>()?
             } else {
-                let pool = ThreadPoolBuilder::new()
-                    .num_threads(worker_limit.min(enumerated.len()))
-                    .build()?;
+                let pool = self.worker_pool(worker_limit.min(enumerated.len()))?;
                 pool.install(|| {
                     enumerated
                         .par_iter()
@@ -482,88 +505,73 @@ impl GeminiProvider {
         }
         parts.push(json!({"text": instruction}));
 
-        let request = json!({
+        // The parts hold the inline payloads; they are moved into the request
+        // rather than passed to `json!`, which would clone every one of them.
+        let mut request = json!({
             "contents": [
                 {
                     "role": "user",
-                    "parts": parts,
+                    "parts": [],
                 }
             ]
         });
+        request["contents"][0]["parts"] = Value::Array(parts);
+        let requested_limit = meta_u64(meta, "max_output_tokens");
+        let mut output_limit = requested_limit;
+        if let Some(limit) = requested_limit {
+            request["generationConfig"] = json!({ "maxOutputTokens": limit });
+            if let Some(budget) = crate::constants::thinking_budget(&self.model) {
+                request["generationConfig"]["thinkingConfig"] = json!({ "thinkingBudget": budget });
+            }
+        }
 
         let url = format!(
             "https://generativelanguage.googleapis.com/v1beta/models/{}:generateContent",
             self.model
         );
 
-        let (payload, started, finished, retries) = {
-            let mut attempt = 0;
-            let mut retries = 0;
-            loop {
-                self.apply_quota_delay(&self.model);
-                let started_at = OffsetDateTime::now_utc();
-                match self
-                    .http
-                    .post(&url)
-                    .query(&[("key", self.api_key.as_str())])
-                    .json(&request)
-                    .send()
-                {
-                    Ok(resp) => {
-                        if resp.status().is_success() {
-                            let finished_at = OffsetDateTime::now_utc();
-                            let payload: Value =
-                                resp.json().context("parsing generateContent response")?;
-                            break (payload, started_at, finished_at, retries);
-                        }
-
-                        if should_retry_status(resp.status()) && attempt < MAX_RETRIES {
-                            let delay = backoff_delay(attempt);
-                            self.monitor.note_event(
-                                "retry.generateContent",
-                                json!({
-                                    "attempt": attempt + 1,
-                                    "delay_ms": delay.as_millis(),
-                                    "status": resp.status().as_u16(),
-                                    "model": self.model,
-                                }),
-                            );
-                            thread::sleep(delay);
-                            attempt += 1;
-                            retries += 1;
-                            continue;
-                        }
-
-                        let status = resp.status();
-                        let text = resp.text().unwrap_or_default();
-                        return Err(anyhow!(
-                            "generateContent failed with status {}: {}",
-                            status,
-                            text
-                        ));
-                    }
-                    Err(err) => {
-                        if is_retryable_error(&err) && attempt < MAX_RETRIES {
-                            let delay = backoff_delay(attempt);
-                            self.monitor.note_event(
-                                "retry.generateContent",
-                                json!({
-                                    "attempt": attempt + 1,
-                                    "delay_ms": delay.as_millis(),
-                                    "error": err.to_string(),
-                                    "model": self.model,
-                                }),
-                            );
-                            thread::sleep(delay);
-                            attempt += 1;
-                            retries += 1;
-                            continue;
-                        }
-                        return Err(err).context("calling generateContent");
-                    }
-                }
-            }
-        };
+        // Only the prompt text can be sized up front; media tokens are
+        // charged when the response reports usage.
+        let estimated_tokens = estimate_text_tokens(instruction);
+        // Serialized once up front: inline media can be megabytes of base64,
+        // and retries resend the same bytes without re-encoding the JSON.
+        let body = Bytes::from(serde_json::to_vec(&request).context("encoding request body")?);
+        drop(request);
+        let (mut payload, mut started, mut finished, mut retries) =
+            self.post_generate(&url, body.clone(), estimated_tokens)?;
+        let mut reserved_tokens = estimated_tokens;
+
+        // A reply cut off at a reduced cap is sent again once with the full
+        // output budget. The truncated attempt is still billed, so it is
+        // recorded before being replaced.
+        if is_truncated(&payload)
+            && requested_limit.is_some_and(|limit| limit < u64::from(MAX_OUTPUT_TOKENS))
+        {
+            let mut discarded = event_metadata.clone();
+            discarded.insert("truncated".into(), Value::Bool(true));
+            self.record_generate(
+                modality,
+                &payload,
+                started,
+                finished,
+                discarded,
+                reserved_tokens,
+            );
+            reserved_tokens = 0;
+            output_limit = Some(u64::from(MAX_OUTPUT_TOKENS));
+            let mut request: Value =
+                serde_json::from_slice(&body).context("decoding request body")?;
+            request["generationConfig"]["maxOutputTokens"] = json!(output_limit);
+            let body = Bytes::from(serde_json::to_vec(&request).context("encoding request body")?);
+            drop(request);
+            let (retry_payload, retry_started, retry_finished, retry_retries) =
+                self.post_generate(&url, body, 0)?;
+            payload = retry_payload;
+            started = retry_started;
+            finished = retry_finished;
+            retries += retry_retries + 1;
+        }
+        drop(body);
 
         let text = payload
             .get("candidates")
@@ -581,19 +589,16 @@ impl GeminiProvider {
             })
             .unwrap_or_default();
 
-        let usage = payload.get("usageMetadata");
-        let input_tokens = usage
-            .and_then(|u| u.get("promptTokenCount"))
-            .and_then(|v| v.as_u64())
-            .map(|v| v as u32);
-        let output_tokens = usage
-            .and_then(|u| u.get("candidatesTokenCount"))
-            .and_then(|v| v.as_u64())
-            .map(|v| v as u32);
-        let total_tokens = usage
-            .and_then(|u| u.get("totalTokenCount"))
-            .and_then(|v| v.as_u64())
-            .map(|v| v as u32);
+        if is_truncated(&payload) {
+            self.monitor.note_event(
+                "generate.truncated",
+                json!({
+                    "model": self.model,
+                    "modality": modality,
+                    "max_output_tokens": output_limit,
+                }),
+            );
+        }
 
         let asset_values: Vec<Value> = asset_metadata
             .iter()
@@ -610,23 +615,129 @@ impl GeminiProvider {
                 .or_insert(Value::String(uri.to_string()));
         }
 
-        let metadata_map: HashMap<String, Value> = event_metadata.clone().into_iter().collect();
-        let event = RequestEvent {
+        self.record_generate(
+            modality,
+            &payload,
+            started,
+            finished,
+            event_metadata,
+            reserved_tokens,
+        );
+
+        Ok((text, asset_metadata))
+    }
+
+    /// Posts a generateContent body, retrying throttled and transient
+    /// failures. Returns the reply, its wall-clock start and end, and the
+    /// number of retries it took.
+    fn post_generate(
+        &self,
+        url: &str,
+        body: Bytes,
+        estimated_tokens: u32,
+    ) -> Result<(Value, OffsetDateTime, OffsetDateTime, usize)> {
+        let mut attempt = 0;
+        let mut retries = 0;
+        loop {
+            self.apply_quota_delay(&self.model, if attempt == 0 { estimated_tokens } else { 0 });
+            // Latency comes from the monotonic clock; only the start is read
+            // from the wall clock, so NTP steps cannot skew durations.
+            let started_at = OffsetDateTime::now_utc();
+            let clock = Instant::now();
+            match self
+                .http
+                .post(url)
+                .query(&[("key", self.api_key.as_str())])
+                .header(CONTENT_TYPE, "application/json")
+                .body(body.clone())
+                .send()
+            {
+                Ok(resp) => {
+                    if resp.status().is_success() {
+                        let finished_at = started_at + clock.elapsed();
+                        let payload: Value =
+                            resp.json().context("parsing generateContent response")?;
+                        return Ok((payload, started_at, finished_at, retries));
+                    }
+
+                    let status = resp.status();
+                    if status == StatusCode::TOO_MANY_REQUESTS {
+                        self.register_throttle(&self.model);
+                    }
+                    if should_retry_status(status) && attempt < self.retry.max_retries {
+                        let delay = if status == StatusCode::TOO_MANY_REQUESTS {
+                            throttle_delay(resp, backoff_delay(attempt))
+                        } else {
+                            backoff_delay(attempt)
+                        };
+                        self.monitor.note_event(
+                            "retry.generateContent",
+                            json!({
+                                "attempt": attempt + 1,
+                                "delay_ms": delay.as_millis(),
+                                "status": status.as_u16(),
+                                "model": self.model,
+                            }),
+                        );
+                        thread::sleep(delay);
+                        attempt += 1;
+                        retries += 1;
+                        continue;
+                    }
+
+                    let text = resp.text().unwrap_or_default();
+                    return Err(anyhow!(
+                        "generateContent failed with status {}: {}",
+                        status,
+                        text
+                    ));
+                }
+                Err(err) => {
+                    if is_retryable_error(&err) && attempt < self.retry.max_retries {
+                        let delay = backoff_delay(attempt);
+                        self.monitor.note_event(
+                            "retry.generateContent",
+                            json!({
+                                "attempt": attempt + 1,
+                                "delay_ms": delay.as_millis(),
+                                "error": err.to_string(),
+                                "model": self.model,
+                            }),
+                        );
+                        thread::sleep(delay);
+                        attempt += 1;
+                        retries += 1;
+                        continue;
+                    }
+                    return Err(err).context("calling generateContent");
+                }
+            }
+        }
+    }
+
+    fn record_generate(
+        &self,
+        modality: &str,
+        payload: &Value,
+        started_at: OffsetDateTime,
+        finished_at: OffsetDateTime,
+        metadata: Map<String, Value>,
+        reserved_tokens: u32,
+    ) {
+        let (input_tokens, output_tokens, total_tokens) = usage_counts(payload);
+        self.monitor.record(RequestEvent {
             model: self.model.clone(),
             modality: modality.to_string(),
-            started_at: started,
-            finished_at: finished,
+            started_at,
+            finished_at,
             input_tokens,
             output_tokens,
             total_tokens,
-            metadata: metadata_map,
-        };
-        self.monitor.record(event.clone());
+            metadata: metadata.into_iter().collect(),
+        });
         if let Some(quota) = &self.quota {
-            quota.register_tokens(&self.model, event.total_tokens);
+            quota.register_tokens(&self.model, reserved_tokens, total_tokens);
         }
-
-        Ok((text, asset_metadata))
     }
 
     fn await_active_file(&self, name: &str) -> Result<Value> {
@@ -635,8 +746,11 @@ impl GeminiProvider {
             name, self.api_key
         );
         let mut attempt = 0;
+        let mut polls = 0;
+        let mut waited = Duration::ZERO;
+        let poll_budget = state_poll_budget(self.retry.max_retries);
         loop {
-            self.apply_quota_delay("files");
+            self.apply_quota_delay("files", 0);
             match self.http.get(&url).send() {
                 Ok(resp) => {
                     if resp.status().is_success() {
@@ -648,24 +762,25 @@ impl GeminiProvider {
                         if state == "ACTIVE" {
                             return Ok(value);
                         }
-                        if is_retryable_file_state(state) && attempt < MAX_RETRIES {
-                            let delay = backoff_delay(attempt);
+                        if is_retryable_file_state(state) && waited < poll_budget {
+                            let delay = state_poll_delay(polls);
                             self.monitor.note_event(
                                 "retry.files.await_active",
                                 json!({
-                                    "attempt": attempt + 1,
+                                    "attempt": polls + 1,
                                     "delay_ms": delay.as_millis(),
                                     "state": state,
                                     "name": name,
                                 }),
                             );
                             thread::sleep(delay);
-                            attempt += 1;
+                            waited += delay;
+                            polls += 1;
                             continue;
                         }
                         return Err(anyhow!("file {} returned terminal state {}", name, state));
                     }
-                    if should_retry_status(resp.status()) && attempt < MAX_RETRIES {
+                    if should_retry_status(resp.status()) && attempt < self.retry.max_retries {
                         let delay = backoff_delay(attempt);
                         self.monitor.note_event(
                             "retry.files.await_active",
@@ -685,7 +800,7 @@ impl GeminiProvider {
                     return Err(anyhow!("files.get failed with status {}: {}", status, text));
                 }
                 Err(err) => {
-                    if is_retryable_error(&err) && attempt < MAX_RETRIES {
+                    if is_retryable_error(&err) && attempt < self.retry.max_retries {
                         let delay = backoff_delay(attempt);
                         self.monitor.note_event(
                             "retry.files.await_active",
@@ -706,9 +821,9 @@ impl GeminiProvider {
         }
     }
 
-    fn apply_quota_delay(&self, bucket: &str) {
+    fn apply_quota_delay(&self, bucket: &str, estimated_tokens: u32) {
         if let Some(quota) = &self.quota {
-            if let Some(delay) = quota.register_request(bucket) {
+            if let Some(delay) = quota.register_request(bucket, estimated_tokens) {
                 if !delay.is_zero() {
                     self.monitor.note_event(
                         "quota.sleep",
@@ -723,6 +838,14 @@ impl GeminiProvider {
         }
     }
 
+    fn register_throttle(&self, bucket: &str) {
+        if let Some(quota) = &self.quota {
+            quota.register_throttle(bucket);
+            self.monitor
+                .note_event("quota.throttle", json!({ "bucket": bucket }));
+        }
+    }
+
     fn register_cleanup(&self, name: &str) {
         let inserted = self.cleanup.lock().unwrap().insert(name.to_string());
         if inserted {
@@ -760,7 +883,7 @@ impl GeminiProvider {
         );
         let mut attempt = 0;
         loop {
-            self.apply_quota_delay("files");
+            self.apply_quota_delay("files", 0);
             match self.http.delete(&url).send() {
                 Ok(resp) => {
                     if resp.status().is_success() {
@@ -771,7 +894,7 @@ impl GeminiProvider {
                             .note_event("files.cleanup.missing", json!({ "name": name }));
                         return Ok(());
                     }
-                    if should_retry_status(resp.status()) && attempt < MAX_RETRIES {
+                    if should_retry_status(resp.status()) && attempt < self.retry.max_retries {
                         let delay = backoff_delay(attempt);
                         self.monitor.note_event(
                             "files.cleanup.retry",
@@ -795,7 +918,7 @@ impl GeminiProvider {
                     ));
                 }
                 Err(err) => {
-                    if is_retryable_error(&err) && attempt < MAX_RETRIES {
+                    if is_retryable_error(&err) && attempt < self.retry.max_retries {
                         let delay = backoff_delay(attempt);
                         self.monitor.note_event(
                             "files.cleanup.retry",
@@ -869,8 +992,8 @@ impl GeminiProvider {
                 )
             } else {
                 let manifest_path_str = manifest_path.to_string_lossy().to_string();
-                let mut manifest = match fs::read_to_string(&manifest_path) {
-                    Ok(text) => match serde_json::from_str::<Value>(&text) {
+                let mut manifest = match fs::read(&manifest_path) {
+                    Ok(bytes) => match serde_json::from_slice::<Value>(&bytes) {
                         Ok(value) => value,
                         Err(err) => {
                             self.monitor.note_event(
@@ -908,8 +1031,13 @@ impl GeminiProvider {
                 (manifest_path_str, manifest, chunk_index_lookup)
             };
 
-        let mut responses = Vec::new();
-        for asset in assets {
+        // Chunks are prepared (and cached responses reused) in order, then the
+        // remaining requests run side by side; the manifest is only touched
+        // on this thread, before and after the fan-out.
+        let mut responses: Vec<Option<String>> = vec![None; assets.len()];
+        let mut pending: Vec<PendingChunk> = Vec::new();
+        for (position, asset) in assets.iter().enumerate() {
+            let asset = *asset;
             let chunk_index = meta_u64(&asset.meta, "chunk_index").unwrap_or(0);
             let entry_obj = if manifest_path.as_os_str().is_empty() {
                 None
@@ -968,15 +1096,14 @@ impl GeminiProvider {
             let response_path = chunk_dir
                 .as_ref()
                 .map(|dir| dir.join(format!("{name}-chunk{chunk_index:02}.txt")));
-            if let Some(path) = &response_path {
-                if let Some(entry_obj) = entry_obj.as_deref_mut() {
-                    entry_obj.insert(
-                        "response_path".into(),
-                        Value::String(path.to_string_lossy().to_string()),
-                    );
-                }
-            } else if let Some(entry_obj) = entry_obj.as_deref_mut() {
-                entry_obj.insert("response_path".into(), Value::Null);
+            let response_value = response_path
+                .as_ref()
+                .map(|path| Value::String(path.to_string_lossy().into_owned()));
+            if let Some(entry_obj) = entry_obj.as_deref_mut() {
+                entry_obj.insert(
+                    "response_path".into(),
+                    response_value.clone().unwrap_or(Value::Null),
+                );
             }
             if let Some(uri) = asset.meta.get("file_uri").and_then(|value| value.as_str()) {
                 if let Some(entry_obj) = entry_obj.as_mut() {
@@ -1003,7 +1130,7 @@ impl GeminiProvider {
             {
                 let path = response_path.as_ref().unwrap();
                 let text = fs::read_to_string(path)?;
-                responses.push(text.trim().to_string());
+                responses[position] = Some(trim_in_place(text));
                 if let Some(entry_obj) = entry_obj.as_mut() {
                     entry_obj.insert("status".into(), Value::String("done".into()));
                 }
@@ -1011,8 +1138,8 @@ impl GeminiProvider {
                     "chunk.skip",
                     json!({
                         "chunk_index": chunk_index,
-                        "manifest_path": manifest_path,
-                        "response_path": path,
+                        "manifest_path": manifest_path_str,
+                        "response_path": response_value,
                     }),
                 );
                 continue;
@@ -1029,23 +1156,40 @@ impl GeminiProvider {
             }
             chunk_meta_map.insert(
                 "manifest_path".into(),
-                Value::String(manifest_path.to_string_lossy().to_string()),
+                Value::String(manifest_path_str.clone()),
             );
-            if let Some(path) = &response_path {
-                chunk_meta_map.insert(
-                    "response_path".into(),
-                    Value::String(path.to_string_lossy().to_string()),
-                );
+            if let Some(value) = response_value {
+                chunk_meta_map.insert("response_path".into(), value);
             }
             if let Some(uri) = existing_file_uri {
                 chunk_meta_map.insert("file_uri".into(), Value::String(uri));
             }
 
-            let chunk_meta_value = Value::Object(chunk_meta_map.clone());
             if let Some(entry_obj) = entry_obj.as_mut() {
                 entry_obj.insert("status".into(), Value::String("running".into()));
             }
+            pending.push(PendingChunk {
+                position,
+                chunk_index,
+                asset,
+                response_path,
+                meta: Value::Object(chunk_meta_map),
+            });
+        }
 
+        // Every dispatched chunk is in flight at once, so the manifest says
+        // "running" for all of them until its own result comes back.
+        if !pending.is_empty() && (save_intermediates || save_metadata) {
+            write_manifest(&manifest_path, &mut manifest)?;
+        }
+
+        let workers = meta_u64(meta, "max_video_workers")
+            .and_then(|value| usize::try_from(value).ok())
+            .unwrap_or(crate::constants::DEFAULT_MAX_VIDEO_WORKERS)
+            .clamp(1, pending.len().max(1));
+        let completed = AtomicU64::new((assets.len() - pending.len()) as u64);
+        let run_chunk = |chunk: &PendingChunk| -> Result<(String, Option<String>)> {
+            let chunk_index = chunk.chunk_index;
             let chunk_scope = ProgressScope::ChunkDetail {
                 job_id: job_id.clone(),
                 index: chunk_index,
@@ -1071,26 +1215,18 @@ impl GeminiProvider {
 
             let (text, event_assets) = self.generate(
                 instruction,
-                std::slice::from_ref(asset),
+                std::slice::from_ref(&chunk.asset),
                 modality,
-                &chunk_meta_value,
+                &chunk.meta,
             )?;
-            if let Some(path) = response_path.as_ref() {
+            if let Some(path) = chunk.response_path.as_ref() {
                 save_chunk_text(path, &text)?;
             }
-            if let Some(entry_obj) = entry_obj.as_mut() {
-                entry_obj.insert("status".into(), Value::String("done".into()));
-            }
-            if let Some(file_uri) = event_assets
+            let file_uri = event_assets
                 .first()
                 .and_then(|meta| meta.get("file_uri"))
                 .and_then(|v| v.as_str())
-            {
-                if let Some(entry_obj) = entry_obj.as_mut() {
-                    entry_obj.insert("file_uri".into(), Value::String(file_uri.to_string()));
-                }
-            }
-            responses.push(text.trim().to_string());
+                .map(|s| s.to_string());
 
             self.send_progress(Progress {
                 scope: chunk_scope.clone(),
@@ -1101,7 +1237,7 @@ impl GeminiProvider {
                 finished: false,
             });
             self.send_progress(Progress {
-                scope: chunk_scope.clone(),
+                scope: chunk_scope,
                 stage: ProgressStage::Write,
                 current: 4,
                 total: 4,
@@ -1110,28 +1246,88 @@ impl GeminiProvider {
             });
 
             if show_chunk_progress {
+                let done = completed.fetch_add(1, Ordering::SeqCst) + 1;
                 self.send_progress(Progress {
                     scope: ProgressScope::ChunkProgress {
                         job_id: job_id.clone(),
                         total: chunk_total_meta,
                     },
                     stage: ProgressStage::Transcribe,
-                    current: chunk_index + 1,
+                    current: done,
                     total: chunk_total_meta,
                     status: format!(
                         "{job_label}: chunk {} of {}",
                         chunk_index + 1,
                         chunk_total_meta
                     ),
-                    finished: chunk_index + 1 == chunk_total_meta,
+                    finished: done == chunk_total_meta,
                 });
             }
+            Ok((text, file_uri))
+        };
+
+        let results: Vec<Result<(String, Option<String>)>> = if workers <= 1 {
+            let mut results = Vec::with_capacity(pending.len());
+            for chunk in &pending {
+                let result = run_chunk(chunk);
+                let failed = result.is_err();
+                results.push(result);
+                if failed {
+                    break;
+                }
+            }
+            results
+        } else {
+            self.worker_pool(workers)?
+                .install(|| pending.par_iter().map(run_chunk).collect())
+        };
+
+        // Finished chunks are recorded even when another one failed, so a
+        // rerun with skip_existing only repeats the failures. A failed chunk
+        // keeps "running", as it did before chunks ran side by side; one the
+        // sequential path never reached goes back to "pending".
+        let mut first_error = None;
+        let mut results = results.into_iter();
+        for chunk in &pending {
+            let result = results.next();
+            let entry_obj = match chunk_index_lookup.get(&chunk.chunk_index).copied() {
+                Some(idx) => manifest_chunks(&mut manifest)?
+                    .get_mut(idx)
+                    .and_then(|entry| entry.as_object_mut()),
+                None => None,
+            };
+            match result {
+                Some(Ok((text, file_uri))) => {
+                    if let Some(entry_obj) = entry_obj {
+                        entry_obj.insert("status".into(), Value::String("done".into()));
+                        if let Some(file_uri) = file_uri {
+                            entry_obj.insert("file_uri".into(), Value::String(file_uri));
+                        }
+                    }
+                    responses[chunk.position] = Some(trim_in_place(text));
+                }
+                Some(Err(err)) => {
+                    first_error.get_or_insert(err);
+                }
+                None => {
+                    if let Some(entry_obj) = entry_obj {
+                        entry_obj.insert("status".into(), Value::String("pending".into()));
+                    }
+                }
+            }
         }
 
         if save_intermediates || save_metadata {
             write_manifest(&manifest_path, &mut manifest)?;
         }
-        Ok(responses.join("\n\n"))
+        if let Some(err) = first_error {
+            return Err(err);
+        }
+        Ok(responses
+            .into_iter()
+            .flatten()
+            .collect::<Vec<_>>()
+            .join("\n\n"))
     }
 }
 
@@ -1162,6 +1358,25 @@ impl Provider for GeminiProvider {
     }
 }
 
+/// Builds an `inline_data` part around an already-encoded payload. `json!`
+/// serializes its values by reference, which would copy the base64 string
+/// once more.
+fn inline_part(data: String, mime: String) -> Value {
+    let mut inline = Map::new();
+    inline.insert("data".into(), Value::String(data));
+    inline.insert("mime_type".into(), Value::String(mime));
+    let mut part = Map::new();
+    part.insert("inline_data".into(), Value::Object(inline));
+    Value::Object(part)
+}
+
+fn is_truncated(payload: &Value) -> bool {
+    payload
+        .pointer("/candidates/0/finishReason")
+        .and_then(|reason| reason.as_str())
+        == Some("MAX_TOKENS")
+}
+
 fn meta_u64(value: &Value, key: &str) -> Option<u64> {
     value.as_object()?.get(key)?.as_u64()
 }
@@ -1199,6 +1414,22 @@ fn backoff_delay(attempt: usize) -> Duration {
     Duration::from_secs_f64((capped * jitter).min(BACKOFF_CAP_SECONDS))
 }
 
+/// Delay before re-reading a file that is still processing. Starts short so
+/// quick activations are noticed promptly, then stretches towards the cap.
+fn state_poll_delay(poll: usize) -> Duration {
+    let delay = STATE_POLL_INITIAL_SECONDS * STATE_POLL_FACTOR.powi(poll as i32);
+    Duration::from_secs_f64(delay.min(STATE_POLL_CAP_SECONDS))
+}
+
+/// Total time a processing file is waited on: the same budget the regular
+/// backoff schedule would spend over `max_retries` attempts.
+fn state_poll_budget(max_retries: usize) -> Duration {
+    let seconds: f64 = (0..max_retries)
+        .map(|attempt| (BACKOFF_BASE_SECONDS * 2f64.powi(attempt as i32)).min(BACKOFF_CAP_SECONDS))
+        .sum();
+    Duration::from_secs_f64(seconds)
+}
+
 fn is_retryable_file_state(state: &str) -> bool {
     matches!(state, "PROCESSING" | "INTERNAL")
 }
@@ -1215,6 +1446,16 @@ fn manifest_chunks(manifest: &mut Value) -> Result<&mut Vec<Value>> {
         .ok_or_else(|| anyhow!("manifest chunks must be an array"))
 }
 
+/// Trims a chunk transcript without copying it into a new allocation; long
+/// lectures hold every chunk in memory until they are joined.
+fn trim_in_place(mut text: String) -> String {
+    let end = text.trim_end().len();
+    text.truncate(end);
+    let start = text.len() - text.trim_start().len();
+    text.drain(..start);
+    text
+}
+
 fn save_chunk_text(path: &Path, text: &str) -> Result<()> {
     if let Some(parent) = path.parent() {
         ensure_dir(parent)?;
@@ -1231,10 +1472,25 @@ fn write_manifest(path: &Path, manifest: &mut Value) -> Result<()> {
     }
     let now = OffsetDateTime::now_utc().format(&Rfc3339)?;
     if let Some(obj) = manifest.as_object_mut() {
+        // A rerun that reused every chunk leaves the manifest (and its fsync)
+        // alone; only the timestamp would have changed.
+        let updated = obj.remove("updated_utc");
+        let unchanged = fs::read(path)
+            .ok()
+            .and_then(|bytes| serde_json::from_slice::<Map<String, Value>>(&bytes).ok())
+            .is_some_and(|mut previous| {
+                previous.remove("updated_utc");
+                previous == *obj
+            });
+        if unchanged {
+            if let Some(updated) = updated {
+                obj.insert("updated_utc".into(), updated);
+            }
+            return Ok(());
+        }
         obj.entry("created_utc")
             .or_insert_with(|| Value::String(now.clone()));
         obj.insert("updated_utc".into(), Value::String(now));
     }
-    fs::write(path, serde_json::to_string_pretty(manifest)?)?;
-    Ok(())
+    write_atomic(path, &serde_json::to_vec_pretty(manifest)?)
 }
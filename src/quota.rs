@@ -5,18 +5,19 @@ use std::time::{Duration, Instant};
 use anyhow::{bail, Result};
 use tracing::warn;
 
+use crate::constants::resolve_model_limit;
+use crate::ratelimit::RateLimiter;
+
 #[derive(Debug, Clone)]
 pub struct QuotaConfig {
     pub request_limits: HashMap<String, u32>,
     pub token_limits: HashMap<String, u32>,
     pub rpm_warn_threshold: f64,
-    pub rpm_sleep_threshold: f64,
     pub token_warn_threshold: f64,
     pub storage_limit_bytes: u64,
     pub upload_limit_bytes: u64,
     pub concurrency_limit: u32,
     pub warn_cooldown: Duration,
-    pub max_preemptive_sleep: Duration,
     pub request_window: Duration,
 }
 
@@ -26,16 +27,26 @@ impl QuotaConfig {
             request_limits,
             token_limits,
             rpm_warn_threshold: 0.8,
-            rpm_sleep_threshold: 0.9,
             token_warn_threshold: 0.8,
             storage_limit_bytes: 20 * 1024 * 1024 * 1024,
             upload_limit_bytes: 2 * 1024 * 1024 * 1024,
             concurrency_limit: 100,
             warn_cooldown: Duration::from_secs(10),
-            max_preemptive_sleep: Duration::from_millis(500),
             request_window: Duration::from_secs(60),
         }
     }
+
+    pub fn request_limit(&self, model: &str) -> Option<u32> {
+        resolve_model_limit(&self.request_limits, model, |profile| {
+            profile.requests_per_minute
+        })
+    }
+
+    pub fn token_limit(&self, model: &str) -> Option<u32> {
+        resolve_model_limit(&self.token_limits, model, |profile| {
+            profile.tokens_per_minute
+        })
+    }
 }
 
 #[derive(Default)]
@@ -52,20 +63,36 @@ struct QuotaState {
 pub struct QuotaMonitor {
     config: Arc<QuotaConfig>,
     state: Arc<Mutex<QuotaState>>,
+    limiter: Arc<RateLimiter>,
 }
 
 impl QuotaMonitor {
     pub fn new(config: QuotaConfig) -> Self {
+        let limiter = RateLimiter::new(config.request_limits.clone(), config.token_limits.clone());
         Self {
             config: Arc::new(config),
             state: Arc::new(Mutex::new(QuotaState::default())),
+            limiter: Arc::new(limiter),
         }
     }
 
-    pub fn register_request(&self, model: &str) -> Option<Duration> {
-        let per_minute = match self.config.request_limits.get(model) {
-            Some(value) if *value > 0 => *value,
-            _ => return None,
+    pub fn register_request(&self, model: &str, estimated_tokens: u32) -> Option<Duration> {
+        let wait = self.limiter.reserve(model, estimated_tokens);
+        self.track_request_rate(model);
+        if wait.is_zero() {
+            None
+        } else {
+            Some(wait)
+        }
+    }
+
+    pub fn register_throttle(&self, model: &str) {
+        self.limiter.record_throttle(model);
+    }
+
+    fn track_request_rate(&self, model: &str) {
+        let Some(per_minute) = self.config.request_limit(model) else {
+            return;
         };
         let mut state = self.state.lock().unwrap();
         let window = state.request_windows.entry(model.to_string()).or_default();
@@ -94,32 +121,16 @@ impl QuotaMonitor {
                 *entry = now;
             }
         }
-        if utilization >= self.config.rpm_sleep_threshold {
-            let window_seconds = self.config.request_window.as_secs_f64();
-            let per_request = if per_minute > 0 {
-                window_seconds / per_minute as f64
-            } else {
-                0.0
-            };
-            let sleep = self
-                .config
-                .max_preemptive_sleep
-                .as_secs_f64()
-                .min(per_request);
-            if sleep > 0.0 {
-                return Some(Duration::from_secs_f64(sleep));
-            }
-        }
-        None
     }
 
-    pub fn register_tokens(&self, model: &str, total_tokens: Option<u32>) {
+    pub fn register_tokens(&self, model: &str, reserved_tokens: u32, total_tokens: Option<u32>) {
+        self.limiter
+            .record_completion(model, reserved_tokens, total_tokens);
         let Some(total_tokens) = total_tokens else {
             return;
         };
-        let limit = match self.config.token_limits.get(model) {
-            Some(value) if *value > 0 => *value,
-            _ => return,
+        let Some(limit) = self.config.token_limit(model) else {
+            return;
         };
         let mut state = self.state.lock().unwrap();
         let window = state.token_windows.entry(model.to_string()).or_default();
@@ -0,0 +1,278 @@
+use std::collections::HashMap;
+use std::sync::Mutex;
+use std::time::{Duration, Instant};
+
+use crate::constants::resolve_model_limit;
+
+const ADDITIVE_INCREASE_RPM: f64 = 1.0;
+const MULTIPLICATIVE_DECREASE: f64 = 0.5;
+const MIN_REQUESTS_PER_MINUTE: f64 = 1.0;
+const CHARS_PER_TOKEN: usize = 4;
+
+/// Rough prompt-token count for text, used to reserve TPM budget before a
+/// call; the reservation is reconciled with the reported usage afterwards.
+pub fn estimate_text_tokens(text: &str) -> u32 {
+    u32::try_from(text.len() / CHARS_PER_TOKEN).unwrap_or(u32::MAX)
+}
+
+/// Longest server-requested pause honoured on a 429; beyond this the normal
+/// retry budget decides whether to keep waiting.
+const MAX_SERVER_RETRY_SECONDS: f64 = 60.0;
+
+/// Delay before retrying a 429: the local backoff, stretched to the wait the
+/// API asked for when it sent one.
+pub fn throttle_delay(response: reqwest::blocking::Response, backoff: Duration) -> Duration {
+    let retry_after = response
+        .headers()
+        .get(reqwest::header::RETRY_AFTER)
+        .and_then(|value| value.to_str().ok())
+        .map(str::to_string);
+    let body = response.text().unwrap_or_default();
+    server_retry_delay(retry_after.as_deref(), &body).map_or(backoff, |hint| hint.max(backoff))
+}
+
+/// The `Retry-After` header in seconds, or the `RetryInfo.retryDelay` detail
+/// (for example `"12s"`) that Gemini includes in quota errors.
+fn server_retry_delay(retry_after: Option<&str>, body: &str) -> Option<Duration> {
+    let seconds = retry_after
+        .and_then(|value| value.trim().parse::<f64>().ok())
+        .or_else(|| {
+            let payload: serde_json::Value = serde_json::from_str(body).ok()?;
+            payload
+                .get("error")?
+                .get("details")?
+                .as_array()?
+                .iter()
+                .find_map(|detail| {
+                    let delay = detail.get("retryDelay")?.as_str()?;
+                    delay.strip_suffix('s')?.parse::<f64>().ok()
+                })
+        })?;
+    (seconds.is_finite() && seconds > 0.0)
+        .then(|| Duration::from_secs_f64(seconds.min(MAX_SERVER_RETRY_SECONDS)))
+}
+
+#[derive(Debug, Clone)]
+pub struct TokenBucket {
+    capacity: f64,
+    refill_per_second: f64,
+    available: f64,
+    updated: Instant,
+}
+
+impl TokenBucket {
+    pub fn per_minute(limit: f64, now: Instant) -> Self {
+        let capacity = limit.max(MIN_REQUESTS_PER_MINUTE);
+        Self {
+            capacity,
+            refill_per_second: capacity / 60.0,
+            available: capacity,
+            updated: now,
+        }
+    }
+
+    fn refill(&mut self, now: Instant) {
+        let elapsed = now.saturating_duration_since(self.updated).as_secs_f64();
+        self.available = (self.available + elapsed * self.refill_per_second).min(self.capacity);
+        self.updated = now;
+    }
+
+    /// Debits `amount` immediately and returns how long the caller has to wait
+    /// before the debit is covered by refill. Debits may drive the balance
+    /// negative so concurrent callers queue up behind each other.
+    pub fn reserve(&mut self, amount: f64, now: Instant) -> Duration {
+        self.refill(now);
+        self.available -= amount;
+        self.deficit_wait()
+    }
+
+    /// Adjusts the balance after the fact; a negative amount returns an
+    /// over-reservation, never beyond capacity.
+    pub fn debit(&mut self, amount: f64, now: Instant) {
+        self.refill(now);
+        self.available = (self.available - amount).min(self.capacity);
+    }
+
+    pub fn set_rate_per_minute(&mut self, limit: f64, now: Instant) {
+        self.refill(now);
+        self.capacity = limit.max(MIN_REQUESTS_PER_MINUTE);
+        self.refill_per_second = self.capacity / 60.0;
+        self.available = self.available.min(self.capacity);
+    }
+
+    fn deficit_wait(&self) -> Duration {
+        if self.available >= 0.0 {
+            Duration::ZERO
+        } else {
+            Duration::from_secs_f64(-self.available / self.refill_per_second)
+        }
+    }
+}
+
+struct ModelBuckets {
+    request_ceiling: f64,
+    request_rate: f64,
+    requests: Option<TokenBucket>,
+    tokens: Option<TokenBucket>,
+}
+
+/// Enforces per-model RPM/TPM budgets. Request budgets adapt with AIMD:
+/// every 429 halves the effective rate, every completed call adds one RPM
+/// back until the configured ceiling is reached again.
+pub struct RateLimiter {
+    request_limits: HashMap<String, u32>,
+    token_limits: HashMap<String, u32>,
+    buckets: Mutex<HashMap<String, ModelBuckets>>,
+}
+
+impl RateLimiter {
+    pub fn new(request_limits: HashMap<String, u32>, token_limits: HashMap<String, u32>) -> Self {
+        Self {
+            request_limits,
+            token_limits,
+            buckets: Mutex::new(HashMap::new()),
+        }
+    }
+
+    /// Reserves one request plus `estimated_tokens` of the token budget
+    /// before a call is sent, returning how long to wait first.
+    pub fn reserve(&self, model: &str, estimated_tokens: u32) -> Duration {
+        let now = Instant::now();
+        self.with_buckets(model, |buckets| {
+            let request_wait = buckets
+                .requests
+                .as_mut()
+                .map(|bucket| bucket.reserve(1.0, now))
+                .unwrap_or_default();
+            let token_wait = buckets
+                .tokens
+                .as_mut()
+                .map(|bucket| bucket.reserve(estimated_tokens as f64, now))
+                .unwrap_or_default();
+            request_wait.max(token_wait)
+        })
+        .unwrap_or_default()
+    }
+
+    /// Settles a call: the token bucket is charged the reported usage minus
+    /// what was reserved up front (the reservation stands when usage is
+    /// unknown).
+    pub fn record_completion(&self, model: &str, reserved_tokens: u32, total_tokens: Option<u32>) {
+        let now = Instant::now();
+        self.with_buckets(model, |buckets| {
+            if let Some(bucket) = buckets.tokens.as_mut() {
+                let used = total_tokens.unwrap_or(reserved_tokens);
+                bucket.debit(used as f64 - reserved_tokens as f64, now);
+            }
+            if buckets.request_rate < buckets.request_ceiling {
+                buckets.request_rate =
+                    (buckets.request_rate + ADDITIVE_INCREASE_RPM).min(buckets.request_ceiling);
+                if let Some(bucket) = buckets.requests.as_mut() {
+                    bucket.set_rate_per_minute(buckets.request_rate, now);
+                }
+            }
+        });
+    }
+
+    pub fn record_throttle(&self, model: &str) {
+        let now = Instant::now();
+        self.with_buckets(model, |buckets| {
+            buckets.request_rate =
+                (buckets.request_rate * MULTIPLICATIVE_DECREASE).max(MIN_REQUESTS_PER_MINUTE);
+            if let Some(bucket) = buckets.requests.as_mut() {
+                bucket.set_rate_per_minute(buckets.request_rate, now);
+            }
+        });
+    }
+
+    /// Known models take a single lookup under the lock; limits are resolved
+    /// and the key allocated only when a model's buckets are first created.
+    fn with_buckets<T>(&self, model: &str, f: impl FnOnce(&mut ModelBuckets) -> T) -> Option<T> {
+        let mut buckets = self.buckets.lock().unwrap();
+        if let Some(entry) = buckets.get_mut(model) {
+            return Some(f(entry));
+        }
+        let request_limit = resolve_model_limit(&self.request_limits, model, |profile| {
+            profile.requests_per_minute
+        });
+        let token_limit = resolve_model_limit(&self.token_limits, model, |profile| {
+            profile.tokens_per_minute
+        });
+        if request_limit.is_none() && token_limit.is_none() {
+            return None;
+        }
+        let entry = buckets.entry(model.to_string()).or_insert_with(|| {
+            let now = Instant::now();
+            let ceiling = request_limit.unwrap_or(0) as f64;
+            ModelBuckets {
+                request_ceiling: ceiling,
+                request_rate: ceiling,
+                requests: request_limit.map(|limit| TokenBucket::per_minute(limit as f64, now)),
+                tokens: token_limit.map(|limit| TokenBucket::per_minute(limit as f64, now)),
+            }
+        });
+        Some(f(entry))
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn reserve_waits_once_burst_is_spent() {
+        let start = Instant::now();
+        let mut bucket = TokenBucket::per_minute(60.0, start);
+        for _ in 0..60 {
+            assert_eq!(bucket.reserve(1.0, start), Duration::ZERO);
+        }
+        let wait = bucket.reserve(1.0, start);
+        assert!((wait.as_secs_f64() - 1.0).abs() < 1e-6);
+        assert_eq!(
+            bucket.reserve(0.0, start + Duration::from_secs(1)),
+            Duration::ZERO
+        );
+    }
+
+    #[test]
+    fn token_reservation_is_settled_against_usage() {
+        let limiter = RateLimiter::new(HashMap::new(), HashMap::from([("model".to_string(), 60)]));
+        assert_eq!(limiter.reserve("model", 60), Duration::ZERO);
+        assert!(limiter.reserve("model", 30) > Duration::ZERO);
+        limiter.record_completion("model", 90, Some(10));
+        let buckets = limiter.buckets.lock().unwrap();
+        assert!(buckets["model"].tokens.as_ref().unwrap().available > 49.0);
+    }
+
+    #[test]
+    fn server_retry_delay_reads_header_or_retry_info() {
+        assert_eq!(
+            server_retry_delay(Some("7"), ""),
+            Some(Duration::from_secs(7))
+        );
+        let body = r#"{"error":{"code":429,"details":[{"@type":"type.googleapis.com/google.rpc.RetryInfo","retryDelay":"12.5s"}]}}"#;
+        assert_eq!(
+            server_retry_delay(None, body),
+            Some(Duration::from_secs_f64(12.5))
+        );
+        assert_eq!(
+            server_retry_delay(Some("3600"), ""),
+            Some(Duration::from_secs(60))
+        );
+        assert_eq!(server_retry_delay(None, "not json"), None);
+    }
+
+    #[test]
+    fn throttle_halves_rate_and_completion_recovers() {
+        let limiter = RateLimiter::new(HashMap::from([("model".to_string(), 10)]), HashMap::new());
+        limiter.record_throttle("model");
+        let rate = |limiter: &RateLimiter| limiter.buckets.lock().unwrap()["model"].request_rate;
+        assert_eq!(rate(&limiter), 5.0);
+        limiter.record_completion("model", 0, None);
+        assert_eq!(rate(&limiter), 6.0);
+        assert_eq!(limiter.reserve("unknown", 100), Duration::ZERO);
+        assert!(limiter
+            .with_buckets("gemini-2.5-pro-exp-0827", |_| ())
+            .is_some());
+    }
+}
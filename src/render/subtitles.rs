@@ -6,29 +6,59 @@ use std::path::{Path, PathBuf};
 #[derive(Default, Clone)]
 pub struct SubtitleExporter;
 
+struct Cue {
+    start: f64,
+    end: f64,
+    text: String,
+}
+
 impl SubtitleExporter {
-    pub fn write(
+    /// Builds the cue list once and renders it for every requested subtitle
+    /// format; non-subtitle formats are ignored. Paths follow request order.
+    pub fn write_all(
         &self,
-        fmt: &str,
+        formats: &[String],
         base: &Path,
         name: &str,
         text: &str,
         chunks: &[Value],
-    ) -> Result<Option<PathBuf>> {
-        let fmt = fmt.trim().to_lowercase();
-        if fmt != "srt" && fmt != "vtt" {
-            return Ok(None);
+    ) -> Result<Vec<PathBuf>> {
+        let mut wanted: Vec<Format> = Vec::new();
+        for fmt in formats.iter().filter_map(|fmt| Format::parse(fmt)) {
+            if !wanted.contains(&fmt) {
+                wanted.push(fmt);
+            }
         }
-        fs::create_dir_all(base)?;
-        let target = base.join(format!("{name}.{fmt}"));
-        let segments = split_text(text, chunks.len());
-        let mut lines = Vec::new();
-        if fmt == "vtt" {
-            lines.push("WEBVTT".to_string());
-            lines.push(String::new());
+        if wanted.is_empty() {
+            return Ok(Vec::new());
         }
-        for (idx, chunk) in chunks.iter().enumerate() {
-            let segment = segments.get(idx).cloned().unwrap_or_default();
+        fs::create_dir_all(base)?;
+        let cues = build_cues(text, chunks);
+        let separated = !chunks.is_empty();
+        wanted
+            .into_iter()
+            .map(|fmt| {
+                let target = base.join(format!("{name}.{}", fmt.extension()));
+                fs::write(&target, render(fmt, &cues, separated))?;
+                Ok(target)
+            })
+            .collect()
+    }
+}
+
+fn build_cues(text: &str, chunks: &[Value]) -> Vec<Cue> {
+    if chunks.is_empty() {
+        return vec![Cue {
+            start: 0.0,
+            end: 5.0,
+            text: text.trim().to_string(),
+        }];
+    }
+    let segments = split_text(text, chunks.len());
+    chunks
+        .iter()
+        .enumerate()
+        .map(|(idx, chunk)| {
             let start = chunk
                 .get("start_seconds")
                 .and_then(Value::as_f64)
@@ -37,56 +67,38 @@ impl SubtitleExporter {
                 .get("end_seconds")
                 .and_then(Value::as_f64)
                 .unwrap_or(start + 5.0);
-            if fmt == "srt" {
-                lines.push((idx + 1).to_string());
-                lines.push(format!(
-                    "{} --> {}",
-                    format_timestamp(start, Format::Srt),
-                    format_timestamp(end, Format::Srt)
-                ));
-                lines.push(if segment.is_empty() {
-                    "[No content]".to_string()
-                } else {
-                    segment
-                });
-                lines.push(String::new());
-            } else {
-                lines.push(format!(
-                    "{} --> {}",
-                    format_timestamp(start, Format::Vtt),
-                    format_timestamp(end, Format::Vtt)
-                ));
-                lines.push(if segment.is_empty() {
-                    "[No content]".to_string()
-                } else {
-                    segment
-                });
-                lines.push(String::new());
-            }
+            let text = match segments.get(idx) {
+                Some(segment) if !segment.is_empty() => segment.clone(),
+                _ => "[No content]".to_string(),
+            };
+            Cue { start, end, text }
+        })
+        .collect()
+}
+
+fn render(fmt: Format, cues: &[Cue], separated: bool) -> String {
+    let capacity = cues.iter().map(|cue| cue.text.len() + 40).sum::<usize>() + 8;
+    let mut out = String::with_capacity(capacity);
+    if fmt == Format::Vtt {
+        out.push_str("WEBVTT\n\n");
+    }
+    for (idx, cue) in cues.iter().enumerate() {
+        if fmt == Format::Srt {
+            out.push_str(&(idx + 1).to_string());
+            out.push('\n');
         }
-        if chunks.is_empty() {
-            let start = 0.0;
-            let end = 5.0;
-            if fmt == "srt" {
-                lines.push("1".into());
-                lines.push(format!(
-                    "{} --> {}",
-                    format_timestamp(start, Format::Srt),
-                    format_timestamp(end, Format::Srt)
-                ));
-                lines.push(text.trim().to_string());
-            } else {
-                lines.push(format!(
-                    "{} --> {}",
-                    format_timestamp(start, Format::Vtt),
-                    format_timestamp(end, Format::Vtt)
-                ));
-                lines.push(text.trim().to_string());
-            }
+        out.push_str(&format_timestamp(cue.start, fmt));
+        out.push_str(" --> ");
+        out.push_str(&format_timestamp(cue.end, fmt));
+        out.push('\n');
+        out.push_str(&cue.text);
+        out.push('\n');
+        if separated {
+            out.push('\n');
         }
-        std::fs::write(&target, lines.join("\n"))?;
-        Ok(Some(target))
     }
+    out.pop();
+    out
 }
 
 fn split_text(text: &str, parts: usize) -> Vec<String> {
@@ -113,12 +125,29 @@ fn split_text(text: &str, parts: usize) -> Vec<String> {
     segments
 }
 
-#[derive(Copy, Clone)]
+#[derive(Copy, Clone, PartialEq, Eq)]
 enum Format {
     Srt,
     Vtt,
 }
 
+impl Format {
+    fn parse(value: &str) -> Option<Self> {
+        match value.trim().to_lowercase().as_str() {
+            "srt" => Some(Format::Srt),
+            "vtt" => Some(Format::Vtt),
+            _ => None,
+        }
+    }
+
+    fn extension(self) -> &'static str {
+        match self {
+            Format::Srt => "srt",
+            Format::Vtt => "vtt",
+        }
+    }
+}
+
 fn format_timestamp(seconds: f64, fmt: Format) -> String {
     let total_ms = (seconds.max(0.0) * 1000.0).round() as i64;
     let hours = total_ms / 3_600_000;
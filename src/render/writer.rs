@@ -1,8 +1,7 @@
 use crate::core::OutputFormat;
-use anyhow::Context;
+use crate::utils::write_atomic;
 use std::{
-    fs::{self, File},
-    io::Write,
+    fs,
     path::{Path, PathBuf},
 };
 
@@ -43,7 +42,7 @@ impl MarkdownWriter {
         fs::create_dir_all(base)?;
         let path = base.join(format!("{name}.md"));
 
-        let mut content = String::new();
+        let mut content = String::with_capacity(header.len() + body.len() + 3);
         if !header.is_empty() {
             content.push_str(header);
             if !header.ends_with("\n\n") {
@@ -57,9 +56,7 @@ impl MarkdownWriter {
         content.push_str(body.trim_end());
         content.push('\n');
 
-        let mut file =
-            File::create(&path).with_context(|| format!("creating {}", path.display()))?;
-        file.write_all(content.as_bytes())?;
+        write_atomic(&path, content.as_bytes())?;
         Ok(path)
     }
 }
@@ -77,7 +74,7 @@ impl LatexWriter {
         fs::create_dir_all(base)?;
         let path = base.join(format!("{name}.tex"));
 
-        let mut content = String::new();
+        let mut content = String::with_capacity(preamble.len() + body.len() + 17);
         content.push_str(preamble);
         if !preamble.ends_with('\n') {
             content.push('\n');
@@ -87,9 +84,7 @@ impl LatexWriter {
             content.push_str("\n\\end{document}\n");
         }
 
-        let mut file =
-            File::create(&path).with_context(|| format!("creating {}", path.display()))?;
-        file.write_all(content.as_bytes())?;
+        write_atomic(&path, content.as_bytes())?;
         Ok(path)
     }
 }
@@ -5,7 +5,7 @@ use serde::Serialize;
 use serde_json::json;
 use std::collections::HashMap;
 use std::fs::File;
-use std::io::Write;
+use std::io::{BufWriter, Write};
 use std::path::{Path, PathBuf};
 use std::sync::{Arc, Mutex};
 use time::format_description::well_known::Rfc3339;
@@ -34,6 +34,36 @@ impl RequestEvent {
     }
 }
 
+/// Prompt, output and total token counts from a response's `usageMetadata`,
+/// read in one pass over its fields. Older field names are accepted as a
+/// fallback.
+pub fn usage_counts(payload: &serde_json::Value) -> (Option<u32>, Option<u32>, Option<u32>) {
+    let (mut prompt, mut output, mut total) = (None, None, None);
+    let Some(usage) = payload
+        .get("usageMetadata")
+        .and_then(|usage| usage.as_object())
+    else {
+        return (prompt, output, total);
+    };
+    for (key, value) in usage {
+        let (slot, preferred) = match key.as_str() {
+            "promptTokenCount" => (&mut prompt, true),
+            "candidatesTokenCount" => (&mut output, true),
+            "totalTokenCount" => (&mut total, true),
+            "inputTokenCount" => (&mut prompt, false),
+            "outputTokenCount" => (&mut output, false),
+            "totalTokens" => (&mut total, false),
+            _ => continue,
+        };
+        if let Some(count) = value.as_u64() {
+            if preferred || slot.is_none() {
+                *slot = Some(count as u32);
+            }
+        }
+    }
+    (prompt, output, total)
+}
+
 #[derive(Debug, Default, Serialize)]
 pub struct RunSummary {
     pub total_requests: usize,
@@ -112,6 +142,15 @@ impl RunMonitor {
         });
     }
 
+    pub fn has_note(&self, name: &str) -> bool {
+        self.inner
+            .lock()
+            .unwrap()
+            .notes
+            .iter()
+            .any(|note| note.name == name)
+    }
+
     pub fn events(&self) -> Vec<RequestEvent> {
         self.inner.lock().unwrap().events.clone()
     }
@@ -176,9 +215,8 @@ impl RunMonitor {
             ensure_dir(parent)?;
         }
         let summary = self.summarize();
-        let events = self.events();
-        let costs = cost.estimate(&events);
         let state = self.inner.lock().unwrap();
+        let costs = cost.estimate(&state.events);
         let start = state.first_started.map(|t| t.format(&Rfc3339).unwrap());
         let end = state.last_finished.map(|t| t.format(&Rfc3339).unwrap());
         let elapsed = match (state.first_started, state.last_finished) {
@@ -206,18 +244,21 @@ impl RunMonitor {
             "limits": limits.iter().map(|(k, v)| (k.to_string(), v)).collect::<HashMap<_, _>>(),
             "files": files.iter().map(|p| p.to_string_lossy().to_string()).collect::<Vec<_>>(),
             "warnings": if costs.estimated { vec!["costs include estimates".to_string()] } else { Vec::new() },
-            "notes": state.notes.clone(),
+            "notes": state.notes,
         });
 
-        let mut file = File::create(to)?;
-        file.write_all(serde_json::to_string_pretty(&payload)?.as_bytes())?;
+        let mut file = BufWriter::new(File::create(to)?);
+        serde_json::to_writer_pretty(&mut file, &payload)?;
+        file.flush()?;
 
         if let Some(ndjson_path) = ndjson {
             if let Some(parent) = ndjson_path.parent() {
                 ensure_dir(parent)?;
             }
-            let mut ndjson_file = File::create(ndjson_path)?;
-            for event in events {
+            // One buffered write per batch of events instead of two syscalls
+            // per line; events are serialized straight from the run state.
+            let mut ndjson_file = BufWriter::new(File::create(ndjson_path)?);
+            for event in &state.events {
                 let line = json!({
                     "model": event.model,
                     "modality": event.modality,
@@ -233,9 +274,10 @@ impl RunMonitor {
                     "manifest_path": event.metadata.get("manifest_path"),
                     "response_path": event.metadata.get("response_path"),
                 });
-                ndjson_file.write_all(serde_json::to_string(&line)?.as_bytes())?;
+                serde_json::to_writer(&mut ndjson_file, &line)?;
                 ndjson_file.write_all(b"\n")?;
             }
+            ndjson_file.flush()?;
         }
         Ok(())
     }
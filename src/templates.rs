@@ -1,7 +1,7 @@
 use std::collections::HashMap;
 use std::fs;
 use std::path::{Path, PathBuf};
-use std::sync::{Arc, Mutex};
+use std::sync::{Arc, Mutex, OnceLock};
 
 use crate::core::{Kind, OutputFormat};
 
@@ -9,17 +9,33 @@ const PROMPT_DIR: &str = "prompts";
 const PREAMBLE_DIR: &str = "templates/preambles";
 const CONVERSION_DIR: &str = "templates/conversions";
 
+/// Lookups by key; `None` records a template file that does not exist, so
+/// the built-in default is used without touching the filesystem again.
+type TemplateCache = Arc<Mutex<HashMap<String, Option<String>>>>;
+
+static TEMPLATE_CACHES: OnceLock<Mutex<HashMap<PathBuf, TemplateCache>>> = OnceLock::new();
+
 #[derive(Debug, Clone)]
 pub struct TemplateLoader {
     base: Arc<PathBuf>,
-    cache: Arc<Mutex<HashMap<String, String>>>,
+    cache: TemplateCache,
 }
 
 impl TemplateLoader {
+    /// Loaders for the same directory share one cache, so the engine built
+    /// for each job does not read the templates again.
     pub fn new(base: impl Into<PathBuf>) -> Self {
+        let base = base.into();
+        let cache = TEMPLATE_CACHES
+            .get_or_init(|| Mutex::new(HashMap::new()))
+            .lock()
+            .unwrap()
+            .entry(base.clone())
+            .or_default()
+            .clone();
         Self {
-            base: Arc::new(base.into()),
-            cache: Arc::new(Mutex::new(HashMap::new())),
+            base: Arc::new(base),
+            cache,
         }
     }
 
@@ -29,15 +45,13 @@ impl TemplateLoader {
         loader: impl FnOnce(&Path) -> Option<String>,
     ) -> Option<String> {
         if let Some(value) = self.cache.lock().unwrap().get(key).cloned() {
-            return Some(value);
+            return value;
         }
         let result = loader(&self.base);
-        if let Some(ref text) = result {
-            self.cache
-                .lock()
-                .unwrap()
-                .insert(key.to_string(), text.clone());
-        }
+        self.cache
+            .lock()
+            .unwrap()
+            .insert(key.to_string(), result.clone());
         result
     }
 
@@ -1,4 +1,5 @@
-use anyhow::Result;
+use anyhow::{Context, Result};
+use std::io::Write;
 use std::path::{Path, PathBuf};
 use std::{fs, io};
 
@@ -6,6 +7,25 @@ pub fn ensure_dir(path: &Path) -> io::Result<()> {
     fs::create_dir_all(path)
 }
 
+/// Writes the whole file to a sibling `.part` file and renames it into place,
+/// so an interrupted run never leaves a truncated transcript or manifest that
+/// a later run would treat as finished.
+pub fn write_atomic(path: &Path, bytes: &[u8]) -> Result<()> {
+    let mut temp_name = path.as_os_str().to_owned();
+    temp_name.push(".part");
+    let temp = PathBuf::from(temp_name);
+    let result = fs::File::create(&temp)
+        .and_then(|mut file| {
+            file.write_all(bytes)?;
+            file.sync_all()
+        })
+        .and_then(|_| fs::rename(&temp, path));
+    if result.is_err() {
+        let _ = fs::remove_file(&temp);
+    }
+    result.with_context(|| format!("writing {}", path.display()))
+}
+
 pub fn resolve_path_with_prompt(path: &Path, is_dir: bool) -> Result<Option<PathBuf>> {
     if !path.exists() {
         return Ok(Some(path.to_path_buf()));
@@ -59,17 +79,29 @@ pub fn resolve_path_with_prompt(path: &Path, is_dir: bool) -> Result<Option<Path
 }
 
 pub fn slugify<S: AsRef<str>>(input: S) -> String {
-    input
-        .as_ref()
-        .chars()
-        .map(|c| {
-            if c.is_alphanumeric() || matches!(c, '-' | '_' | '.') {
-                c
-            } else {
-                '-'
-            }
-        })
-        .collect::<String>()
-        .trim_matches('-')
-        .to_string()
+    let input = input.as_ref();
+    let mut slug = String::with_capacity(input.len());
+    for c in input.chars() {
+        if c.is_alphanumeric() || matches!(c, '-' | '_' | '.') {
+            slug.push(c);
+        } else {
+            slug.push('-');
+        }
+    }
+    slug.truncate(slug.trim_end_matches('-').len());
+    let leading = slug.len() - slug.trim_start_matches('-').len();
+    slug.drain(..leading);
+    slug
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn slugify_replaces_and_trims_separators() {
+        assert_eq!(slugify("  Lecture 01: Intro!  "), "Lecture-01--Intro");
+        assert_eq!(slugify("https://youtu.be/abc"), "https---youtu.be-abc");
+        assert_eq!(slugify("---"), "");
+    }
 }
@@ -4,10 +4,12 @@ use rayon::ThreadPoolBuilder;
 use regex::Regex;
 use serde::{Deserialize, Serialize};
 use serde_json::Value;
-use std::collections::HashSet;
+use std::collections::{HashMap, HashSet};
 use std::path::{Path, PathBuf};
 use std::process::Command;
 use std::sync::{Mutex, OnceLock};
+use std::time::SystemTime;
+use tracing::warn;
 
 use crate::utils::ensure_dir;
 
@@ -26,6 +28,8 @@ pub struct VideoMetadata {
     pub width: Option<u32>,
     pub height: Option<u32>,
     pub video_codec: Option<String>,
+    #[serde(default)]
+    pub pix_fmt: Option<String>,
     pub audio_codec: Option<String>,
     pub audio_sample_rate: Option<u32>,
 }
@@ -245,8 +249,19 @@ pub fn normalize_video(
         source.file_stem().unwrap_or_default().to_string_lossy()
     ));
 
-    if normalized.exists() && normalized.metadata()?.modified()? >= path.metadata()?.modified()? {
-        probe_video(&normalized)?;
+    if let Ok(existing) = std::fs::metadata(&normalized) {
+        if existing.modified()? >= path.metadata()?.modified()? {
+            probe_video(&normalized)?;
+            return Ok(NormalizationResult { path: normalized });
+        }
+        // The stale output may be a hard link to an earlier source; unlink it
+        // rather than letting ffmpeg truncate through it.
+        std::fs::remove_file(&normalized)?;
+    }
+    if is_transmux_ready(path) {
+        if std::fs::hard_link(path, &normalized).is_err() {
+            std::fs::copy(path, &normalized)?;
+        }
         return Ok(NormalizationResult { path: normalized });
     }
 
@@ -289,7 +304,90 @@ pub fn normalize_video(
     Err(last_err.unwrap_or_else(|| anyhow!("ffmpeg failed for {}", path.display())))
 }
 
+/// An MP4 that already carries yuv420p H.264 video, AAC (or no) audio and a
+/// leading `moov` box matches what the encoder chain would produce
+/// (`-pix_fmt yuv420p -movflags +faststart`), so it can be linked instead of
+/// re-encoded.
+fn is_transmux_ready(path: &Path) -> bool {
+    let is_mp4 = path
+        .extension()
+        .and_then(|ext| ext.to_str())
+        .is_some_and(|ext| ext.eq_ignore_ascii_case("mp4") || ext.eq_ignore_ascii_case("m4v"));
+    if !is_mp4 {
+        return false;
+    }
+    probe_video(path).is_ok_and(|meta| has_transmux_streams(&meta))
+        && moov_precedes_mdat(path).unwrap_or(false)
+}
+
+fn has_transmux_streams(meta: &VideoMetadata) -> bool {
+    meta.video_codec.as_deref() == Some("h264")
+        && meta.pix_fmt.as_deref() == Some("yuv420p")
+        && meta
+            .audio_codec
+            .as_deref()
+            .is_none_or(|codec| codec == "aac")
+}
+
+/// Walks the top-level MP4 boxes and reports whether `moov` comes before
+/// `mdat`, i.e. whether the file is already laid out for fast start.
+fn moov_precedes_mdat(path: &Path) -> Result<bool> {
+    use std::io::{Read, Seek, SeekFrom};
+    let mut file = std::fs::File::open(path)?;
+    let len = file.metadata()?.len();
+    let mut offset = 0u64;
+    while offset + 8 <= len {
+        file.seek(SeekFrom::Start(offset))?;
+        let mut header = [0u8; 8];
+        file.read_exact(&mut header)?;
+        match &header[4..8] {
+            b"moov" => return Ok(true),
+            b"mdat" => return Ok(false),
+            _ => {}
+        }
+        let size = match u32::from_be_bytes(header[..4].try_into().unwrap()) {
+            0 => return Ok(false),
+            1 => {
+                let mut large = [0u8; 8];
+                file.read_exact(&mut large)?;
+                u64::from_be_bytes(large)
+            }
+            size => u64::from(size),
+        };
+        if size < 8 {
+            return Ok(false);
+        }
+        offset += size;
+    }
+    Ok(false)
+}
+
+type ProbeKey = (PathBuf, u64, Option<SystemTime>);
+
+static PROBE_CACHE: OnceLock<Mutex<HashMap<ProbeKey, VideoMetadata>>> = OnceLock::new();
+
+/// ffprobe metadata, memoized per file (path, size and mtime): a source is
+/// probed for transmux eligibility, again when its normalized output is
+/// reused, and once more for chunk planning.
 pub fn probe_video(path: &Path) -> Result<VideoMetadata> {
+    let key = std::fs::metadata(path)
+        .ok()
+        .map(|meta| (path.to_path_buf(), meta.len(), meta.modified().ok()));
+    let cache = PROBE_CACHE.get_or_init(|| Mutex::new(HashMap::new()));
+    if let Some(meta) = key
+        .as_ref()
+        .and_then(|key| cache.lock().unwrap().get(key).cloned())
+    {
+        return Ok(meta);
+    }
+    let meta = read_video_metadata(path)?;
+    if let Some(key) = key {
+        cache.lock().unwrap().insert(key, meta.clone());
+    }
+    Ok(meta)
+}
+
+fn read_video_metadata(path: &Path) -> Result<VideoMetadata> {
     let output = Command::new("ffprobe")
         .args([
             "-v",
@@ -332,6 +430,7 @@ pub fn probe_video(path: &Path) -> Result<VideoMetadata> {
         width: None,
         height: None,
         video_codec: None,
+        pix_fmt: None,
         audio_codec: None,
         audio_sample_rate: None,
     };
@@ -344,6 +443,10 @@ pub fn probe_video(path: &Path) -> Result<VideoMetadata> {
                         .get("codec_name")
                         .and_then(|v| v.as_str())
                         .map(|s| s.to_string());
+                    meta.pix_fmt = stream
+                        .get("pix_fmt")
+                        .and_then(|v| v.as_str())
+                        .map(|s| s.to_string());
                     meta.width = stream
                         .get("width")
                         .and_then(|v| v.as_u64())
@@ -418,47 +521,92 @@ pub fn plan_video_chunks(
     }
 
     ensure_dir(chunk_dir)?;
-    let worker_count = bounds.len().min(max_workers.max(1));
     let stem = normalized_path
         .file_stem()
         .unwrap_or_default()
         .to_string_lossy()
         .to_string();
-
-    let chunks: Vec<VideoChunk> = if worker_count <= 1 {
-        bounds
-            .iter()
-            .enumerate()
-            .map(|(idx, (start, end))| {
-                let chunk_path = chunk_dir.join(format!("{stem}-chunk{idx:02}.mp4"));
-                extract_segment(normalized_path, &chunk_path, *start, *end)?;
-                Ok(VideoChunk {
-                    index: idx,
-                    start_seconds: *start,
-                    end_seconds: *end,
-                    path: chunk_path,
-                })
-            })
-            .collect::<Result<Vec<_>>>()?
-    } else {
-        let pool = ThreadPoolBuilder::new().num_threads(worker_count).build()?;
-        pool.install(|| {
-            bounds
-                .par_iter()
-                .enumerate()
-                .map(|(idx, (start, end))| {
-                    let chunk_path = chunk_dir.join(format!("{stem}-chunk{idx:02}.mp4"));
-                    extract_segment(normalized_path, &chunk_path, *start, *end)?;
-                    Ok(VideoChunk {
-                        index: idx,
-                        start_seconds: *start,
-                        end_seconds: *end,
-                        path: chunk_path,
+    let chunks: Vec<VideoChunk> = bounds
+        .iter()
+        .enumerate()
+        .map(|(idx, (start, end))| VideoChunk {
+            index: idx,
+            start_seconds: *start,
+            end_seconds: *end,
+            path: chunk_dir.join(format!("{stem}-chunk{idx:02}.mp4")),
+        })
+        .collect();
+
+    if chunks
+        .iter()
+        .any(|chunk| !segment_is_fresh(normalized_path, chunk))
+    {
+        let pattern = chunk_dir.join(format!("{stem}-chunk%02d.mp4"));
+        let list_path = chunk_dir.join(format!("{stem}-segments.csv"));
+        // The segment muxer can only cut on keyframes, so a boundary without
+        // one drifts or merges two chunks and shifts every file after it.
+        // Its segment list shows where each cut actually landed; only the
+        // chunks that missed their span are extracted again.
+        let split = split_segments(normalized_path, &pattern, &bounds, &list_path);
+        let stale: Vec<usize> = match split {
+            Ok(()) => {
+                let listed = std::fs::read_to_string(&list_path)
+                    .map(|text| parse_segment_list(&text))
+                    .unwrap_or_default();
+                let misplaced = misplaced_segments(&listed, &bounds);
+                chunks
+                    .iter()
+                    .filter(|chunk| {
+                        misplaced.contains(&chunk.index)
+                            || !segment_is_fresh(normalized_path, chunk)
                     })
-                })
-                .collect::<Result<Vec<_>>>()
-        })?
-    };
+                    .map(|chunk| chunk.index)
+                    .collect()
+            }
+            Err(err) => {
+                warn!(
+                    target: "recapit::video",
+                    "Single-pass segmenting failed for {}: {}",
+                    normalized_path.display(),
+                    err
+                );
+                (0..chunks.len()).collect()
+            }
+        };
+        let _ = std::fs::remove_file(&list_path);
+        let _ =
+            std::fs::remove_file(chunk_dir.join(format!("{stem}-chunk{:02}.mp4", chunks.len())));
+        if !stale.is_empty() {
+            if stale.len() < chunks.len() {
+                warn!(
+                    target: "recapit::video",
+                    "{} of {} segments of {} drifted from the chunk plan; extracting them",
+                    stale.len(),
+                    chunks.len(),
+                    normalized_path.display()
+                );
+            }
+            let redo: Vec<&VideoChunk> = stale.iter().map(|idx| &chunks[*idx]).collect();
+            for chunk in &redo {
+                let _ = std::fs::remove_file(&chunk.path);
+            }
+            let worker_count = redo.len().min(max_workers.max(1));
+            let extract = |chunk: &&VideoChunk| {
+                extract_segment(
+                    normalized_path,
+                    &chunk.path,
+                    chunk.start_seconds,
+                    chunk.end_seconds,
+                )
+            };
+            if worker_count <= 1 {
+                redo.iter().try_for_each(extract)?;
+            } else {
+                let pool = ThreadPoolBuilder::new().num_threads(worker_count).build()?;
+                pool.install(|| redo.par_iter().try_for_each(extract))?;
+            }
+        }
+    }
 
     Ok(VideoChunkPlan {
         metadata: metadata.clone(),
@@ -512,13 +660,104 @@ fn compute_chunk_boundaries(
     bounds
 }
 
-fn extract_segment(source: &Path, dest: &Path, start: f64, end: f64) -> Result<()> {
-    if dest.exists()
-        && dest.metadata()?.modified()? >= source.metadata()?.modified()?
-        && dest.metadata()?.len() > 0
-    {
-        return Ok(());
+/// How far a cut chunk's boundaries or duration may stray from its planned
+/// span.
+const SEGMENT_DURATION_TOLERANCE_SECONDS: f64 = 2.0;
+
+/// A chunk file is reusable when it is newer than the normalized source and
+/// its duration matches the span the plan assigned to it.
+fn segment_is_fresh(source: &Path, chunk: &VideoChunk) -> bool {
+    let (Ok(dest_meta), Ok(source_meta)) = (chunk.path.metadata(), source.metadata()) else {
+        return false;
+    };
+    let newer = match (dest_meta.modified(), source_meta.modified()) {
+        (Ok(dest_time), Ok(source_time)) => dest_time >= source_time && dest_meta.len() > 0,
+        _ => false,
+    };
+    let planned = chunk.end_seconds - chunk.start_seconds;
+    newer
+        && probe_video(&chunk.path).is_ok_and(|probed| {
+            (probed.duration_seconds - planned).abs() <= SEGMENT_DURATION_TOLERANCE_SECONDS
+        })
+}
+
+/// Indices of planned chunks whose segment, in file order, is missing or
+/// starts or ends more than the tolerance away from the plan.
+fn misplaced_segments(listed: &[(f64, f64)], bounds: &[(f64, f64)]) -> Vec<usize> {
+    bounds
+        .iter()
+        .enumerate()
+        .filter(|(idx, (start, end))| {
+            listed.get(*idx).is_none_or(|(cut_start, cut_end)| {
+                (cut_start - start).abs() > SEGMENT_DURATION_TOLERANCE_SECONDS
+                    || (cut_end - end).abs() > SEGMENT_DURATION_TOLERANCE_SECONDS
+            })
+        })
+        .map(|(idx, _)| idx)
+        .collect()
+}
+
+/// Start and end times from the segment muxer's CSV list
+/// (`file,start,end` per line), in file order.
+fn parse_segment_list(text: &str) -> Vec<(f64, f64)> {
+    text.lines()
+        .filter_map(|line| {
+            let mut fields = line.trim().rsplitn(3, ',');
+            let end = fields.next()?.parse().ok()?;
+            let start = fields.next()?.parse().ok()?;
+            fields.next()?;
+            Some((start, end))
+        })
+        .collect()
+}
+
+/// Cuts every chunk in a single ffmpeg pass with the segment muxer instead of
+/// reopening the input once per chunk, listing where each cut landed in
+/// `list_path`.
+fn split_segments(
+    source: &Path,
+    pattern: &Path,
+    bounds: &[(f64, f64)],
+    list_path: &Path,
+) -> Result<()> {
+    let split_times = bounds
+        .iter()
+        .skip(1)
+        .map(|(start, _)| format!("{start:.3}"))
+        .collect::<Vec<_>>()
+        .join(",");
+    let output = Command::new("ffmpeg")
+        .args([
+            "-y",
+            "-i",
+            source.to_str().unwrap(),
+            "-map",
+            "0",
+            "-c",
+            "copy",
+            "-f",
+            "segment",
+            "-segment_times",
+            &split_times,
+            "-reset_timestamps",
+            "1",
+            "-segment_list",
+            list_path.to_str().unwrap(),
+            "-segment_list_type",
+            "csv",
+            pattern.to_str().unwrap(),
+        ])
+        .output()?;
+    if !output.status.success() {
+        bail!(
+            "ffmpeg failed while segmenting: {}",
+            String::from_utf8_lossy(&output.stderr)
+        );
     }
+    Ok(())
+}
+
+fn extract_segment(source: &Path, dest: &Path, start: f64, end: f64) -> Result<()> {
     ensure_dir(dest.parent().unwrap())?;
     let status = Command::new("ffmpeg")
         .args([
@@ -540,11 +779,22 @@ fn extract_segment(source: &Path, dest: &Path, start: f64, end: f64) -> Result<(
     Ok(())
 }
 
+const HASH_BUFFER_BYTES: usize = 128 * 1024;
+
 pub fn sha256sum(path: &Path) -> Result<String> {
     use sha2::{Digest, Sha256};
+    use std::io::{ErrorKind, Read};
     let mut file = std::fs::File::open(path)?;
     let mut hasher = Sha256::new();
-    std::io::copy(&mut file, &mut hasher)?;
+    let mut buffer = vec![0u8; HASH_BUFFER_BYTES];
+    loop {
+        match file.read(&mut buffer) {
+            Ok(0) => break,
+            Ok(read) => hasher.update(&buffer[..read]),
+            Err(err) if err.kind() == ErrorKind::Interrupted => continue,
+            Err(err) => return Err(err.into()),
+        }
+    }
     Ok(hex::encode(hasher.finalize()))
 }
 
@@ -555,3 +805,80 @@ pub fn seconds_to_iso(value: f64) -> String {
     let seconds = total_seconds % 60;
     format!("PT{}H{}M{}S", hours, minutes, seconds)
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn mp4_boxes(names: &[&[u8; 4]]) -> Vec<u8> {
+        names
+            .iter()
+            .flat_map(|name| {
+                let mut entry = 16u32.to_be_bytes().to_vec();
+                entry.extend_from_slice(*name);
+                entry.extend_from_slice(&[0; 8]);
+                entry
+            })
+            .collect()
+    }
+
+    #[test]
+    fn fast_start_needs_moov_before_mdat() {
+        let dir = tempfile::tempdir().unwrap();
+        let path = dir.path().join("clip.mp4");
+        std::fs::write(&path, mp4_boxes(&[b"ftyp", b"moov", b"mdat"])).unwrap();
+        assert!(moov_precedes_mdat(&path).unwrap());
+        std::fs::write(&path, mp4_boxes(&[b"ftyp", b"mdat", b"moov"])).unwrap();
+        assert!(!moov_precedes_mdat(&path).unwrap());
+        std::fs::write(&path, b"\0\0\0\x04ftyp").unwrap();
+        assert!(!moov_precedes_mdat(&path).unwrap());
+    }
+
+    #[test]
+    fn transmux_requires_yuv420p_h264_and_aac_or_no_audio() {
+        let mut meta = VideoMetadata {
+            path: PathBuf::from("clip.mp4"),
+            duration_seconds: 60.0,
+            size_bytes: 1,
+            fps: Some(30.0),
+            width: Some(1280),
+            height: Some(720),
+            video_codec: Some("h264".into()),
+            pix_fmt: Some("yuv420p".into()),
+            audio_codec: Some("aac".into()),
+            audio_sample_rate: Some(48_000),
+        };
+        assert!(has_transmux_streams(&meta));
+        meta.audio_codec = None;
+        assert!(has_transmux_streams(&meta));
+        meta.pix_fmt = Some("yuv444p".into());
+        assert!(!has_transmux_streams(&meta));
+        meta.pix_fmt = Some("yuv420p".into());
+        meta.audio_codec = Some("opus".into());
+        assert!(!has_transmux_streams(&meta));
+        meta.audio_codec = None;
+        meta.video_codec = Some("hevc".into());
+        assert!(!has_transmux_streams(&meta));
+    }
+
+    #[test]
+    fn segment_list_reads_start_and_end_in_file_order() {
+        let text = "clip-chunk00.mp4,0.000000,10.010000\n\"odd,name.mp4\",10.010000,20.000000\n\n";
+        assert_eq!(parse_segment_list(text), vec![(0.0, 10.01), (10.01, 20.0)]);
+    }
+
+    #[test]
+    fn only_segments_that_missed_their_span_are_redone() {
+        let bounds = [(0.0, 10.0), (10.0, 20.0), (20.0, 30.0), (30.0, 40.0)];
+        assert!(misplaced_segments(
+            &[(0.0, 10.5), (10.5, 20.0), (20.0, 30.0), (30.0, 40.0)],
+            &bounds
+        )
+        .is_empty());
+        // A missing keyframe merged chunks 1 and 2, shifting chunk 3 into file 2.
+        let merged = [(0.0, 10.0), (10.0, 30.0), (30.0, 40.0)];
+        assert_eq!(misplaced_segments(&merged, &bounds), vec![1, 2, 3]);
+        let drifted = [(0.0, 14.0), (14.0, 20.0), (20.0, 30.0), (30.0, 40.0)];
+        assert_eq!(misplaced_segments(&drifted, &bounds), vec![0, 1]);
+    }
+}